@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+打包块存储：把所有块正文写进单个文件，附带定长偏移表和元信息，
+读取端 mmap 后可按序号直接取任意块，不用打开成千上万个小文件
+
+文件布局（整数均为小端）：
+    头部   magic(8) version(u32) count(u32) table_offset(u64) meta_offset(u64) meta_length(u64)
+    正文   各块 UTF-8 正文依次拼接
+    偏移表 count 个 (offset u64, length u64)
+    元信息 JSON：{"store": {...}, "chunks": [{...}, ...]}
+"""
+
+import json
+import mmap
+import struct
+
+MAGIC = b'PRDCHNK1'
+VERSION = 1
+HEADER = struct.Struct('<8sIIQQQ')
+ENTRY = struct.Struct('<QQ')
+
+class ChunkStoreWriter:
+    """
+    流式写入：每个块追加后立即落盘，close() 时补写偏移表、元信息和头部
+    """
+    def __init__(self, path, store_meta=None):
+        self.path = str(path)
+        self.store_meta = store_meta or {}
+        self.entries = []
+        self.chunk_meta = []
+        self.f = open(self.path, 'wb')
+        self.f.write(b'\0' * HEADER.size)
+
+    def append(self, text, meta=None):
+        data = text.encode('utf-8')
+        self.entries.append((self.f.tell(), len(data)))
+        self.chunk_meta.append(meta or {})
+        self.f.write(data)
+        return len(self.entries) - 1
+
+    def close(self):
+        if self.f is None:
+            return
+        table_offset = self.f.tell()
+        for offset, length in self.entries:
+            self.f.write(ENTRY.pack(offset, length))
+        meta_offset = self.f.tell()
+        meta = json.dumps({"store": self.store_meta, "chunks": self.chunk_meta},
+                          ensure_ascii=False).encode('utf-8')
+        self.f.write(meta)
+        self.f.seek(0)
+        self.f.write(HEADER.pack(MAGIC, VERSION, len(self.entries), table_offset, meta_offset, len(meta)))
+        self.f.close()
+        self.f = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class ChunkStore:
+    """
+    只读打开打包块存储（mmap），按序号取正文；元信息在首次访问时才解析
+    """
+    def __init__(self, path):
+        self.path = str(path)
+        with open(self.path, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count, self.table_offset, self.meta_offset, self.meta_length = \
+            HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.mm.close()
+            raise ValueError(f"Not a chunk store file: {self.path}")
+        self._meta = None
+
+    def __len__(self):
+        return self.count
+
+    def span(self, idx):
+        """
+        返回第 idx 个块（从 0 开始）正文的 (offset, length)
+        """
+        if not 0 <= idx < self.count:
+            raise IndexError(idx)
+        return ENTRY.unpack_from(self.mm, self.table_offset + idx * ENTRY.size)
+
+    def get_bytes(self, idx):
+        offset, length = self.span(idx)
+        return self.mm[offset:offset + length]
+
+    def get(self, idx):
+        return self.get_bytes(idx).decode('utf-8')
+
+    def __getitem__(self, idx):
+        return self.get(idx)
+
+    def __iter__(self):
+        for idx in range(self.count):
+            yield self.get(idx)
+
+    def _load_meta(self):
+        if self._meta is None:
+            raw = self.mm[self.meta_offset:self.meta_offset + self.meta_length]
+            self._meta = json.loads(raw.decode('utf-8'))
+        return self._meta
+
+    @property
+    def store_meta(self):
+        return self._load_meta()['store']
+
+    def meta(self, idx):
+        if not 0 <= idx < self.count:
+            raise IndexError(idx)
+        return self._load_meta()['chunks'][idx]
+
+    def close(self):
+        self.mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
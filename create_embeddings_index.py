@@ -1,158 +1,849 @@
 #!/usr/bin/env python3
 import os
 import json
+import argparse
 from pathlib import Path
+import fnmatch
+import functools
+import itertools
 import hashlib
+import time
+import contextlib
+import shutil
+from collections import Counter
 
-def create_embeddings_index(source_dir='docs/prd_chunks', index_file='prd_chunks.index'):
+from chunk_store import ChunkStore
+from prd_tagger import get_tag_matcher
+from prd_search import BM25IndexBuilder, BM25_K1, BM25_B, read_index_hash, tokenize
+from prd_postings import MAGIC as POSTINGS_MAGIC, CompressedPostingsWriter
+from prd_index_store import write_index_store
+from prd_summarizer import (SUMMARY_MODES, DEFAULT_SUMMARY_MODE, check_mode, summarize, summarize_batch,
+                            scoring_mode)
+# prd_dedup / prd_vector_index 需要 numpy，只在 --dedup / --vectors 的分支里导入，默认构建不加载 numpy
+
+def parse_chunk_file(content):
+    """
+    拆出块文件头部的YAML元信息和正文
+    """
+    meta_info = {}
+    actual_content = content
+    if content.startswith('---'):
+        meta_end = content.find('---', 3)
+        if meta_end > 0:
+            meta_section = content[3:meta_end].strip()
+            for line in meta_section.split('\n'):
+                if ':' in line:
+                    key, value = line.split(':', 1)
+                    meta_info[key.strip()] = value.strip()
+            
+            # 获取实际内容（去除元信息）
+            actual_content = content[meta_end+3:].strip()
+    return meta_info, actual_content
+
+def source_dirs(source_dir):
+    return [source_dir] if isinstance(source_dir, (str, Path)) else list(source_dir)
+
+def list_source_files(source_dir, exclude=()):
+    """
+    列出待索引的块文件和打包块存储（.chunks）；source_dir 可以是多个目录
+    exclude 为要跳过的文件名通配符（如架构文档的 08-* 模板）
+    """
+    md_files, stores = [], []
+    for directory in source_dirs(source_dir):
+        source_path = Path(directory)
+        md_files.extend(sorted(f for f in source_path.glob('*.md') if not f.name.endswith('_index.md')
+                               and not any(fnmatch.fnmatch(f.name, pattern) for pattern in exclude)))
+        stores.extend(sorted(source_path.glob('*.chunks')))
+    return md_files, stores
+
+def load_chunk_manifests(source_dir):
+    """
+    读取拆分脚本写出的块清单（*_manifest.json），返回 {块文件路径: 交接信息}
+    交接信息含头部字段、正文哈希、块文件字节数和清单修改时间；旧版清单没有头部字段时忽略
+    """
+    manifests = {}
+    manifest_files = [f for directory in source_dirs(source_dir) for f in sorted(Path(directory).glob('*_manifest.json'))]
+    for manifest_file in manifest_files:
+        try:
+            with open(manifest_file, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            mtime = manifest_file.stat().st_mtime
+        except (OSError, ValueError):
+            continue
+        for chunk in manifest.get('chunks', []):
+            if 'header' in chunk and 'file_bytes' in chunk:
+                manifests[str(manifest_file.parent / chunk['file'])] = {
+                    "header": chunk['header'],
+                    "sha256": chunk['sha256'],
+                    "file_bytes": chunk['file_bytes'],
+                    "mtime": mtime
+                }
+    return manifests
+
+def list_source_items(md_files, stores):
+    """
+    列出待索引条目：(文件标识, ID键, 默认标题, 文件路径, 打包存储中的块序号或None)
+    """
+    items = []
+    for file_path in md_files:
+        items.append((str(file_path.relative_to('.')), file_path.name,
+                      file_path.stem.replace('_', ' ').title(), str(file_path), None))
+    for store_path in stores:
+        with ChunkStore(store_path) as store:
+            count = len(store)
+        for i in range(count):
+            label = f"{store_path.relative_to('.')}#{i + 1}"
+            default_title = f"{store_path.stem} chunk {i + 1:03d}".replace('_', ' ').title()
+            items.append((label, f"{store_path.name}#{i + 1}", default_title, str(store_path), i))
+    return items
+
+class SourceReader:
+    """
+    一遍读取中复用打开的打包存储：每个 .chunks 文件只打开、mmap 一次
+    """
+    def __init__(self):
+        self.stores = {}
+
+    def store(self, path):
+        store = self.stores.get(path)
+        if store is None:
+            store = self.stores[path] = ChunkStore(path)
+        return store
+
+    def load(self, item):
+        return load_source_item(item, self)
+
+    def close(self):
+        for store in self.stores.values():
+            store.close()
+        self.stores.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def load_source_item(item, reader=None):
+    """
+    读取条目，返回 (元信息, 正文, 内容哈希)
+    打包存储按序号 mmap 读取，元信息与单文件块的头部字段一致；
+    逐条读取同一存储时传入 SourceReader，避免每条都重新打开存储
+    """
+    _, _, _, path, chunk_idx = item
+    if chunk_idx is None:
+        # 读取文件内容
+        with open(path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        meta_info, actual_content = parse_chunk_file(content)
+        return meta_info, actual_content, hashlib.sha256(content.encode('utf-8')).hexdigest()
+    
+    if reader is None:
+        with SourceReader() as reader:
+            return load_source_item(item, reader)
+    store = reader.store(path)
+    section = store.get(chunk_idx)
+    meta_info = {
+        "source": store.store_meta.get('source', ''),
+        "chunk": f"{chunk_idx + 1}/{len(store)}",
+        "size": f"{len(section)} chars"
+    }
+    return meta_info, section.strip(), hashlib.sha256(section.encode('utf-8')).hexdigest()
+
+def index_file_path(index_file, suffix):
+    """
+    派生文件名：prd_chunks.index / prd_chunks.jsonl -> prd_chunks_<suffix>.index
+    """
+    base, ext = os.path.splitext(index_file)
+    if ext not in ('.index', '.jsonl'):
+        base = index_file
+    return f"{base}_{suffix}.index"
+
+def is_jsonl_index(index_file):
+    return index_file.endswith('.jsonl')
+
+def iter_jsonl_index(index_file):
+    """
+    逐行读取 JSONL 索引：第一行是顶层字段，之后每行一个文档条目。
+    写到一半中断时末尾可能有不完整的行，读到第一条无法解析的行即停止，前面的条目照常可用。
+    """
+    with open(index_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.endswith('\n'):
+                return
+            try:
+                yield json.loads(line)
+            except ValueError:
+                return
+
+def read_index_header(index_file):
+    """
+    返回索引的顶层字段（不含 documents），同时支持 JSON 和 JSONL
+    """
+    if is_jsonl_index(index_file):
+        return next(iter_jsonl_index(index_file), None)
+    with open(index_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data.pop('documents', None)
+    return data
+
+def iter_index_documents(index_file):
+    """
+    逐个产出索引中的文档条目，同时支持 JSON 和 JSONL
+    """
+    if is_jsonl_index(index_file):
+        records = iter_jsonl_index(index_file)
+        next(records, None)
+        yield from records
+    else:
+        with open(index_file, 'r', encoding='utf-8') as f:
+            yield from json.load(f).get('documents', [])
+
+def load_previous_index(index_file, summary_mode=DEFAULT_SUMMARY_MODE):
+    """
+    读取上一次生成的索引，返回 {文件标识: 条目}；不存在、格式不符或条目指纹不同时返回空字典
+    JSONL 索引中断后留下的前缀同样可以复用
+    """
+    try:
+        header = read_index_header(index_file)
+        if not isinstance(header, dict):
+            return {}
+        if header.get('metadata', {}).get('entry_fingerprint') != entry_fingerprint(summary_mode):
+            # 标签词表或摘要算法变化，旧条目不可复用
+            return {}
+        return {doc['file']: doc for doc in iter_index_documents(index_file) if 'content_hash' in doc}
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+def build_doc_entry(idx, file_label, id_key, default_title, meta_info, actual_content, summary=None):
+    """
+    为单个块生成索引条目；summary 为批量算好的摘要，不给时单独计算
+    """
+    matcher = get_tag_matcher()
+    tag_counts = matcher.count(actual_content)
+    ranked = matcher.rank(tag_counts)
+    
+    # 生成文档ID（基于文件名的哈希）
+    doc_id = hashlib.md5(id_key.encode()).hexdigest()[:12]
+    
+    # 提取第一个标题作为文档标题；没有时用头部的 Title 字段（分片块带有内嵌文件的标题）
+    title = meta_info.get('Title') or default_title
+    lines = actual_content.split('\n')
+    for line in lines[:10]:  # 只看前10行
+        if line.strip().startswith('#'):
+            title = line.strip('#').strip()
+            break
+    
+    # 创建文档条目
+    return {
+        "id": doc_id,
+        "file": file_label,
+        "chunk_number": idx,
+        "title": title,
+        "size": len(actual_content),
+        "char_count": len(actual_content),
+        "line_count": len(actual_content.split('\n')),
+        "metadata": meta_info,
+        "tags": ranked,
+        "tag_hits": {tag: tag_counts[tag] for tag in ranked},
+        "summary": summary if summary is not None else extract_summary(actual_content)
+    }
+
+class ProgressReporter:
+    """
+    限频进度输出：最多每 interval 秒打印一行，结束时补一行汇总
+    """
+    def __init__(self, total, interval=1.0):
+        self.total = total
+        self.interval = interval
+        self.done = 0
+        self.last = time.monotonic()
+
+    def update(self, label):
+        self.done += 1
+        now = time.monotonic()
+        if now - self.last >= self.interval:
+            self.last = now
+            print(f"[{self.done}/{self.total}] Indexed: {label}")
+
+    def finish(self):
+        if self.total:
+            print(f"[{self.done}/{self.total}] Indexed")
+
+_worker_reader = None
+# 每批交给 summarize_batch 的文档数：批内正文同时留在内存里，批越大 numpy 的固定开销摊得越薄
+SUMMARY_BATCH_SIZE = 64
+
+def init_worker():
+    """
+    进程池初始化：每个工作进程持有一个 SourceReader，进程退出时随之释放
+    """
+    global _worker_reader
+    _worker_reader = SourceReader()
+
+def load_task(task, reader):
+    """
+    读取一个待索引条目，返回 (元信息, 正文, 内容哈希)；内容哈希与上次相同时正文为 None
+    有清单交接信息时元信息和哈希取自清单，只读取正文
+    """
+    _, item, prev_hash, handoff, _ = task
+    if handoff is not None:
+        with open(item[3], 'r', encoding='utf-8') as f:
+            _, actual_content = parse_chunk_file(f.read())
+        return dict(handoff['header']), actual_content, handoff['sha256']
+    meta_info, actual_content, content_hash = load_source_item(item, reader)
+    if content_hash == prev_hash:
+        return meta_info, None, content_hash
+    return meta_info, actual_content, content_hash
+
+def index_source_batch(tasks, reader=None, summary_mode=DEFAULT_SUMMARY_MODE):
+    """
+    进程池工作函数：读取并索引一批条目，整批正文一次交给 summarize_batch 生成摘要
+    返回 [(内容哈希, 条目)...]；内容哈希与上次相同时条目为 None，由调用方复用旧条目
+    dedup=True 时条目附带 MinHash 签名
+    """
+    reader = reader or _worker_reader
+    loaded = [load_task(task, reader) for task in tasks]
+    summaries = iter(summarize_batch([content for _, content, _ in loaded if content is not None],
+                                     mode=summary_mode))
+    results = []
+    for (idx, item, _, _, dedup), (meta_info, actual_content, content_hash) in zip(tasks, loaded):
+        if actual_content is None:
+            results.append((content_hash, None))
+            continue
+        file_label, id_key, default_title, _, _ = item
+        doc_entry = build_doc_entry(idx, file_label, id_key, default_title, meta_info, actual_content,
+                                    next(summaries))
+        if dedup:
+            from prd_dedup import minhash_signature, encode_signature
+            signature = minhash_signature(actual_content)
+            doc_entry["minhash"] = encode_signature(signature) if signature is not None else ""
+        results.append((content_hash, doc_entry))
+    return results
+
+def merge_indexed_item(idx, item, result, previous, stats, progress):
+    """
+    补全工作函数的结果，返回 (条目, 是否复用了旧条目)
+    """
+    file_label, _, _, path, _ = item
+    content_hash, doc_entry = result
+    reused = doc_entry is None
+    if reused:
+        doc_entry = dict(previous[file_label], chunk_number=idx)
+    else:
+        doc_entry["content_hash"] = content_hash
+        progress.update(Path(file_label).name)
+    doc_entry["file_size"] = stats[path].st_size
+    doc_entry["file_mtime"] = stats[path].st_mtime
+    return doc_entry, reused
+
+def iter_indexed_documents(items, previous, workers=1, manifests=None, dedup=False,
+                           summary_mode=DEFAULT_SUMMARY_MODE):
+    """
+    按文件顺序逐个产出 (条目, 是否复用)，内存中只保留当前一批的正文
+
+    文件大小和修改时间都没变的条目直接复用（不读文件），其余按 SUMMARY_BATCH_SIZE 分批交给工作函数，
+    每批的摘要一次算完（摘要只取决于文档本身，分批方式不影响结果）；
+    workers > 1 时用进程池并行，map 按提交顺序返回结果，与复用条目按原顺序穿插。
+
+    manifests 为 load_chunk_manifests 的结果：块文件字节数与清单一致且不晚于清单写出时，
+    清单可信，正文哈希没变的条目只从清单刷新元信息，同样不读文件。
+
+    dedup=True 时没有 MinHash 签名的旧条目不能复用，需要重新读取。
+    """
+    manifests = manifests or {}
+    # 先按文件状态筛出需要重新读取的条目
+    plan = []
+    pending = []
+    stats = {}
+    for idx, item in enumerate(items, 1):
+        file_label, _, _, path, chunk_idx = item
+        if path not in stats:
+            stats[path] = os.stat(path)
+        st = stats[path]
+        prev = previous.get(file_label)
+        if prev and dedup and 'minhash' not in prev:
+            prev = None
+        handoff = manifests.get(path) if chunk_idx is None else None
+        if handoff and (st.st_size != handoff['file_bytes'] or st.st_mtime > handoff['mtime']):
+            # 块文件在拆分之后被改过，清单不可信
+            handoff = None
+        
+        if handoff:
+            if prev and prev.get('content_hash') == handoff['sha256']:
+                plan.append(dict(prev, metadata=dict(handoff['header']),
+                                 file_size=st.st_size, file_mtime=st.st_mtime))
+            else:
+                plan.append(None)
+                pending.append((idx, item, None, handoff, dedup))
+        elif prev and prev.get('file_size') == st.st_size and prev.get('file_mtime') == st.st_mtime:
+            plan.append(prev)
+        else:
+            plan.append(None)
+            pending.append((idx, item, prev['content_hash'] if prev else None, None, dedup))
+    
+    progress = ProgressReporter(len(pending))
+    with contextlib.ExitStack() as stack:
+        if workers > 1 and len(pending) > 1:
+            # 进程池（multiprocessing）导入要几十毫秒，只在并行时才导入
+            from concurrent.futures import ProcessPoolExecutor
+            executor = stack.enter_context(ProcessPoolExecutor(max_workers=workers, initializer=init_worker))
+            batch_size = max(1, min(SUMMARY_BATCH_SIZE, len(pending) // (workers * 4)))
+            batches = (pending[i:i + batch_size] for i in range(0, len(pending), batch_size))
+            worker = functools.partial(index_source_batch, summary_mode=summary_mode)
+            results = itertools.chain.from_iterable(executor.map(worker, batches))
+        else:
+            reader = stack.enter_context(SourceReader())
+            batches = (pending[i:i + SUMMARY_BATCH_SIZE] for i in range(0, len(pending), SUMMARY_BATCH_SIZE))
+            worker = functools.partial(index_source_batch, reader=reader, summary_mode=summary_mode)
+            results = itertools.chain.from_iterable(map(worker, batches))
+        
+        for idx, (item, prev) in enumerate(zip(items, plan), 1):
+            if prev is not None:
+                yield dict(prev, chunk_number=idx), True
+            else:
+                yield merge_indexed_item(idx, item, next(results), previous, stats, progress)
+    progress.finish()
+
+class TermCountCache:
+    """
+    BM25 的逐文档词频缓存 <index>_terms.index：首行为头部 {"fingerprint", "index_hash", "postings"}，
+    之后每篇文档一行：[文件标识, 内容哈希] + 制表符 + {词项: 词频}（json.dumps 的输出里不会出现裸制表符）。
+    增量构建时内容哈希没变的文档直接取缓存的词频，不再读取和分词；
+    打开时只扫描各行的 [文件标识, 内容哈希] 并记下偏移，用到时才解析词频，内存不随语料增长。
+    """
+    def __init__(self, path):
+        self.path = path
+        self.header = {}
+        self.entries = None    # 文件标识 -> (内容哈希, 行偏移)
+        self.file = None
+        try:
+            self.file = open(path, 'rb')
+            self.header = json.loads(self.file.readline())
+        except (OSError, ValueError):
+            self.close()
+
+    def is_current(self, fingerprint, search_index_file, postings_file=None):
+        """
+        缓存与现有倒排索引是否对应同一组文档：指纹相同、倒排索引未被改写（index_hash 一致），
+        给出 postings_file（要求压缩倒排索引）时它也须是同一次构建按当前格式写出的
+        """
+        header = self.header
+        return (bool(header) and header.get('fingerprint') == fingerprint
+                and header.get('index_hash') == read_index_hash(search_index_file)
+                and (postings_file is None or (header.get('postings') == POSTINGS_MAGIC.decode()
+                                               and os.path.exists(postings_file))))
+
+    def get(self, file_label, content_hash):
+        """
+        返回缓存的词频行（JSON 文本），没有或内容哈希不同时返回 None
+        """
+        if self.file is None or content_hash is None:
+            return None
+        if self.entries is None:
+            self.entries = {}
+            self.file.seek(0)
+            offset = len(self.file.readline())
+            for line in self.file:
+                key = json.loads(line[:line.index(b'\t')])
+                self.entries[key[0]] = (key[1], offset)
+                offset += len(line)
+        entry = self.entries.get(file_label)
+        if entry is None or entry[0] != content_hash:
+            return None
+        self.file.seek(entry[1])
+        line = self.file.readline()
+        return line[line.index(b'\t') + 1:].decode('utf-8')
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+def search_fingerprint(refs, hashes):
+    """
+    倒排索引的输入指纹：检索元信息（含去重别名）、内容哈希和打分参数
+    """
+    payload = json.dumps([BM25_K1, BM25_B, refs, hashes], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+def build_search_index(items, refs, hashes, index_file, max_memory=None, compressed=False, incremental=True):
+    """
+    为所有块正文建立 BM25 倒排索引，文档号与 refs（doc_ref 给出的检索元信息）顺序一致
+    max_memory（字节）限制倒排表的内存占用，超出时分批落盘再归并（见 BM25IndexBuilder）
+    compressed=True 时在同一遍中另写压缩倒排索引 <index>_postings.index（见 prd_postings）
+
+    hashes 为各块的内容哈希，逐文档词频同时写入 <index>_terms.index（见 TermCountCache）。
+    incremental=True 时：文档、检索元信息和内容哈希都与上次相同且倒排索引未被改写，直接沿用现有索引；
+    否则内容哈希没变的文档用缓存的词频，只有新增或修改的块重新读取和分词。
+    返回 (倒排索引路径, 是否重建)
+    """
+    path = index_file_path(index_file, 'bm25')
+    postings_file = index_file_path(index_file, 'postings') if compressed else None
+    fingerprint = search_fingerprint(refs, hashes)
+    cache = TermCountCache(index_file_path(index_file, 'terms')) if incremental else None
+    try:
+        if cache is not None and cache.is_current(fingerprint, path, postings_file):
+            return path, False
+        builder = BM25IndexBuilder(max_memory, spill_dir=os.path.dirname(os.path.abspath(index_file)))
+        body_file = index_file_path(index_file, 'terms') + '.tmp'
+        cached = 0
+        with SourceReader() as reader, open(body_file, 'w', encoding='utf-8') as body:
+            for item, ref, content_hash in zip(items, refs, hashes):
+                line = cache.get(ref['file'], content_hash) if cache is not None else None
+                if line is not None:
+                    counts = json.loads(line)
+                    cached += 1
+                else:
+                    _, actual_content, _ = reader.load(item)
+                    counts = Counter(tokenize(actual_content))
+                    line = json.dumps(counts, ensure_ascii=False, separators=(',', ':')) + '\n'
+                builder.add_counts(ref, counts)
+                body.write(json.dumps([ref['file'], content_hash], ensure_ascii=False) + '\t' + line)
+    finally:
+        if cache is not None:
+            cache.close()
+    
+    sink = CompressedPostingsWriter(postings_file, builder.header_dict()) if compressed else None
+    builder.write(path, sink)
+    if sink is not None:
+        print(f"[INFO] Compressed postings created: {sink.path}")
+    if builder.spilled:
+        print(f"[INFO] Search index built out of core: {builder.spilled} sorted runs merged")
+    if cached:
+        print(f"[INFO] Term counts reused for {cached} of {len(refs)} documents")
+    
+    # 头部要带上刚写出的 index_hash：先写正文到临时文件，再拼上头部
+    header = {"fingerprint": fingerprint, "index_hash": read_index_hash(path),
+              "postings": POSTINGS_MAGIC.decode() if compressed else None}
+    terms_file = index_file_path(index_file, 'terms')
+    with open(body_file, 'r', encoding='utf-8') as src, open(terms_file, 'w', encoding='utf-8') as dst:
+        dst.write(json.dumps(header) + '\n')
+        shutil.copyfileobj(src, dst, 1 << 20)
+    os.remove(body_file)
+    return path, True
+
+class ChunkDeduplicator:
+    """
+    索引过程中的在线去重：check() 按文档顺序调用，返回代表条目的文件标识或 None（自身是代表）
+    """
+    def __init__(self, threshold=None):
+        from prd_dedup import NearDuplicateIndex, DEFAULT_THRESHOLD, decode_signature
+        self.decode_signature = decode_signature
+        threshold = DEFAULT_THRESHOLD if threshold is None else threshold
+        self.lsh = NearDuplicateIndex(threshold)
+        self.threshold = threshold
+        self.canonical_refs = {}   # 代表文件 -> 检索元信息（别名追加到 aliases）
+        self.clusters = {}         # 代表文件 -> [{"file", "similarity"}...]
+        self.total_documents = 0
+        self.total_chars = 0
+        self.saved_chars = 0
+
+    def check(self, doc):
+        """
+        去掉上一次的去重标记后重新判断；是近重复时在条目上写 duplicate_of / similarity
+        """
+        doc.pop('duplicate_of', None)
+        doc.pop('similarity', None)
+        self.total_documents += 1
+        self.total_chars += doc['size']
+        if not doc.get('minhash'):
+            return None
+        match = self.lsh.add(doc['file'], self.decode_signature(doc['minhash']))
+        if match is None:
+            return None
+        canonical, similarity = match
+        doc['duplicate_of'] = canonical
+        doc['similarity'] = round(similarity, 3)
+        self.canonical_refs[canonical].setdefault('aliases', []).append(doc['file'])
+        self.clusters.setdefault(canonical, []).append({"file": doc['file'], "similarity": doc['similarity']})
+        self.saved_chars += doc['size']
+        return canonical
+
+    def report(self):
+        duplicates = sum(len(aliases) for aliases in self.clusters.values())
+        return {
+            "threshold": self.threshold,
+            "total_documents": self.total_documents,
+            "canonical_documents": self.total_documents - duplicates,
+            "duplicate_documents": duplicates,
+            "cluster_count": len(self.clusters),
+            "total_chars": self.total_chars,
+            "saved_chars": self.saved_chars,
+            "saved_ratio": self.saved_chars / self.total_chars if self.total_chars else 0.0,
+            "lsh_comparisons": self.lsh.comparisons
+        }
+
+    def write_report(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(dict(self.report(), clusters=[
+                {"canonical": canonical, "aliases": aliases} for canonical, aliases in self.clusters.items()
+            ]), f, indent=2, ensure_ascii=False)
+        return path
+
+def doc_ref(doc):
+    """
+    检索结果里携带的文档元信息
+    """
+    return {"id": doc["id"], "file": doc["file"], "title": doc["title"]}
+
+def create_embeddings_index(source_dir='docs/prd_chunks', index_file='prd_chunks.index', incremental=True,
+                            workers=1, search_index=False, vectors=False, binary=False, dedup=False,
+                            dedup_threshold=None, exclude=(), document_type='PRD', max_memory=None,
+                            compressed_postings=False, ivf=False, summary_mode=DEFAULT_SUMMARY_MODE):
     """
     创建嵌入索引文件，用于向量数据库或RAG系统
+
+    incremental=True 时读取上一次的索引：文件大小和修改时间都没变的条目直接复用（不读文件），
+    否则读取并比较内容哈希，哈希相同也复用；只有新增或修改的文档重新解析、打标签和摘要，
+    已删除的文档自然从索引中去掉。
+    源目录里有拆分脚本写出的块清单时，元信息和内容哈希直接取自清单（见 load_chunk_manifests）。
+
+    workers > 1 时用进程池并行索引，结果按文件顺序合并，生成的索引与顺序构建逐字节相同。
+
+    index_file 以 .jsonl 结尾时输出 JSON Lines：第一行为顶层字段，之后每个条目索引完立即写出一行，
+    内存占用不随文档数增长，中断时留下可用的前缀（下次增量构建会复用）。返回值不含 documents。
+
+    search_index=True 时另外生成 BM25 倒排索引 <index>_bm25.index（见 prd_search），默认不建：
+    它要把全部正文再读一遍并分词，全量构建的耗时是不建时的数倍。
+    逐文档词频缓存在 <index>_terms.index，体积与倒排索引相当：增量构建时没有文档变化就沿用现有倒排索引，
+    否则只重新读取和分词新增或修改的块（见 build_search_index）。
+    max_memory（字节）给定时倒排索引按外存方式构建：超出预算的部分写成临时有序 run 再 k 路归并，
+    配合 .jsonl 主索引，大语料的构建内存不随语料增长（每篇文档只保留检索元信息和长度）。
+    compressed_postings=True 时另写差值 + varint 编码、带跳表指针的倒排索引 <index>_postings.index。
+
+    binary=True 时另存一份列式二进制索引 <index>_columns.index（见 prd_index_store），可 mmap 按需读取。
+
+    vectors=True 时用离线哈希 TF-IDF 生成向量索引 <index>_vectors.npy（见 prd_vector_index，需要 numpy）。
+    ivf=True 时另建 IVF 近似检索结构（文档数不少于 IVF_MIN_DOCUMENTS 时）；召回低于精确检索，默认不建。
+
+    dedup=True 时按 MinHash/LSH 检测近重复块（见 prd_dedup，需要 numpy）：先出现的块是代表条目，
+    相似度不低于 dedup_threshold（默认 prd_dedup.DEFAULT_THRESHOLD）的后续块在主索引中标记 duplicate_of，不进入 BM25 和向量索引，
+    代表条目的检索元信息带上 aliases；聚类和节省情况写入 <index>_dedup.index。
+    source_dir 可以是多个目录，以便跨目录（如 PRD 块和分片块）去重；exclude 为跳过的文件名通配符。
+    document_type 写进索引元信息，区分 PRD 与架构文档等分片（见 prd_federated）。
+
+    summary_mode 选择摘要方式（见 prd_summarizer）：默认 'lead' 取开头几行正文；
+    'centrality' 按 TF-IDF 中心度选句，需要 numpy（没有时直接报错），全量构建的耗时约为 lead 的数倍。
+    摘要方式写进条目指纹，切换后旧条目不复用。
     """
+    check_mode(summary_mode)
     
-    # 获取所有markdown文件
-    source_path = Path(source_dir)
-    md_files = sorted([f for f in source_path.glob('*.md') if not f.name.endswith('_index.md')])
+    # 获取所有markdown文件和打包块存储
+    md_files, stores = list_source_files(source_dir, exclude)
+    items = list_source_items(md_files, stores)
+    total_documents = len(items)
+    previous = load_previous_index(index_file, summary_mode) if incremental else {}
+    manifests = load_chunk_manifests(source_dir)
+    if manifests:
+        print(f"[INFO] Chunk manifests found: {len(manifests)} chunks with metadata hand-off")
     
     # 创建索引数据结构
     index_data = {
         "version": "1.0",
-        "source_directory": source_dir,
-        "total_documents": len(md_files),
+        "source_directory": source_dir if isinstance(source_dir, str) else [str(d) for d in source_dirs(source_dir)],
+        "total_documents": total_documents,
         "metadata": {
             "created_at": "2025-08-06",
-            "document_type": "PRD",
+            "document_type": document_type,
             "project": "Guild Manager",
             "chunking_method": "section-aware",
-            "chunk_size": 8000
+            "chunk_size": 8000,
+            "entry_fingerprint": entry_fingerprint(summary_mode)
         },
         "documents": []
     }
     
-    # 处理每个文档
-    for idx, file_path in enumerate(md_files, 1):
-        # 读取文件内容
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # 提取元信息（从文件头部的YAML）
-        meta_info = {}
-        if content.startswith('---'):
-            meta_end = content.find('---', 3)
-            if meta_end > 0:
-                meta_section = content[3:meta_end].strip()
-                for line in meta_section.split('\n'):
-                    if ':' in line:
-                        key, value = line.split(':', 1)
-                        meta_info[key.strip()] = value.strip()
-                
-                # 获取实际内容（去除元信息）
-                actual_content = content[meta_end+3:].strip()
-        else:
-            actual_content = content
-        
-        # 生成文档ID（基于文件名的哈希）
-        doc_id = hashlib.md5(file_path.name.encode()).hexdigest()[:12]
-        
-        # 提取第一个标题作为文档标题
-        title = file_path.stem.replace('_', ' ').title()
-        lines = actual_content.split('\n')
-        for line in lines[:10]:  # 只看前10行
-            if line.strip().startswith('#'):
-                title = line.strip('#').strip()
-                break
-        
-        # 创建文档条目
-        doc_entry = {
-            "id": doc_id,
-            "file": str(file_path.relative_to('.')),
-            "chunk_number": idx,
-            "title": title,
-            "size": len(actual_content),
-            "char_count": len(actual_content),
-            "line_count": len(actual_content.split('\n')),
-            "metadata": meta_info,
-            "tags": extract_tags(actual_content),
-            "summary": extract_summary(actual_content)
-        }
+    # 逐条索引：文本索引与主索引在同一遍中写出；JSONL 模式每条写完即落盘，不保留条目
+    jsonl = is_jsonl_index(index_file)
+    documents = []
+    refs = []
+    search_items = []
+    search_hashes = []
+    seen_files = set()
+    deduper = ChunkDeduplicator(dedup_threshold) if dedup else None
+    reused = 0
+    text_index_file = index_file_path(index_file, 'text')
+    with contextlib.ExitStack() as stack:
+        text_out = stack.enter_context(open(text_index_file, 'w', encoding='utf-8'))
+        text_out.write("# PRD Chunks Embedding Index\n\n")
+        text_out.write(f"Total Documents: {total_documents}\n")
+        text_out.write(f"Source Directory: {', '.join(map(str, source_dirs(source_dir)))}\n\n")
+        text_out.write("## Document List\n\n")
+        if jsonl:
+            # 行缓冲：每条记录写完即交给系统，中断时文件里是完整的前缀
+            index_out = stack.enter_context(open(index_file, 'w', encoding='utf-8', buffering=1))
+            header = {key: value for key, value in index_data.items() if key != 'documents'}
+            index_out.write(json.dumps(header, ensure_ascii=False) + '\n')
         
-        index_data["documents"].append(doc_entry)
-        print(f"[{idx}/{len(md_files)}] Indexed: {file_path.name}")
+        documents_iter = iter_indexed_documents(items, previous, workers, manifests, dedup, summary_mode)
+        for item, (doc, was_reused) in zip(items, documents_iter):
+            reused += was_reused
+            if previous:
+                seen_files.add(doc['file'])
+            if deduper:
+                duplicate = deduper.check(doc)
+            else:
+                duplicate = None
+                for key in ('minhash', 'duplicate_of', 'similarity'):
+                    doc.pop(key, None)
+            if duplicate is None:
+                ref = doc_ref(doc)
+                refs.append(ref)
+                search_items.append(item)
+                search_hashes.append(doc.get('content_hash'))
+                if deduper:
+                    deduper.canonical_refs[doc['file']] = ref
+            if jsonl:
+                index_out.write(json.dumps(doc, ensure_ascii=False) + '\n')
+            else:
+                documents.append(doc)
+            text_out.write(f"### [{doc['id']}] {doc['title']}\n")
+            text_out.write(f"- File: {doc['file']}\n")
+            if duplicate is not None:
+                text_out.write(f"- Duplicate of: {duplicate} (similarity {doc['similarity']})\n\n")
+                continue
+            text_out.write(f"- Size: {doc['size']} chars\n")
+            text_out.write(f"- Tags: {', '.join(doc['tags'])}\n")
+            text_out.write(f"- Summary: {doc['summary']}\n\n")
     
-    # 写入索引文件
-    with open(index_file, 'w', encoding='utf-8') as f:
-        json.dump(index_data, f, indent=2, ensure_ascii=False)
+    if jsonl:
+        del index_data["documents"]
+    else:
+        index_data["documents"] = documents
+        # 写入索引文件
+        with open(index_file, 'w', encoding='utf-8') as f:
+            json.dump(index_data, f, indent=2, ensure_ascii=False)
     
     print(f"\n[SUCCESS] Index created: {index_file}")
-    print(f"[INFO] Total documents indexed: {len(md_files)}")
-    
-    # 创建一个简化的文本索引
-    text_index_file = index_file.replace('.index', '_text.index')
-    with open(text_index_file, 'w', encoding='utf-8') as f:
-        f.write("# PRD Chunks Embedding Index\n\n")
-        f.write(f"Total Documents: {len(md_files)}\n")
-        f.write(f"Source Directory: {source_dir}\n\n")
-        f.write("## Document List\n\n")
-        
-        for doc in index_data["documents"]:
-            f.write(f"### [{doc['id']}] {doc['title']}\n")
-            f.write(f"- File: {doc['file']}\n")
-            f.write(f"- Size: {doc['size']} chars\n")
-            f.write(f"- Tags: {', '.join(doc['tags'])}\n")
-            f.write(f"- Summary: {doc['summary']}\n\n")
-    
+    print(f"[INFO] Total documents indexed: {total_documents}")
+    if previous:
+        removed = len(set(previous) - seen_files)
+        print(f"[INFO] Reused: {reused}, re-indexed: {total_documents - reused}, removed: {removed}")
     print(f"[INFO] Text index created: {text_index_file}")
     
+    if deduper:
+        dedup_file = deduper.write_report(index_file_path(index_file, 'dedup'))
+        report = deduper.report()
+        print(f"[INFO] Near-duplicates: {report['duplicate_documents']} of {report['total_documents']} documents "
+              f"in {report['cluster_count']} clusters, {report['saved_chars']} chars ({report['saved_ratio']:.1%}) "
+              f"kept out of the search indexes: {dedup_file}")
+    
+    if binary:
+        # JSONL 模式下从刚写出的文件逐条读回，仍不在内存中保留全部条目
+        store_data = index_data if not jsonl else dict(index_data, documents=iter_index_documents(index_file))
+        columns_file = write_index_store(store_data, index_file_path(index_file, 'columns'))
+        print(f"[INFO] Columnar index created: {columns_file}")
+    
+    if not search_index and os.path.exists(index_file_path(index_file, 'bm25')):
+        # BM25 索引默认不建：旧的倒排索引留在原处但不再与主索引同步
+        print(f"[WARN] {index_file_path(index_file, 'bm25')} was not updated; pass --search to rebuild it")
+    
+    if search_index:
+        search_index_file, rebuilt = build_search_index(search_items, refs, search_hashes, index_file, max_memory,
+                                                        compressed_postings, incremental)
+        if rebuilt:
+            print(f"[INFO] Search index created: {search_index_file}")
+        else:
+            print(f"[INFO] Search index up to date: {search_index_file}")
+    
+    if vectors:
+        from prd_vector_index import build_vector_index, build_ivf, ivf_files, IVF_MIN_DOCUMENTS
+        
+        def texts():
+            with SourceReader() as reader:
+                for item in search_items:
+                    yield reader.load(item)[1]
+        vector_file = build_vector_index(texts, refs, index_file)
+        print(f"[INFO] Vector index created: {vector_file}")
+        if ivf and len(refs) >= IVF_MIN_DOCUMENTS:
+            print(f"[INFO] IVF index created: {build_ivf(index_file)}")
+        else:
+            if ivf:
+                print(f"[INFO] IVF skipped: {len(refs)} documents < {IVF_MIN_DOCUMENTS}, exact search is fast enough")
+            for path in ivf_files(index_file):
+                if os.path.exists(path):
+                    os.remove(path)
+    
     return index_data
 
-def extract_tags(content):
+def extract_tags(content, taxonomy_file=None):
     """
-    从内容中提取关键标签
+    从内容中提取关键标签，按关键词命中次数排序（最多 max_tags 个，默认5个）
     """
-    tags = []
-    
-    # 检查常见的PRD关键词
-    keywords = {
-        'API': ['API', 'REST', 'GraphQL', 'endpoint'],
-        'Database': ['数据库', 'database', 'schema', '表结构'],
-        'UI': ['界面', 'UI', 'UX', '用户体验', 'frontend'],
-        'Backend': ['后端', 'backend', 'server', '服务端'],
-        'Auth': ['认证', 'auth', '权限', 'permission'],
-        'Game': ['游戏', 'game', '玩法', 'gameplay'],
-        'Guild': ['公会', 'guild', '团队', 'team'],
-        'Player': ['玩家', 'player', '用户', 'user'],
-        'Battle': ['战斗', 'battle', 'combat', 'PvP'],
-        'Economy': ['经济', 'economy', '货币', 'currency']
-    }
-    
-    content_lower = content.lower()
-    for tag, terms in keywords.items():
-        if any(term.lower() in content_lower for term in terms):
-            tags.append(tag)
-    
-    return tags[:5]  # 最多返回5个标签
+    matcher = get_tag_matcher(taxonomy_file)
+    return matcher.rank(matcher.count(content))
 
-def extract_summary(content, max_length=200):
+def extract_tag_hits(content, taxonomy_file=None):
     """
-    提取内容摘要
+    返回每个标签的命中次数和位置
     """
-    # 跳过空行和标题行
-    lines = []
-    for line in content.split('\n'):
-        line = line.strip()
-        if line and not line.startswith('#') and not line.startswith('---'):
-            lines.append(line)
-            if len(' '.join(lines)) > max_length:
-                break
-    
-    summary = ' '.join(lines)[:max_length]
-    if len(summary) == max_length:
-        summary = summary.rsplit(' ', 1)[0] + '...'
+    return get_tag_matcher(taxonomy_file).match(content)
+
+def extract_summary(content, max_length=200, mode=DEFAULT_SUMMARY_MODE):
+    """
+    提取内容摘要：默认取开头几行正文，mode='centrality' 时按 TF-IDF 中心度选句（见 prd_summarizer）
+    """
+    return summarize(content, max_length, mode)
+
+def entry_fingerprint(summary_mode=DEFAULT_SUMMARY_MODE):
+    """
+    条目指纹：标签词表、摘要算法或摘要方式变化时，旧索引条目不可复用
+    """
+    return f"{get_tag_matcher().fingerprint}-{scoring_mode(summary_mode)}"
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='创建 PRD 块索引',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=(
+            '默认只写主索引 <index> 和文本索引 <index>_text.index；其余输出都需要显式开启：\n'
+            '  --search               <index>_bm25.index、<index>_terms.index（prd_search.py / prd_query_cache.py 读取）\n'
+            '  --compressed-postings  <index>_postings.index\n'
+            '  --binary               <index>_columns.index\n'
+            '  --vectors / --ivf      <index>_vectors*.npy / .json / _docs.jsonl\n'
+            '  --dedup                <index>_dedup.index\n'
+            '不带 --search 重建时已有的 BM25 索引不会更新，检索前请带 --search 重建。\n'
+            '例：python create_embeddings_index.py --search'
+        ))
+    parser.add_argument('--source-dir', nargs='+', default=['docs/prd_chunks'], help='一个或多个块目录')
+    parser.add_argument('--index-file', default='prd_chunks.index', help='以 .jsonl 结尾时逐条流式写出 JSON Lines')
+    parser.add_argument('--workers', type=int, default=1, help='并行索引的进程数')
+    parser.add_argument('--full', action='store_true', help='忽略上一次的索引，全部重建')
+    parser.add_argument('--search', action='store_true',
+                        help='另建 BM25 倒排索引和词频缓存（需再读一遍正文并分词，全量构建慢数倍）')
+    parser.add_argument('--compressed-postings', action='store_true',
+                        help='另写压缩倒排索引（差值 + varint，带跳表指针），隐含 --search')
+    parser.add_argument('--max-memory', type=float, metavar='MB',
+                        help='倒排索引构建的内存预算（MB），超出时外存归并，隐含 --search')
+    parser.add_argument('--vectors', action='store_true', help='生成离线向量索引（需要 numpy）')
+    parser.add_argument('--ivf', action='store_true',
+                        help='另建 IVF 近似检索结构（召回低于精确检索，查询时用 --nprobe 开启）')
+    parser.add_argument('--binary', action='store_true', help='另存列式二进制索引，支持 mmap 按需读取')
+    parser.add_argument('--dedup', action='store_true', help='MinHash/LSH 近重复检测（需要 numpy）')
+    parser.add_argument('--dedup-threshold', type=float, help='近重复的相似度阈值（默认 0.8）')
+    parser.add_argument('--summary', choices=SUMMARY_MODES, default=DEFAULT_SUMMARY_MODE,
+                        help='摘要方式：lead 取开头几行正文（默认）；centrality 按 TF-IDF 中心度选句'
+                             '（需要 numpy，全量构建慢数倍）')
+    args = parser.parse_args()
     
-    return summary if summary else "No summary available"
+    create_embeddings_index(
+        source_dir=args.source_dir[0] if len(args.source_dir) == 1 else args.source_dir,
+        index_file=args.index_file,
+        incremental=not args.full,
+        workers=args.workers,
+        search_index=args.search or args.compressed_postings or args.max_memory is not None,
+        vectors=args.vectors,
+        binary=args.binary,
+        dedup=args.dedup,
+        dedup_threshold=args.dedup_threshold,
+        max_memory=int(args.max_memory * 1024 * 1024) if args.max_memory else None,
+        compressed_postings=args.compressed_postings,
+        ivf=args.ivf,
+        summary_mode=args.summary
+    )
 
 if __name__ == "__main__":
     # 创建嵌入索引
-    index_data = create_embeddings_index(
-        source_dir='docs/prd_chunks',
-        index_file='prd_chunks.index'
-    )
\ No newline at end of file
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+近重复块检测：MinHash 签名 + LSH 分桶
+
+每个块取相邻 3 个词项（见 prd_search.tokenize）组成的 shingle，哈希后做 MINHASH_PERMS 次
+multiply-shift 置换取最小值得到签名；签名切成 LSH_BANDS 段，任一段完全相同即为候选，
+再用签名估计的 Jaccard 相似度确认。按文档顺序在线处理：先出现的块成为代表条目，
+后面与之相似度不低于阈值的块记为它的别名，比较次数与候选数成正比而不是文档数的平方。
+需要 numpy（pip install numpy）。
+"""
+
+import base64
+import zlib
+
+try:
+    import numpy as np
+except ImportError:  # numpy 是可选依赖，只有去重需要
+    np = None
+
+from prd_search import tokenize
+
+MINHASH_PERMS = 64
+LSH_BANDS = 16             # 每段 4 行，相似度约 0.5 起开始成为候选
+SHINGLE_SIZE = 3
+DEFAULT_THRESHOLD = 0.8
+MINHASH_SEED = 0xD3D0
+
+def require_numpy():
+    if np is None:
+        raise RuntimeError("numpy is required for near-duplicate detection: pip install numpy")
+
+_permutations = None
+
+def permutations():
+    """
+    固定种子生成的 multiply-shift 参数（奇数乘数 a 和偏移 b），进程间一致
+    """
+    global _permutations
+    if _permutations is None:
+        rng = np.random.default_rng(MINHASH_SEED)
+        a = rng.integers(1, 1 << 63, MINHASH_PERMS, dtype=np.uint64) | np.uint64(1)
+        b = rng.integers(0, 1 << 63, MINHASH_PERMS, dtype=np.uint64)
+        _permutations = (a, b)
+    return _permutations
+
+def shingle_hashes(text):
+    tokens = tokenize(text)
+    if len(tokens) >= SHINGLE_SIZE:
+        shingles = (' '.join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1))
+    else:
+        shingles = iter(tokens)
+    return np.unique(np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64))
+
+def minhash_signature(text):
+    """
+    返回 uint32 签名数组；没有任何词项时返回 None
+    """
+    require_numpy()
+    shingles = shingle_hashes(text)
+    if shingles.size == 0:
+        return None
+    a, b = permutations()
+    with np.errstate(over='ignore'):
+        hashed = (shingles[:, None] * a[None, :] + b[None, :]) >> np.uint64(32)
+    return hashed.min(axis=0).astype(np.uint32)
+
+def encode_signature(signature):
+    return base64.b64encode(signature.astype('<u4').tobytes()).decode('ascii')
+
+def decode_signature(encoded):
+    return np.frombuffer(base64.b64decode(encoded), dtype='<u4').astype(np.uint32)
+
+class NearDuplicateIndex:
+    """
+    在线 LSH：add() 返回 (代表键, 估计相似度)，没有近重复时自身成为代表并返回 None
+    """
+    def __init__(self, threshold=DEFAULT_THRESHOLD, bands=LSH_BANDS):
+        require_numpy()
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = MINHASH_PERMS // bands
+        self.buckets = {}       # (段号, 段内容) -> [代表键...]
+        self.signatures = {}    # 代表键 -> 签名
+        self.comparisons = 0
+
+    def band_keys(self, signature):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def add(self, key, signature):
+        best, best_sim = None, 0.0
+        seen = set()
+        for band_key in self.band_keys(signature):
+            for candidate in self.buckets.get(band_key, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                self.comparisons += 1
+                sim = float(np.mean(self.signatures[candidate] == signature))
+                if sim > best_sim:
+                    best, best_sim = candidate, sim
+        if best is not None and best_sim >= self.threshold:
+            return best, best_sim
+        self.signatures[key] = signature
+        for band_key in self.band_keys(signature):
+            self.buckets.setdefault(band_key, []).append(key)
+        return None
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分片索引：把几个独立构建的索引（PRD 块、架构基线文档……）登记为分片，一次查询并发检索全部分片，
+合并出全局 top-k，不需要把它们拼成一个大索引
+
+每个分片都是 create_embeddings_index 的产物，检索用其 BM25 倒排索引（<index>_bm25.index）。
+查询分两步：先并发收集各分片的集合统计（文档数、总词数、查询词项的文档频率）并相加，
+再让各分片用全局统计打分并各取 top-k，最后按分数归并。分数与把所有分片合成一个索引检索时相同。
+
+scripts/rebuild_indexes.mjs 把文件路径清单写到 architecture_base.index / prd_chunks.index，
+分片索引因此统一用 <name>_embeddings.index；构建前检查索引文件，已是路径清单时报错而不覆盖。
+
+分片登记在 index_shards.json（不存在时使用 DEFAULT_SHARDS）：
+    python prd_federated.py build                       # 构建全部分片
+    python prd_federated.py register adr docs/adr --index-file adr_embeddings.index
+    python prd_federated.py query "存储端口 事件流" --top-k 5
+"""
+
+import argparse
+import heapq
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from create_embeddings_index import create_embeddings_index, index_file_path
+from prd_search import collection_stats, load_search_index, merge_stats, search, tokenize
+
+DEFAULT_REGISTRY = 'index_shards.json'
+DEFAULT_SHARDS = [
+    # prd_chunks.index / architecture_base.index 是 scripts/rebuild_indexes.mjs 写的路径清单，不能复用
+    {"name": "prd", "index_file": "prd_chunks_embeddings.index", "source_dir": "docs/prd_chunks",
+     "document_type": "PRD"},
+    # 与 scripts/rebuild_indexes.mjs 一致，跳过 08-* 模板
+    {"name": "architecture_base", "index_file": "architecture_base_embeddings.index",
+     "source_dir": "docs/architecture/base",
+     "exclude": ["08-*"], "document_type": "Architecture"}
+]
+
+def load_registry(path=DEFAULT_REGISTRY):
+    """
+    读取分片登记表，返回分片列表
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)['shards']
+    except FileNotFoundError:
+        return [dict(shard) for shard in DEFAULT_SHARDS]
+
+def save_registry(shards, path=DEFAULT_REGISTRY):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"shards": shards}, f, indent=2, ensure_ascii=False)
+    return path
+
+def register_shard(name, index_file, source_dir, exclude=None, document_type='PRD', path=DEFAULT_REGISTRY):
+    """
+    登记（或更新同名）分片
+    """
+    shards = [shard for shard in load_registry(path) if shard['name'] != name]
+    shard = {"name": name, "index_file": index_file, "source_dir": source_dir, "document_type": document_type}
+    if exclude:
+        shard["exclude"] = list(exclude)
+    shards.append(shard)
+    return save_registry(shards, path)
+
+def check_index_file(index_file):
+    """
+    分片索引文件已存在时必须是 create_embeddings_index 写的 JSON / JSONL 索引；
+    其他内容（例如 scripts/rebuild_indexes.mjs 的路径清单）报错，避免构建时覆盖
+    """
+    try:
+        with open(index_file, 'r', encoding='utf-8') as f:
+            head = f.read(64).lstrip()
+    except FileNotFoundError:
+        return
+    except UnicodeDecodeError:
+        head = ''
+    if head and not head.startswith('{'):
+        raise ValueError(f"{index_file} is not an embeddings index (a path list from scripts/rebuild_indexes.mjs?); "
+                         f"register the shard with a different --index-file")
+
+def build_shards(shards, names=None, **kwargs):
+    """
+    逐个用 create_embeddings_index 构建分片索引，kwargs 原样传入（workers、incremental 等）
+    联邦检索要用各分片的 BM25 倒排索引，总是一并构建
+    """
+    for shard in shards:
+        if names and shard['name'] not in names:
+            continue
+        check_index_file(shard['index_file'])
+        print(f"[INFO] Building shard {shard['name']}: {shard['source_dir']} -> {shard['index_file']}")
+        create_embeddings_index(shard['source_dir'], shard['index_file'], exclude=shard.get('exclude', ()),
+                                document_type=shard.get('document_type', 'PRD'), search_index=True, **kwargs)
+
+class ShardedIndex:
+    """
+    分片检索；分片的倒排索引按需读取，文件重建后自动重新读取（见 prd_search.load_search_index）
+    """
+    def __init__(self, shards, max_workers=None):
+        self.shards = shards
+        self.max_workers = max_workers or max(1, len(shards))
+
+    def shard_index(self, shard):
+        return load_search_index(index_file_path(shard['index_file'], 'bm25'))
+
+    def search(self, query, top_k=10):
+        """
+        返回 [(分数, 文档元信息), ...]，文档元信息附带 shard（分片名）
+        """
+        terms = set(tokenize(query))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            indexes = list(executor.map(self.shard_index, self.shards))
+            stats = merge_stats(executor.map(lambda index: collection_stats(index, terms), indexes))
+            per_shard = list(executor.map(lambda index: search(index, query, top_k, stats), indexes))
+        # 同分时按分片顺序、分片内名次排列，结果稳定
+        merged = heapq.nlargest(top_k, (
+            (score, -shard_no, -rank, doc)
+            for shard_no, results in enumerate(per_shard)
+            for rank, (score, doc) in enumerate(results)
+        ), key=lambda hit: hit[:3])
+        return [(score, dict(doc, shard=self.shards[-neg_shard]['name'])) for score, neg_shard, _, doc in merged]
+
+def main():
+    parser = argparse.ArgumentParser(description='分片索引：登记、构建、联合检索')
+    parser.add_argument('--registry', default=DEFAULT_REGISTRY)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_build = sub.add_parser('build', help='构建分片索引')
+    p_build.add_argument('names', nargs='*', help='分片名，默认全部')
+    p_build.add_argument('--workers', type=int, default=1)
+    p_build.add_argument('--full', action='store_true', help='忽略旧索引，全量重建')
+
+    p_register = sub.add_parser('register', help='登记分片')
+    p_register.add_argument('name')
+    p_register.add_argument('source_dir')
+    p_register.add_argument('--index-file', help='默认 <name>_embeddings.index')
+    p_register.add_argument('--exclude', nargs='*', default=[], help='跳过的文件名通配符')
+    p_register.add_argument('--document-type', default='PRD')
+
+    p_query = sub.add_parser('query', help='跨分片检索')
+    p_query.add_argument('query')
+    p_query.add_argument('--shards', nargs='*', help='只检索这些分片')
+    p_query.add_argument('--top-k', type=int, default=10)
+    p_query.add_argument('--json', action='store_true', help='以 JSON 输出结果')
+    args = parser.parse_args()
+
+    shards = load_registry(args.registry)
+    if args.command == 'build':
+        try:
+            build_shards(shards, args.names, workers=args.workers, incremental=not args.full)
+        except ValueError as e:
+            parser.error(str(e))
+    elif args.command == 'register':
+        index_file = args.index_file or f"{args.name}_embeddings.index"
+        save_path = register_shard(args.name, index_file, args.source_dir, args.exclude,
+                                   args.document_type, args.registry)
+        print(f"[OK] Shard {args.name} registered in {save_path}")
+    else:
+        if args.shards:
+            shards = [shard for shard in shards if shard['name'] in args.shards]
+        missing = [shard['name'] for shard in shards
+                   if not Path(index_file_path(shard['index_file'], 'bm25')).exists()]
+        if missing:
+            parser.error(f"shard index not built: {', '.join(missing)} (run: python prd_federated.py build)")
+        start = time.perf_counter()
+        results = ShardedIndex(shards).search(args.query, args.top_k)
+        elapsed = (time.perf_counter() - start) * 1000
+        if args.json:
+            print(json.dumps([{"score": round(score, 4), **doc} for score, doc in results],
+                             ensure_ascii=False, indent=2))
+            return
+        for rank, (score, doc) in enumerate(results, 1):
+            print(f"{rank:2d}. [{score:.3f}] [{doc['shard']}] {doc['title']} ({doc['file']})")
+        print(f"\n[INFO] {len(results)} results from {len(shards)} shards in {elapsed:.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+紧凑的列式二进制索引：与 create_embeddings_index.py 生成的 JSON 索引等价，
+读取端 mmap 后只解码实际访问的行和列，不需要先解析整个文件
+
+文件布局（整数均为小端）：
+    头部     magic(8) version(u32) rows(u32) strings(u32) columns(u32) blobs(u32)
+             string_table_offset(u64) columns_offset(u64) blob_table_offset(u64) meta_offset(u64) meta_length(u64)
+    字符串   UTF-8 字符串依次拼接（id、文件名、标题、标签名等；文件名和标签名去重）
+    字符串表 strings + 1 个 u64 偏移，第 i 个字符串为 [offset[i], offset[i+1])
+    列数组   COLUMNS 中每列 rows 个定长值，按列连续存放；字符串列存字符串序号
+    变长数据 BLOBS 中每行的 tags / summary / metadata / extra 数据
+    变长表   按列连续存放，每行 (offset u64, length u32)
+    元信息   JSON：索引顶层除 documents 以外的字段
+
+presence 列按位记录每行实际存在的字段；类型不符合列定义的值放进 extra（JSON），
+字段顺序与 FIELD_ORDER 加 extra 的默认还原顺序不同时（例如去重写入的 minhash 在 content_hash 之前），
+extra 存成 [原始字段顺序, {...}]，保证 JSON -> 二进制 -> JSON 往返不丢信息、字段顺序不变。
+"""
+
+import argparse
+import json
+import mmap
+import shutil
+import struct
+import sys
+import tempfile
+from array import array
+
+MAGIC = b'PRDIDX01'
+VERSION = 1
+HEADER = struct.Struct('<8sIIIIIQQQQQ')
+BLOB_ENTRY = struct.Struct('<QI')
+# 写入时每列攒多少个值落一次盘
+SPILL_ROWS = 4096
+
+# (字段名, 存储格式)；'s' 表示字符串列，存 u32 字符串序号
+COLUMNS = [
+    ('id', 's'),
+    ('file', 's'),
+    ('chunk_number', 'I'),
+    ('title', 's'),
+    ('size', 'I'),
+    ('char_count', 'I'),
+    ('line_count', 'I'),
+    ('content_hash', 's'),
+    ('file_size', 'Q'),
+    ('file_mtime', 'd'),
+]
+BLOBS = ['tags', 'summary', 'metadata', 'extra']
+# 在多行之间重复出现、值得去重的字符串列（标签名也去重）
+SHARED_STRINGS = {'file'}
+# presence 位：先是 COLUMNS，再是 tags / summary / metadata
+FIELD_BITS = {name: bit for bit, name in enumerate([c for c, _ in COLUMNS] + BLOBS[:3])}
+# 还原 JSON 条目时的字段顺序（与 build_doc_entry 一致）
+FIELD_ORDER = ['id', 'file', 'chunk_number', 'title', 'size', 'char_count', 'line_count', 'metadata',
+               'tags', 'tag_hits', 'summary', 'content_hash', 'file_size', 'file_mtime']
+
+def column_width(fmt):
+    return struct.calcsize('<' + ('I' if fmt == 's' else fmt))
+
+def fits_column(value, fmt):
+    if fmt == 's':
+        return isinstance(value, str)
+    if fmt == 'd':
+        return isinstance(value, float)
+    limit = 1 << (8 * column_width(fmt))
+    return isinstance(value, int) and not isinstance(value, bool) and 0 <= value < limit
+
+def compact_json(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+class SpillArray:
+    """
+    追加写的定长数组：每攒满 SPILL_ROWS 个值就以小端字节写入临时文件，内存里只留一小段缓冲
+    """
+    def __init__(self, typecode):
+        self.typecode = typecode
+        self.buffer = array(typecode)
+        self.file = tempfile.TemporaryFile()
+
+    def append(self, value):
+        self.buffer.append(value)
+        if len(self.buffer) >= SPILL_ROWS:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            if sys.byteorder == 'big':
+                self.buffer.byteswap()
+            self.file.write(self.buffer.tobytes())
+            self.buffer = array(self.typecode)
+
+    def copy_to(self, f):
+        """
+        原样拷贝到输出文件（已是小端）
+        """
+        self.flush()
+        self.file.seek(0)
+        shutil.copyfileobj(self.file, f, 1 << 20)
+
+    def chunks(self):
+        """
+        按块读回为本机字节序的 array
+        """
+        self.flush()
+        self.file.seek(0)
+        step = SPILL_ROWS * self.buffer.itemsize
+        while True:
+            raw = self.file.read(step)
+            if not raw:
+                return
+            data = array(self.typecode)
+            data.frombytes(raw)
+            if sys.byteorder == 'big':
+                data.byteswap()
+            yield data
+
+    def close(self):
+        self.file.close()
+
+class SpillBlobs:
+    """
+    一种变长数据：内容追加写入临时文件，长度记在 SpillArray 里
+    """
+    def __init__(self):
+        self.file = tempfile.TemporaryFile()
+        self.lengths = SpillArray('I')
+        self.size = 0
+
+    def append(self, data):
+        self.file.write(data)
+        self.lengths.append(len(data))
+        self.size += len(data)
+
+    def copy_to(self, f):
+        self.file.seek(0)
+        shutil.copyfileobj(self.file, f, 1 << 20)
+
+    def close(self):
+        self.file.close()
+        self.lengths.close()
+
+class StringTable:
+    """
+    字符串内容和起始偏移都随写随落盘；只有 shared=True 的字符串（文件名、标签名等重复出现的值）
+    才记进去重字典，每行唯一的 id / 标题 / 哈希不占常驻内存
+    """
+    def __init__(self):
+        self.ids = {}
+        self.count = 0
+        self.size = 0
+        self.file = tempfile.TemporaryFile()
+        self.offsets = SpillArray('Q')
+
+    def add(self, text, shared=False):
+        sid = self.ids.get(text) if shared else None
+        if sid is None:
+            sid = self.count
+            if shared:
+                self.ids[text] = sid
+            data = text.encode('utf-8')
+            self.offsets.append(self.size)
+            self.file.write(data)
+            self.size += len(data)
+            self.count += 1
+        return sid
+
+    def close(self):
+        self.file.close()
+        self.offsets.close()
+
+def write_index_store(index_data, path):
+    """
+    把 JSON 索引结构（dict）写成列式二进制文件；documents 可以是任意可迭代对象。
+    各列、变长数据和字符串边读边写进临时文件，最后按布局顺序拼接，内存占用不随行数增长
+    """
+    documents = index_data.get('documents', [])
+    rows = 0
+    strings = StringTable()
+    columns = {name: SpillArray('d' if fmt == 'd' else ('Q' if fmt == 'Q' else 'I')) for name, fmt in COLUMNS}
+    presence = SpillArray('I')
+    blobs = {name: SpillBlobs() for name in BLOBS}
+
+    try:
+        for doc in documents:
+            mask = 0
+            extra = {}
+            for name, fmt in COLUMNS:
+                value = doc.get(name)
+                if name in doc and fits_column(value, fmt):
+                    mask |= 1 << FIELD_BITS[name]
+                    columns[name].append(strings.add(value, name in SHARED_STRINGS) if fmt == 's' else value)
+                else:
+                    columns[name].append(0)
+                    if name in doc:
+                        extra[name] = value
+
+            tags, tag_hits = doc.get('tags'), doc.get('tag_hits')
+            if (isinstance(tags, list) and all(isinstance(t, str) for t in tags)
+                    and isinstance(tag_hits, dict) and list(tag_hits) == tags
+                    and all(fits_column(v, 'I') for v in tag_hits.values())):
+                mask |= 1 << FIELD_BITS['tags']
+                packed = array('I', [len(tags)] + [strings.add(t, True) for t in tags] + list(tag_hits.values()))
+                if sys.byteorder == 'big':
+                    packed.byteswap()
+                blobs['tags'].append(packed.tobytes())
+            else:
+                blobs['tags'].append(b'')
+                for name in ('tags', 'tag_hits'):
+                    if name in doc:
+                        extra[name] = doc[name]
+
+            if isinstance(doc.get('summary'), str):
+                mask |= 1 << FIELD_BITS['summary']
+                blobs['summary'].append(doc['summary'].encode('utf-8'))
+            else:
+                blobs['summary'].append(b'')
+                if 'summary' in doc:
+                    extra['summary'] = doc['summary']
+
+            if 'metadata' in doc:
+                mask |= 1 << FIELD_BITS['metadata']
+                blobs['metadata'].append(compact_json(doc['metadata']))
+            else:
+                blobs['metadata'].append(b'')
+
+            for key, value in doc.items():
+                if key not in FIELD_ORDER:
+                    extra[key] = value
+            keys = list(doc)
+            if keys != [k for k in FIELD_ORDER if k in doc] + [k for k in keys if k not in FIELD_ORDER]:
+                extra = [keys, extra]
+            blobs['extra'].append(compact_json(extra) if extra else b'')
+            presence.append(mask)
+            rows += 1
+
+        with open(path, 'wb') as f:
+            f.write(b'\0' * HEADER.size)
+
+            strings_offset = f.tell()
+            strings.file.seek(0)
+            shutil.copyfileobj(strings.file, f, 1 << 20)
+            string_table_offset = f.tell()
+            for chunk in strings.offsets.chunks():
+                f.write(struct.pack(f'<{len(chunk)}Q', *(strings_offset + offset for offset in chunk)))
+            f.write(struct.pack('<Q', strings_offset + strings.size))
+
+            columns_offset = f.tell()
+            for name, _ in COLUMNS:
+                columns[name].copy_to(f)
+            presence.copy_to(f)
+
+            blob_offsets = []
+            for name in BLOBS:
+                blob_offsets.append(f.tell())
+                blobs[name].copy_to(f)
+            blob_table_offset = f.tell()
+            for name, offset in zip(BLOBS, blob_offsets):
+                for chunk in blobs[name].lengths.chunks():
+                    entries = []
+                    for length in chunk:
+                        entries.append(BLOB_ENTRY.pack(offset, length))
+                        offset += length
+                    f.write(b''.join(entries))
+
+            meta_offset = f.tell()
+            meta = compact_json({k: v for k, v in index_data.items() if k != 'documents'})
+            f.write(meta)
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, VERSION, rows, strings.count, len(COLUMNS), len(BLOBS),
+                                string_table_offset, columns_offset, blob_table_offset, meta_offset, len(meta)))
+    finally:
+        strings.close()
+        presence.close()
+        for spill in list(columns.values()) + list(blobs.values()):
+            spill.close()
+    return path
+
+class IndexStore:
+    """
+    只读打开列式二进制索引（mmap）；行、列、字符串都在访问时才解码
+    """
+    def __init__(self, path):
+        self.path = str(path)
+        with open(self.path, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.rows, self.string_count, n_columns, n_blobs, self.string_table_offset,
+         self.columns_offset, self.blob_table_offset, self.meta_offset, self.meta_length) = \
+            HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION or n_columns != len(COLUMNS) or n_blobs != len(BLOBS):
+            self.mm.close()
+            raise ValueError(f"Not a columnar index file: {self.path}")
+
+        self.column_offsets = {}
+        offset = self.columns_offset
+        for name, fmt in COLUMNS:
+            self.column_offsets[name] = (offset, fmt)
+            offset += column_width(fmt) * self.rows
+        self.presence_offset = offset
+        self._meta = None
+        self._id_rows = None
+
+    def __len__(self):
+        return self.rows
+
+    def string(self, sid):
+        start, end = struct.unpack_from('<QQ', self.mm, self.string_table_offset + sid * 8)
+        return self.mm[start:end].decode('utf-8')
+
+    def _check_row(self, row):
+        if not 0 <= row < self.rows:
+            raise IndexError(row)
+
+    def has(self, row, name):
+        self._check_row(row)
+        mask, = struct.unpack_from('<I', self.mm, self.presence_offset + row * 4)
+        return bool(mask >> FIELD_BITS[name] & 1)
+
+    def value(self, row, name):
+        """
+        读取单行单列；字段不存在时返回 None（类型特殊的值见 extra）
+        """
+        if not self.has(row, name):
+            return None
+        offset, fmt = self.column_offsets[name]
+        raw, = struct.unpack_from('<' + ('I' if fmt == 's' else fmt), self.mm, offset + row * column_width(fmt))
+        return self.string(raw) if fmt == 's' else raw
+
+    def column(self, name):
+        """
+        整列读取为 array（只拷贝这一列）；字符串列返回字符串序号
+        """
+        offset, fmt = self.column_offsets[name]
+        data = array('I' if fmt == 's' else fmt)
+        data.frombytes(self.mm[offset:offset + column_width(fmt) * self.rows])
+        if sys.byteorder == 'big':
+            data.byteswap()
+        return data
+
+    def blob(self, row, name):
+        self._check_row(row)
+        entry = self.blob_table_offset + (BLOBS.index(name) * self.rows + row) * BLOB_ENTRY.size
+        offset, length = BLOB_ENTRY.unpack_from(self.mm, entry)
+        return self.mm[offset:offset + length]
+
+    def tag_hits(self, row):
+        """
+        返回 {标签: 命中次数}，按排名顺序
+        """
+        if not self.has(row, 'tags'):
+            return None
+        packed = array('I')
+        packed.frombytes(self.blob(row, 'tags'))
+        if sys.byteorder == 'big':
+            packed.byteswap()
+        n = packed[0]
+        return {self.string(sid): count for sid, count in zip(packed[1:1 + n], packed[1 + n:])}
+
+    def tags(self, row):
+        hits = self.tag_hits(row)
+        return None if hits is None else list(hits)
+
+    def summary(self, row):
+        return self.blob(row, 'summary').decode('utf-8') if self.has(row, 'summary') else None
+
+    def metadata(self, row):
+        return json.loads(self.blob(row, 'metadata')) if self.has(row, 'metadata') else None
+
+    def document(self, row):
+        """
+        还原与 JSON 索引完全一致的文档条目
+        """
+        self._check_row(row)
+        raw_extra = self.blob(row, 'extra')
+        extra = json.loads(raw_extra) if raw_extra else {}
+        keys = None
+        if isinstance(extra, list):
+            keys, extra = extra
+        doc = {}
+        for name in FIELD_ORDER:
+            if name in extra:
+                doc[name] = extra.pop(name)
+            elif name in self.column_offsets:
+                if self.has(row, name):
+                    doc[name] = self.value(row, name)
+            elif name in ('tags', 'tag_hits'):
+                if self.has(row, 'tags'):
+                    doc[name] = self.tag_hits(row) if name == 'tag_hits' else self.tags(row)
+            elif name == 'summary':
+                if self.has(row, 'summary'):
+                    doc[name] = self.summary(row)
+            elif name == 'metadata':
+                if self.has(row, 'metadata'):
+                    doc[name] = self.metadata(row)
+        doc.update(extra)
+        return doc if keys is None else {key: doc[key] for key in keys}
+
+    def __getitem__(self, row):
+        return self.document(row)
+
+    def __iter__(self):
+        for row in range(self.rows):
+            yield self.document(row)
+
+    def find(self, doc_id):
+        """
+        按文档 id 查行号（首次调用时扫描 id 列建表）
+        """
+        if self._id_rows is None:
+            ids = self.column('id')
+            self._id_rows = {self.string(sid): row for row, sid in enumerate(ids) if self.has(row, 'id')}
+        return self._id_rows.get(doc_id)
+
+    @property
+    def index_meta(self):
+        if self._meta is None:
+            self._meta = json.loads(self.mm[self.meta_offset:self.meta_offset + self.meta_length])
+        return self._meta
+
+    def to_dict(self):
+        return dict(self.index_meta, documents=list(self))
+
+    def close(self):
+        self.mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def json_to_store(json_path, store_path):
+    with open(json_path, 'r', encoding='utf-8') as f:
+        return write_index_store(json.load(f), store_path)
+
+def store_to_json(store_path, json_path):
+    with IndexStore(store_path) as store:
+        index_data = store.to_dict()
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(index_data, f, indent=2, ensure_ascii=False)
+    return json_path
+
+def main():
+    parser = argparse.ArgumentParser(description='JSON 索引与列式二进制索引互转')
+    parser.add_argument('direction', choices=['to-binary', 'to-json'])
+    parser.add_argument('source')
+    parser.add_argument('target')
+    args = parser.parse_args()
+
+    if args.direction == 'to-binary':
+        json_to_store(args.source, args.target)
+    else:
+        store_to_json(args.source, args.target)
+    print(f"[SUCCESS] {args.source} -> {args.target}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,458 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+压缩倒排表：文档号差值 + varint 编码，每 SKIP_INTERVAL 条记录一个跳表指针，跳表项带块内最大得分
+
+与 <index>_bm25.index 的 JSON 整数列表等价，由 create_embeddings_index.py --compressed-postings
+在写 BM25 索引的同一遍归并中生成 <index>_postings.index。读取端 mmap，词典在打开时读入，
+倒排表按需解码：求交（AND）通过跳表指针直接跳到目标文档附近，top-k 按块最大得分整段跳过区间，都不解码跳过的块。
+
+块内最大得分是块内各记录 BM25 词频因子 tf·(k1+1) / (tf + k1·(1 - b + b·dl/avgdl)) 的最大值，
+按 SCORE_SCALE 向上量化成整数存放；它按各记录的实际文档长度算出，比“最大词频 + 文档长度 0”的全局上界紧得多。
+
+文件布局（整数均为小端）：
+    magic(8)
+    倒排表   每个词项依次存放：
+             跳表   varint 块数，之后每块 (varint 块末尾文档号的差值, varint 块起始字节偏移的差值,
+                    varint 块内最大得分)，首块的差值相对 -1 和 0
+             记录   每条 (varint 文档号与上一条的差值, varint 词频)，首条相对 -1
+    尾部 JSON   BM25 索引除 postings 外的顶层字段 + skip_interval + score_scale
+                + terms {词项: [文档数, 偏移, 字节数]}
+    尾标   json_offset(u64) json_length(u64) magic(8)
+
+    python prd_postings.py "公会 赛季" --index prd_chunks_postings.index --mode and
+"""
+
+import argparse
+import bisect
+import heapq
+import json
+import math
+import mmap
+import struct
+import time
+from collections import Counter
+
+from prd_search import tokenize
+
+MAGIC = b'PRDPST02'
+TRAILER = struct.Struct('<QQ8s')
+SKIP_INTERVAL = 32
+SCORE_SCALE = 1 << 16     # 块内最大得分的量化精度
+END = float('inf')
+
+def encode_varint(value, out):
+    while value >= 0x80:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+
+def decode_varint(buf, pos):
+    """
+    返回 (值, 下一个字节位置)
+    """
+    byte = buf[pos]
+    if byte < 0x80:
+        return byte, pos + 1
+    value = byte & 0x7f
+    shift = 7
+    while True:
+        pos += 1
+        byte = buf[pos]
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, pos + 1
+        shift += 7
+
+def tf_factor(tf, doc_length, k1, b, avgdl):
+    """
+    BM25 的词频因子（不含 idf 和查询词频），与 CompressedIndex.score / prd_search.search 的算式相同
+    """
+    return tf * (k1 + 1) / (tf + k1 * (1 - b + b * doc_length / avgdl))
+
+def quantize_score(score):
+    """
+    向上量化：返回的整数除以 SCORE_SCALE 严格大于 score
+    """
+    return int(score * SCORE_SCALE) + 1
+
+def encode_postings(ids, tfs, block_scores, skip_interval=SKIP_INTERVAL):
+    """
+    编码一个词项的倒排表（文档号升序），block_scores 为每条记录的词频因子，返回字节串
+    """
+    data = bytearray()
+    blocks = []   # 每块的 (末尾文档号, 块起始偏移, 块内最大量化得分)
+    prev = -1
+    for start in range(0, len(ids), skip_interval):
+        offset = len(data)
+        for doc, tf in zip(ids[start:start + skip_interval], tfs[start:start + skip_interval]):
+            encode_varint(doc - prev, data)
+            encode_varint(tf, data)
+            prev = doc
+        blocks.append((prev, offset, quantize_score(max(block_scores[start:start + skip_interval]))))
+    out = bytearray()
+    encode_varint(len(blocks), out)
+    last_doc, last_offset = -1, 0
+    for doc, offset, score in blocks:
+        encode_varint(doc - last_doc, out)
+        encode_varint(offset - last_offset, out)
+        encode_varint(score, out)
+        last_doc, last_offset = doc, offset
+    return bytes(out + data)
+
+class PostingCursor:
+    """
+    倒排表游标：doc / tf 为当前记录，读完后 doc 为 END
+    next() 前进一条；advance(target) 前进到第一个文档号 >= target 的记录，先按跳表跳过整块；
+    block(k) 整块解码第 k 块（lasts / scores 为各块的末尾文档号和最大量化得分）
+    buf 可以是整个 mmap，倒排表从 start 开始，位置都是 buf 内的绝对偏移，打开游标不复制字节
+    """
+    __slots__ = ('buf', 'df', 'interval', 'bases', 'lasts', 'scores', 'offsets', 'data_start', 'pos', 'i',
+                 'doc', 'tf', 'decoded')
+
+    def __init__(self, buf, df, skip_interval, start=0):
+        self.buf = buf
+        self.df = df
+        self.interval = skip_interval
+        count, pos = decode_varint(buf, start)
+        self.lasts = []        # 每块的末尾文档号
+        self.offsets = []      # 每块相对数据区的起始偏移
+        self.scores = []       # 每块的最大量化得分
+        last, offset = -1, 0
+        for _ in range(count):
+            delta, pos = decode_varint(buf, pos)
+            step, pos = decode_varint(buf, pos)
+            score, pos = decode_varint(buf, pos)
+            last += delta
+            offset += step
+            self.lasts.append(last)
+            self.offsets.append(offset)
+            self.scores.append(score)
+        self.bases = [-1] + self.lasts[:-1]   # 每块之前的最后一个文档号
+        self.data_start = pos
+        self.pos = pos
+        self.i = -1
+        self.doc = -1
+        self.tf = 0
+        self.decoded = 0       # 实际解码的记录数（基准统计用）
+        self.next()
+
+    def next(self):
+        self.i += 1
+        if self.i >= self.df:
+            self.doc = END
+            return END
+        # 单字节是最常见的情况，直接读取，省掉函数调用
+        buf, pos = self.buf, self.pos
+        delta = buf[pos]
+        if delta < 0x80:
+            pos += 1
+        else:
+            delta, pos = decode_varint(buf, pos)
+        tf = buf[pos]
+        if tf < 0x80:
+            pos += 1
+        else:
+            tf, pos = decode_varint(buf, pos)
+        self.pos = pos
+        self.tf = tf
+        self.doc += delta
+        self.decoded += 1
+        return self.doc
+
+    def advance(self, target):
+        if self.doc >= target:
+            return self.doc
+        block = self.i // self.interval
+        # 块 k 的文档号都大于 bases[k]：找最后一个 bases[k] < target 的块
+        k = bisect.bisect_left(self.bases, target, block + 1) - 1
+        if k > block:
+            self.pos = self.data_start + self.offsets[k]
+            self.doc = self.bases[k]
+            self.i = k * self.interval - 1
+        while self.next() < target:
+            pass
+        return self.doc
+
+    def block(self, k):
+        """
+        整块解码第 k 块，返回 ([文档号...], [词频...])，不移动游标
+        """
+        buf = self.buf
+        pos = self.data_start + self.offsets[k]
+        doc = self.bases[k]
+        ids, tfs = [], []
+        for _ in range(min(self.interval, self.df - k * self.interval)):
+            delta = buf[pos]
+            if delta < 0x80:
+                pos += 1
+            else:
+                delta, pos = decode_varint(buf, pos)
+            tf = buf[pos]
+            if tf < 0x80:
+                pos += 1
+            else:
+                tf, pos = decode_varint(buf, pos)
+            doc += delta
+            ids.append(doc)
+            tfs.append(tf)
+        self.decoded += len(ids)
+        return ids, tfs
+
+class CompressedIndex:
+    """
+    只读打开压缩倒排索引（mmap）；search() 的分数和排序与 prd_search.search 相同
+    """
+    def __init__(self, path):
+        self.path = str(path)
+        with open(self.path, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        meta_offset, meta_length, magic = TRAILER.unpack_from(self.mm, len(self.mm) - TRAILER.size)
+        if self.mm[:len(MAGIC)] != MAGIC or magic != MAGIC:
+            self.mm.close()
+            raise ValueError(f"Not a compressed postings file: {self.path}")
+        self.meta = json.loads(self.mm[meta_offset:meta_offset + meta_length].decode('utf-8'))
+        self.terms = self.meta['terms']
+        self.docs = self.meta['docs']
+        self.doc_lengths = self.meta['doc_lengths']
+        self.skip_interval = self.meta['skip_interval']
+        self.score_scale = self.meta['score_scale']
+        self.last_stats = {}
+
+    def cursor(self, term):
+        entry = self.terms.get(term)
+        if entry is None:
+            return None
+        df, offset, _ = entry
+        return PostingCursor(self.mm, df, self.skip_interval, offset)
+
+    def postings(self, term):
+        """
+        完整解码一个词项，返回 ([文档号...], [词频...])
+        """
+        cur = self.cursor(term)
+        ids, tfs = [], []
+        while cur is not None and cur.doc != END:
+            ids.append(cur.doc)
+            tfs.append(cur.tf)
+            cur.next()
+        return ids, tfs
+
+    def query_terms(self, query):
+        """
+        返回 [(游标, qtf, idf, 量化得分到分数上界的系数)]，顺序与 prd_search.search 累加分数的顺序一致
+        """
+        n = self.meta['total_documents']
+        terms = []
+        for term, qtf in Counter(tokenize(query)).items():
+            cur = self.cursor(term)
+            if cur is None:
+                terms.append(None)
+                continue
+            idf = math.log(1 + (n - cur.df + 0.5) / (cur.df + 0.5))
+            # 块的量化得分乘以这个系数即为块内分数的上界；留一点余量吸收浮点累加误差
+            terms.append((cur, qtf, idf, qtf * idf / self.score_scale * (1 + 1e-9)))
+        return terms
+
+    def score(self, terms, doc):
+        k1 = self.meta['scoring']['k1']
+        b = self.meta['scoring']['b']
+        avgdl = self.meta['avg_doc_length'] or 1.0
+        norm_dl = 1 - b + b * self.doc_lengths[doc] / avgdl
+        score = 0.0
+        for cur, qtf, idf, _ in terms:
+            if cur.doc == doc:
+                score += qtf * idf * (cur.tf * (k1 + 1) / (cur.tf + k1 * norm_dl))
+        return score
+
+    def search(self, query, top_k=10, mode='or'):
+        """
+        BM25 检索，返回 [(分数, 文档元信息), ...]
+        mode='or' 按块最大得分求 top-k：块上界之和达不到当前第 k 名的文档区间整段跳过，不解码（见 _block_max）；
+        mode='and' 只返回包含全部查询词项的文档，求交时用跳表前进
+        """
+        if not self.meta['total_documents'] or top_k <= 0:
+            return []
+        terms = self.query_terms(query)
+        if mode == 'and':
+            if not terms or None in terms:
+                return []
+            hits = self._conjunctive(terms, top_k)
+        else:
+            hits = self._block_max([t for t in terms if t is not None], top_k)
+        # 本次查询的倒排记录总数和实际解码数
+        present = [t[0] for t in terms if t is not None]
+        self.last_stats = {"postings": sum(cur.df for cur in present),
+                           "decoded": sum(cur.decoded for cur in present)}
+        return [(score, self.docs[-neg_doc]) for score, neg_doc in sorted(hits, reverse=True)]
+
+    def _push(self, heap, top_k, score, doc):
+        item = (score, -doc)
+        if len(heap) < top_k:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+
+    def _conjunctive(self, terms, top_k):
+        heap = []
+        # 从最短的倒排表出发，其余游标跳到它的文档号
+        by_df = sorted(terms, key=lambda t: t[0].df)
+        lead = by_df[0][0]
+        doc = lead.doc
+        while doc != END:
+            candidate = doc
+            for cur, *_ in by_df[1:]:
+                candidate = cur.advance(doc)
+                if candidate != doc:
+                    break
+            if candidate == doc:
+                self._push(heap, top_k, self.score(terms, doc), doc)
+                doc = lead.next()
+            else:
+                doc = lead.advance(candidate)
+        return heap
+
+    def _block_max(self, terms, top_k):
+        """
+        所有词项的块边界把文档号切成若干区间 (lo, hi]，每个区间落在各词项的某一块之内，
+        区间上界 = 覆盖它的各块最大得分 × 系数之和。区间按上界从高到低处理，阈值（当前第 k 名的分数）
+        很快升高；剩余区间的上界低于阈值时整体结束，这些区间的块都不解码。处理一个区间时：
+        按上界从小到大取出合计低于阈值的词项作为“非必要”词项，只含这些词项的文档进不了 top-k，
+        候选文档只来自其余词项的块；候选的已知分数加上非必要词项的上界仍低于阈值时不再解码非必要词项的块。
+        候选的分数按 prd_search.search 的词项顺序累加，结果与之相同（同分按文档号，比较都用严格小于）。
+        """
+        k1 = self.meta['scoring']['k1']
+        b = self.meta['scoring']['b']
+        avgdl = self.meta['avg_doc_length'] or 1.0
+        doc_lengths = self.doc_lengths
+        blocks = {}   # (词项序号, 块号) -> 解码后的 (文档号, 词频)
+
+        def contributions(j, k, lo, hi):
+            cur, qtf, idf, _ = terms[j]
+            if (j, k) not in blocks:
+                blocks[j, k] = cur.block(k)
+            ids, tfs = blocks[j, k]
+            start, end = bisect.bisect_right(ids, lo), bisect.bisect_right(ids, hi)
+            for doc, tf in zip(ids[start:end], tfs[start:end]):
+                yield doc, qtf * idf * (tf * (k1 + 1) / (tf + k1 * (1 - b + b * doc_lengths[doc] / avgdl)))
+
+        # 切分区间，记下每个区间覆盖它的 [(块上界, 词项序号, 块号)]
+        intervals = []
+        current = [0] * len(terms)
+        lo = -1
+        for hi in sorted(set().union(*(t[0].lasts for t in terms))):
+            live = []
+            for j, (cur, _, _, weight) in enumerate(terms):
+                k = current[j]
+                while k < len(cur.lasts) and cur.lasts[k] < hi:
+                    k += 1
+                current[j] = k
+                if k < len(cur.lasts):
+                    live.append((cur.scores[k] * weight, j, k))
+            intervals.append((sum(bound for bound, _, _ in live), lo, hi, live))
+            lo = hi
+        intervals.sort(key=lambda interval: -interval[0])
+
+        heap = []
+        for bound, lo, hi, live in intervals:
+            threshold = heap[0][0] if len(heap) >= top_k else -1.0
+            if bound < threshold:
+                break
+            live.sort()
+            optional_bound = 0.0
+            split = 0
+            while split < len(live) and optional_bound + live[split][0] < threshold:
+                optional_bound += live[split][0]
+                split += 1
+            partial = {}   # 文档号 -> {词项序号: 分数}
+            for _, j, k in live[split:]:
+                for doc, value in contributions(j, k, lo, hi):
+                    partial.setdefault(doc, {})[j] = value
+            candidates = [doc for doc, parts in partial.items() if sum(parts.values()) + optional_bound >= threshold]
+            if candidates and split:
+                wanted = set(candidates)
+                for _, j, k in live[:split]:
+                    for doc, value in contributions(j, k, lo, hi):
+                        if doc in wanted:
+                            partial[doc][j] = value
+            for doc in candidates:
+                score = 0.0
+                for j in sorted(partial[doc]):
+                    score += partial[doc][j]
+                self._push(heap, top_k, score, doc)
+        return heap
+
+    def close(self):
+        self.mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class CompressedPostingsWriter:
+    """
+    流式写出压缩倒排索引：按词项顺序 add()，最后 close(header) 写入词典和尾标
+    header 为 BM25 索引的顶层字段（打分参数和文档长度），块内最大得分据此计算
+    可作为 BM25IndexBuilder.write 的 sink，与 JSON 索引在同一遍归并中生成
+    """
+    def __init__(self, path, header, skip_interval=SKIP_INTERVAL):
+        self.path = str(path)
+        self.skip_interval = skip_interval
+        self.k1 = header['scoring']['k1']
+        self.b = header['scoring']['b']
+        self.avgdl = header['avg_doc_length'] or 1.0
+        self.doc_lengths = header['doc_lengths']
+        self.f = open(self.path, 'wb')
+        self.f.write(MAGIC)
+        self.offset = len(MAGIC)
+        self.terms = {}
+
+    def add(self, term, ids, tfs):
+        k1, b, avgdl, doc_lengths = self.k1, self.b, self.avgdl, self.doc_lengths
+        scores = [tf_factor(tf, doc_lengths[doc], k1, b, avgdl) for doc, tf in zip(ids, tfs)]
+        blob = encode_postings(ids, tfs, scores, self.skip_interval)
+        self.f.write(blob)
+        self.terms[term] = [len(ids), self.offset, len(blob)]
+        self.offset += len(blob)
+
+    def close(self, header):
+        meta = json.dumps(dict(header, skip_interval=self.skip_interval, score_scale=SCORE_SCALE, terms=self.terms),
+                          ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.f.write(meta)
+        self.f.write(TRAILER.pack(self.offset, len(meta), MAGIC))
+        self.f.close()
+        return self.path
+
+def json_to_postings(json_path, postings_path, skip_interval=SKIP_INTERVAL):
+    """
+    把已有的 <index>_bm25.index 转成压缩倒排索引
+    """
+    with open(json_path, 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    postings = index.pop('postings')
+    index.pop('index_hash', None)
+    writer = CompressedPostingsWriter(postings_path, index, skip_interval)
+    for term, (ids, tfs) in postings.items():
+        writer.add(term, ids, tfs)
+    return writer.close(index)
+
+def main():
+    parser = argparse.ArgumentParser(description='压缩倒排索引检索')
+    parser.add_argument('query')
+    parser.add_argument('--index', default='prd_chunks_postings.index')
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--mode', choices=['or', 'and'], default='or', help='or：任一词项（块最大得分剪枝），and：全部词项')
+    args = parser.parse_args()
+
+    with CompressedIndex(args.index) as index:
+        start = time.perf_counter()
+        results = index.search(args.query, args.top_k, args.mode)
+        elapsed = (time.perf_counter() - start) * 1000
+        for rank, (score, doc) in enumerate(results, 1):
+            print(f"{rank:2d}. [{score:.3f}] {doc['title']} ({doc['file']})")
+    print(f"\n[INFO] {len(results)} results in {elapsed:.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+检索结果缓存：LRU，同时按条目数和字节数限额
+
+BM25 的键为分词后的词项计数（与词序、大小写、空白无关）加检索参数；
+向量检索的键为只合并空白的查询原文，不假设嵌入方式与 BM25 分词一致。
+每次查询带上命名空间（bm25 / vector）和索引标识（index_hash），
+标识变化说明索引已重建，该命名空间下的缓存全部丢弃；索引没有 index_hash 时拒绝缓存。
+
+    python prd_query_cache.py queries.txt --index prd_chunks_bm25.index
+"""
+
+import argparse
+import json
+import os
+import time
+from collections import Counter, OrderedDict
+
+from prd_search import load_search_index, search, tokenize
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+
+def normalize_query(query):
+    """
+    BM25 只依赖词项计数，词项计数相同的查询结果相同
+    """
+    return tuple(sorted(Counter(tokenize(query)).items()))
+
+def normalize_text(query):
+    """
+    向量检索的键：去掉首尾空白、连续空白合并为一个空格，其余保持原文
+    """
+    return ' '.join(query.split())
+
+def require_index_hash(meta, name):
+    """
+    取索引标识；没有标识就无法判断索引是否重建过，缓存可能返回旧结果，直接报错
+    """
+    token = meta.get('index_hash')
+    if not token:
+        raise ValueError(f"{name} has no index_hash; rebuild it with create_embeddings_index.py "
+                         f"before using the query cache")
+    return token
+
+def result_size(key, results):
+    """
+    估算一条缓存占用的字节数（按 JSON 序列化长度计）
+    """
+    return len(json.dumps([key, results], ensure_ascii=False, default=str).encode('utf-8'))
+
+class QueryCache:
+    """
+    LRU 结果缓存；hits / misses / evictions / invalidations 计数可通过 stats() 读取
+    """
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()   # (命名空间, 键) -> (结果, 字节数)
+        self.bytes = 0
+        self.tokens = {}               # 命名空间 -> 索引标识
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def validate(self, namespace, token):
+        """
+        索引标识变化时丢弃该命名空间下的全部条目
+        """
+        if self.tokens.get(namespace, token) != token:
+            stale = [key for key in self.entries if key[0] == namespace]
+            for key in stale:
+                self.bytes -= self.entries.pop(key)[1]
+            if stale:
+                self.invalidations += 1
+        self.tokens[namespace] = token
+
+    def get(self, namespace, key, token):
+        self.validate(namespace, token)
+        entry = self.entries.get((namespace, key))
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end((namespace, key))
+        self.hits += 1
+        return entry[0]
+
+    def put(self, namespace, key, token, results):
+        self.validate(namespace, token)
+        key = (namespace, key)
+        size = result_size(key, results)
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old[1]
+        self.entries[key] = (results, size)
+        self.bytes += size
+        while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+            _, (_, evicted) = self.entries.popitem(last=False)
+            self.bytes -= evicted
+            self.evictions += 1
+
+    def lookup(self, namespace, key, token, compute):
+        """
+        命中直接返回，否则调用 compute() 并写入缓存；返回结果列表的浅拷贝
+        """
+        results = self.get(namespace, key, token)
+        if results is None:
+            results = compute()
+            self.put(namespace, key, token, results)
+        return list(results)
+
+    def clear(self):
+        self.entries.clear()
+        self.tokens.clear()
+        self.bytes = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "entries": len(self.entries),
+            "bytes": self.bytes
+        }
+
+_default_cache = QueryCache()
+
+def default_cache():
+    return _default_cache
+
+def cached_search(index, query, top_k=10, cache=None):
+    """
+    带缓存的 BM25 检索（见 prd_search.search），索引以 index_hash 标识
+    """
+    cache = _default_cache if cache is None else cache
+    token = require_index_hash(index, 'BM25 index')
+    return cache.lookup('bm25', (normalize_query(query), top_k), token,
+                        lambda: search(index, query, top_k))
+
+def cached_vector_search(vector_index, query, top_k=10, nprobe=None, cache=None):
+    """
+    带缓存的向量检索（见 prd_vector_index.VectorIndex.search），以规范化后的查询原文为键
+    """
+    cache = _default_cache if cache is None else cache
+    token = require_index_hash(vector_index.meta, 'Vector index')
+    return cache.lookup('vector', (normalize_text(query), top_k, nprobe), token,
+                        lambda: vector_index.search(query, top_k, nprobe))
+
+def main():
+    parser = argparse.ArgumentParser(description='带缓存的批量检索：逐行读取查询，输出命中统计')
+    parser.add_argument('queries_file', help='每行一个查询')
+    parser.add_argument('--index', default='prd_chunks_bm25.index')
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--max-entries', type=int, default=DEFAULT_MAX_ENTRIES)
+    parser.add_argument('--max-bytes', type=int, default=DEFAULT_MAX_BYTES)
+    args = parser.parse_args()
+    
+    if not os.path.exists(args.index):
+        parser.error(f"{args.index} not found; build it with: python create_embeddings_index.py --search")
+    cache = QueryCache(args.max_entries, args.max_bytes)
+    with open(args.queries_file, 'r', encoding='utf-8') as f:
+        queries = [line.strip() for line in f if line.strip()]
+    
+    start = time.perf_counter()
+    for query in queries:
+        # 每次都经过 load_search_index：索引文件被重建时自动重新读取，缓存随 index_hash 失效
+        results = cached_search(load_search_index(args.index), query, args.top_k, cache)
+        top = results[0][1]['title'] if results else '-'
+        print(f"{query} -> {len(results)} results, top: {top}")
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"\n[INFO] {len(queries)} queries in {elapsed:.2f} ms, cache: {json.dumps(cache.stats())}")
+
+if __name__ == "__main__":
+    main()
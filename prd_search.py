@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PRD 块全文检索：倒排索引（词项 -> 文档号和词频）+ BM25 打分
+中英文混排分词：拉丁字母/数字按单词切分，连续汉字切成二元组（单个汉字保留为一元）
+
+索引由 create_embeddings_index.py --search 生成（<index>_bm25.index），查询：
+    python prd_search.py "公会 经济系统" --index prd_chunks_bm25.index --top-k 5
+"""
+
+import argparse
+import contextlib
+import hashlib
+import heapq
+import json
+import math
+import operator
+import os
+import re
+import shutil
+import tempfile
+import time
+from collections import Counter
+
+TOKEN_RE = re.compile(r'[a-z0-9_]+|[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+')
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+def tokenize(text):
+    """
+    分词：英文单词/数字整体保留，汉字串切成相邻二元组
+    """
+    tokens = []
+    for run in TOKEN_RE.findall(text.lower()):
+        # 拉丁串都是 ASCII，首字符不小于 U+3400 的就是汉字串；二元组由错开一位的两个切片逐对拼接
+        if run[0] < '\u3400' or len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(map(operator.add, run[:-1], run[1:]))
+    return tokens
+
+# 内存估算（CPython 64 位，近似值）：每个新词项的字典项、元组和两个列表，每条倒排记录两个列表槽位和整数
+TERM_OVERHEAD_BYTES = 240
+POSTING_BYTES = 72
+
+class BM25IndexBuilder:
+    """
+    增量构建倒排索引：按文档号顺序 add()，最后 write() 落盘
+
+    max_memory（字节）给定时按 SPIMI 方式构建：倒排表的估算占用超过预算就按词项排序写成一个
+    临时 run 文件并清空内存，write() 时对所有 run 做 k 路归并，边归并边写出。
+    run 按文档号顺序产生，同一词项在各 run 中的记录直接按 run 顺序拼接即可保持有序，
+    输出与全内存构建逐字节相同。文档元信息和文档长度仍保留在内存中（每篇文档一项）。
+    """
+    def __init__(self, max_memory=None, spill_dir=None):
+        self.postings = {}     # 词项 -> ([文档号...], [词频...])
+        self.doc_lengths = []
+        self.docs = []
+        self.max_memory = max_memory
+        self.spill_dir = spill_dir
+        self.memory = 0
+        self.runs = []
+        self.spilled = 0       # 累计写出的 run 数
+        self.tmpdir = None
+
+    def add(self, doc_meta, text):
+        self.add_counts(doc_meta, Counter(tokenize(text)))
+
+    def add_counts(self, doc_meta, counts):
+        """
+        按词频表 {词项: 词频} 加入一篇文档（文档长度为词频之和），增量构建时可直接用缓存的词频
+        """
+        doc_idx = len(self.docs)
+        self.docs.append(doc_meta)
+        self.doc_lengths.append(sum(counts.values()))
+        for term, tf in counts.items():
+            entry = self.postings.get(term)
+            if entry is None:
+                entry = self.postings[term] = ([], [])
+                self.memory += TERM_OVERHEAD_BYTES + 2 * len(term)
+            entry[0].append(doc_idx)
+            entry[1].append(tf)
+            self.memory += POSTING_BYTES
+        if self.max_memory and self.memory >= self.max_memory:
+            self.spill()
+
+    def spill(self):
+        """
+        把内存中的倒排表按词项排序写成一个 run（每行一个 [词项, 文档号, 词频]）
+        """
+        if not self.postings:
+            return
+        if self.tmpdir is None:
+            self.tmpdir = tempfile.mkdtemp(prefix='bm25_runs_', dir=self.spill_dir)
+        run_path = os.path.join(self.tmpdir, f"run_{len(self.runs):05d}.jsonl")
+        with open(run_path, 'w', encoding='utf-8') as f:
+            for term, (ids, tfs) in sorted(self.postings.items()):
+                f.write(json.dumps([term, ids, tfs], ensure_ascii=False, separators=(',', ':')) + '\n')
+        self.runs.append(run_path)
+        self.spilled += 1
+        self.postings = {}
+        self.memory = 0
+
+    def header_dict(self):
+        total = len(self.doc_lengths)
+        return {
+            "version": "1.0",
+            "scoring": {"model": "bm25", "k1": BM25_K1, "b": BM25_B},
+            "total_documents": total,
+            "avg_doc_length": sum(self.doc_lengths) / total if total else 0.0,
+            "docs": self.docs,
+            "doc_lengths": self.doc_lengths
+        }
+
+    def to_dict(self):
+        return dict(self.header_dict(), postings=dict(self.iter_postings()))
+
+    def iter_postings(self):
+        """
+        按词项顺序产出 (词项, [文档号, 词频])；有 run 时对 run 和内存中剩余部分做 k 路归并
+        """
+        if not self.runs:
+            for term, (ids, tfs) in sorted(self.postings.items()):
+                yield term, [ids, tfs]
+            return
+        self.spill()
+        with contextlib.ExitStack() as stack:
+            files = [stack.enter_context(open(run, 'r', encoding='utf-8')) for run in self.runs]
+            # 同一词项按 run 顺序出现（heapq.merge 对相等键保持输入顺序），文档号自然递增
+            merged = heapq.merge(*((json.loads(line) for line in f) for f in files), key=lambda rec: rec[0])
+            current, ids, tfs = None, [], []
+            for term, run_ids, run_tfs in merged:
+                if term != current:
+                    if current is not None:
+                        yield current, [ids, tfs]
+                    current, ids, tfs = term, [], []
+                ids.extend(run_ids)
+                tfs.extend(run_tfs)
+            if current is not None:
+                yield current, [ids, tfs]
+
+    def iter_body(self, postings):
+        """
+        分段产出与 json.dumps(to_dict(), separators=(',', ':')) 相同的文本，不在内存中拼出整个索引
+        """
+        dumps = lambda value: json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+        yield dumps(self.header_dict())[:-1] + ',"postings":{'
+        first = True
+        for term, entry in postings:
+            yield ('' if first else ',') + dumps(term) + ':' + dumps(entry)
+            first = False
+        yield '}}'
+
+    def write(self, path, sink=None):
+        """
+        写出索引，顶层附带 index_hash（索引内容的哈希），供结果缓存判断索引是否重建过
+        外存模式下正文先流式写入临时文件并计算哈希，再拼上 index_hash 复制到目标文件
+        sink 为可选的第二份输出（如 prd_postings.CompressedPostingsWriter）：同一遍中依次收到
+        add(词项, 文档号, 词频)，最后 close(顶层字段)
+        """
+        postings = self.iter_postings()
+        if sink is not None:
+            postings = self.tee_postings(postings, sink)
+        try:
+            if not self.runs:
+                body = json.dumps(dict(self.header_dict(), postings=dict(postings)),
+                                  ensure_ascii=False, separators=(',', ':'))
+                index_hash = hashlib.sha256(body.encode('utf-8')).hexdigest()[:16]
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(f'{{"index_hash":"{index_hash}",')
+                    f.write(body[1:])
+                return self.close_sink(sink, path)
+            
+            digest = hashlib.sha256()
+            body_path = os.path.join(self.tmpdir, 'body.json')
+            with open(body_path, 'w', encoding='utf-8') as f:
+                for part in self.iter_body(postings):
+                    digest.update(part.encode('utf-8'))
+                    f.write(part)
+            with open(body_path, 'r', encoding='utf-8') as src, open(path, 'w', encoding='utf-8') as dst:
+                dst.write(f'{{"index_hash":"{digest.hexdigest()[:16]}",')
+                src.read(1)
+                shutil.copyfileobj(src, dst, 1 << 20)
+            return self.close_sink(sink, path)
+        finally:
+            self.cleanup()
+
+    def close_sink(self, sink, path):
+        if sink is not None:
+            sink.close(self.header_dict())
+        return path
+
+    @staticmethod
+    def tee_postings(postings, sink):
+        for term, (ids, tfs) in postings:
+            sink.add(term, ids, tfs)
+            yield term, [ids, tfs]
+
+    def cleanup(self):
+        if self.tmpdir is not None:
+            shutil.rmtree(self.tmpdir, ignore_errors=True)
+            self.tmpdir = None
+            self.runs = []
+
+INDEX_HASH_PREFIX = '{"index_hash":"'
+
+def read_index_hash(path):
+    """
+    只读文件开头取出 index_hash（write() 把它写在最前面）；文件不存在或不是本格式时返回 None
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            head = f.read(len(INDEX_HASH_PREFIX) + 17)
+    except OSError:
+        return None
+    if not head.startswith(INDEX_HASH_PREFIX) or not head.endswith('"'):
+        return None
+    return head[len(INDEX_HASH_PREFIX):-1]
+
+_loaded = {}
+
+def load_search_index(path):
+    """
+    读取 BM25 索引（同一进程内按路径缓存，文件变化后重新读取）
+    """
+    mtime = os.stat(path).st_mtime
+    cached = _loaded.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(path, 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    _loaded[path] = (mtime, index)
+    return index
+
+def collection_stats(index, terms):
+    """
+    打分用的集合统计：文档数、总词数、各词项的文档频率
+    分片检索时把各分片的统计相加（merge_stats）再传给 search，分数与合并成一个索引时相同
+    """
+    postings = index['postings']
+    return {
+        "total_documents": index['total_documents'],
+        "total_length": sum(index['doc_lengths']),
+        "df": {term: len(postings[term][0]) for term in terms if term in postings}
+    }
+
+def merge_stats(parts):
+    merged = {"total_documents": 0, "total_length": 0, "df": Counter()}
+    for part in parts:
+        merged["total_documents"] += part["total_documents"]
+        merged["total_length"] += part["total_length"]
+        merged["df"].update(part["df"])
+    return merged
+
+def search(index, query, top_k=10, stats=None):
+    """
+    BM25 检索，返回 [(分数, 文档元信息), ...]，按分数降序
+    stats 为 collection_stats / merge_stats 的结果时用它代替本索引的统计（分片检索）
+    """
+    if stats is None:
+        n = index['total_documents']
+        avgdl = index['avg_doc_length'] or 1.0
+        df = None
+    else:
+        n = stats['total_documents']
+        avgdl = (stats['total_length'] / n if n else 0) or 1.0
+        df = stats['df']
+    if not n or not index['total_documents']:
+        return []
+    k1 = index['scoring']['k1']
+    b = index['scoring']['b']
+    doc_lengths = index['doc_lengths']
+    postings = index['postings']
+    
+    scores = {}
+    for term, qtf in Counter(tokenize(query)).items():
+        entry = postings.get(term)
+        if not entry:
+            continue
+        ids, tfs = entry
+        nt = len(ids) if df is None else df[term]
+        idf = math.log(1 + (n - nt + 0.5) / (nt + 0.5))
+        for doc, tf in zip(ids, tfs):
+            norm = tf * (k1 + 1) / (tf + k1 * (1 - b + b * doc_lengths[doc] / avgdl))
+            scores[doc] = scores.get(doc, 0.0) + qtf * idf * norm
+    
+    best = heapq.nlargest(top_k, scores.items(), key=lambda kv: (kv[1], -kv[0]))
+    return [(score, index['docs'][doc]) for doc, score in best]
+
+def main():
+    parser = argparse.ArgumentParser(description='PRD 块 BM25 检索')
+    parser.add_argument('query')
+    parser.add_argument('--index', default='prd_chunks_bm25.index')
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--json', action='store_true', help='以 JSON 输出结果')
+    args = parser.parse_args()
+    
+    if not os.path.exists(args.index):
+        # BM25 索引默认不建
+        parser.error(f"{args.index} not found; build it with: python create_embeddings_index.py --search")
+    index = load_search_index(args.index)
+    start = time.perf_counter()
+    results = search(index, args.query, args.top_k)
+    elapsed = (time.perf_counter() - start) * 1000
+    
+    if args.json:
+        print(json.dumps([{"score": round(score, 4), **doc} for score, doc in results], ensure_ascii=False, indent=2))
+        return
+    for rank, (score, doc) in enumerate(results, 1):
+        print(f"{rank:2d}. [{score:.3f}] {doc['title']} ({doc['file']})")
+    print(f"\n[INFO] {len(results)} results in {elapsed:.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PRD 章节树索引：一次扫描源文件，记录每个章节的标题路径、级别、字节范围和内容哈希，
+持久化为 JSON 后即可直接 seek 读取任意章节或子树，不必重新拆分整篇文档。
+
+split_prd_by_sections（split_large_prd.py）和 split_prd_by_chapters（split_prd_and_generate_tasks.py）
+使用的数字章节正则作为索引上的查询模式（query_regions 的 'sections' / 'chapters'）提供。
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+
+from split_prd import HEADING_RE
+
+# 数字编号行：split_prd_by_sections 按 strip 后的 ^\d+\. 识别，split_prd_by_chapters 按 ^\d+\.\s+.+$ 识别
+NUMBERED_RE = re.compile(r'^\s*\d+\.')
+QUERY_MODES = {
+    'sections': lambda text: re.match(r'^\d+\.', text.strip()) is not None,
+    'chapters': lambda text: re.match(r'^\d+\.\s+.+$', text) is not None,
+}
+# heading_style='numbered' 时，顶格的 "3." / "3.2" / "3.2.1" 行也作为标题
+NUMBERED_HEADING_RE = re.compile(r'^(\d+(?:\.\d+)*)\.?\s+\S')
+
+def build_section_index(source, heading_style='markdown'):
+    """
+    单次扫描构建章节树
+
+    每个节点：level、title、path、line、byte_start、body_end（第一个子章节开始处）、
+    byte_end（整个子树结束处）、sha256（子树字节）、parent、children。
+    节点 0 为根（整篇文档）。另外记录所有数字编号行（anchors）供查询模式使用。
+    """
+    nodes = [{
+        "id": 0, "level": 0, "title": Path(source).name, "path": [], "line": 0,
+        "byte_start": 0, "body_end": None, "byte_end": None, "parent": None, "children": []
+    }]
+    hashers = {0: hashlib.sha256()}
+    stack = [0]
+    anchors = []
+    in_fence = False
+    offset = 0
+    
+    with open(source, 'rb') as f:
+        for line_no, raw in enumerate(f):
+            text = raw.decode('utf-8').rstrip('\r\n')
+            stripped = text.strip()
+            
+            level = 0
+            title = None
+            if stripped.startswith('```') or stripped.startswith('~~~'):
+                in_fence = not in_fence
+            elif not in_fence:
+                m = HEADING_RE.match(text)
+                if m:
+                    level, title = len(m.group(1)), text[m.end():].strip()
+                elif heading_style == 'numbered':
+                    m = NUMBERED_HEADING_RE.match(text)
+                    if m:
+                        level, title = m.group(1).count('.') + 1, stripped
+            
+            if NUMBERED_RE.match(text):
+                anchors.append({"line": line_no, "byte_start": offset, "text": text})
+            
+            if level:
+                # 关闭同级及更深的章节
+                while nodes[stack[-1]]['level'] >= level:
+                    closed = nodes[stack.pop()]
+                    closed['byte_end'] = offset
+                    if closed['body_end'] is None:
+                        closed['body_end'] = offset
+                    closed['sha256'] = hashers.pop(closed['id']).hexdigest()
+                parent = nodes[stack[-1]]
+                if parent['body_end'] is None:
+                    parent['body_end'] = offset
+                node = {
+                    "id": len(nodes), "level": level, "title": title,
+                    "path": parent['path'] + [title], "line": line_no,
+                    "byte_start": offset, "body_end": None, "byte_end": None,
+                    "parent": parent['id'], "children": []
+                }
+                parent['children'].append(node['id'])
+                nodes.append(node)
+                hashers[node['id']] = hashlib.sha256()
+                stack.append(node['id'])
+            
+            # 当前行属于栈上所有打开的章节
+            for node_id in stack:
+                hashers[node_id].update(raw)
+            offset += len(raw)
+    
+    for node_id in stack:
+        node = nodes[node_id]
+        node['byte_end'] = offset
+        if node['body_end'] is None:
+            node['body_end'] = offset
+        node['sha256'] = hashers[node_id].hexdigest()
+    
+    stat = os.stat(source)
+    return {
+        "version": "1.0",
+        "source": str(source),
+        "source_size": stat.st_size,
+        "source_mtime": stat.st_mtime,
+        "heading_style": heading_style,
+        "sections": nodes,
+        "anchors": anchors
+    }
+
+def default_index_file(source):
+    return f"{source}.sections.json"
+
+def save_section_index(index, index_file=None):
+    index_file = index_file or default_index_file(index['source'])
+    with open(index_file, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False)
+    return index_file
+
+def load_section_index(source, index_file=None, heading_style='markdown'):
+    """
+    读取持久化索引；源文件大小或修改时间变化（或索引不存在）时重建并保存
+    """
+    index_file = index_file or default_index_file(source)
+    stat = os.stat(source)
+    try:
+        with open(index_file, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        if (index.get('source_size') == stat.st_size and index.get('source_mtime') == stat.st_mtime
+                and index.get('heading_style') == heading_style):
+            return index
+    except (OSError, ValueError):
+        pass
+    index = build_section_index(source, heading_style)
+    save_section_index(index, index_file)
+    return index
+
+def read_range(source, byte_start, byte_end):
+    """
+    直接 seek 读取源文件的一段字节并解码
+    """
+    with open(source, 'rb') as f:
+        f.seek(byte_start)
+        return f.read(byte_end - byte_start).decode('utf-8')
+
+def read_section(index, node, subtree=True):
+    """
+    读取章节正文；subtree=False 时只读到第一个子章节之前
+    """
+    end = node['byte_end'] if subtree else node['body_end']
+    return read_range(index['source'], node['byte_start'], end)
+
+def find_sections(index, query):
+    """
+    按标题路径（"A/B"）、完整标题或编号前缀（如 "3.2"）查找章节
+    """
+    results = []
+    for node in index['sections'][1:]:
+        title = node['title']
+        if ('/'.join(node['path']) == query or title == query
+                or title.startswith(query + ' ') or title.startswith(query + '.')):
+            results.append(node)
+    return results
+
+def query_regions(index, mode):
+    """
+    查询模式：按 split_prd_by_sections（'sections'）或 split_prd_by_chapters（'chapters'）的
+    章节正则返回区域列表 [{'title', 'byte_start', 'byte_end'}]，区域从匹配行开始到下一个匹配行为止
+    """
+    match = QUERY_MODES[mode]
+    starts = [a for a in index['anchors'] if match(a['text'])]
+    end_of_file = index['sections'][0]['byte_end']
+    regions = []
+    if mode == 'sections':
+        # 第一个编号行之前的内容作为"前言"
+        first = starts[0]['byte_start'] if starts else end_of_file
+        if first > 0:
+            regions.append({"title": "前言", "byte_start": 0, "byte_end": first})
+    for i, anchor in enumerate(starts):
+        end = starts[i + 1]['byte_start'] if i + 1 < len(starts) else end_of_file
+        regions.append({"title": anchor['text'].strip(), "byte_start": anchor['byte_start'], "byte_end": end})
+    return regions
+
+def print_tree(index, max_level=3):
+    for node in index['sections'][1:]:
+        if node['level'] <= max_level:
+            size = node['byte_end'] - node['byte_start']
+            print(f"{'  ' * (node['level'] - 1)}- {node['title']} [{node['byte_start']}:{node['byte_end']}] ({size} bytes)")
+
+def main():
+    parser = argparse.ArgumentParser(description='PRD 章节树索引')
+    parser.add_argument('source')
+    parser.add_argument('--index-file', default=None, help='默认 <source>.sections.json')
+    parser.add_argument('--heading-style', choices=['markdown', 'numbered'], default='markdown')
+    parser.add_argument('--find', help='按标题路径、标题或编号前缀读取章节')
+    parser.add_argument('--body-only', action='store_true', help='只读取章节自身正文，不含子章节')
+    parser.add_argument('--mode', choices=sorted(QUERY_MODES), help='列出数字章节查询模式的区域')
+    parser.add_argument('--tree', action='store_true', help='打印章节树')
+    args = parser.parse_args()
+    
+    index = load_section_index(args.source, args.index_file, args.heading_style)
+    
+    if args.find:
+        nodes = find_sections(index, args.find)
+        if not nodes:
+            print(f"[WARN] Section not found: {args.find}")
+        for node in nodes:
+            print(f"[INFO] {' / '.join(node['path'])} [{node['byte_start']}:{node['byte_end']}]")
+            print(read_section(index, node, subtree=not args.body_only))
+    elif args.mode:
+        for region in query_regions(index, args.mode):
+            print(f"[{region['byte_start']}:{region['byte_end']}] {region['title']}")
+    else:
+        print_tree(index)
+        print(f"\n[INFO] Sections: {len(index['sections']) - 1}, anchors: {len(index['anchors'])}")
+
+if __name__ == "__main__":
+    main()
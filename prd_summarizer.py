@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+抽取式摘要：把块正文切成句子（中英文标点都识别），跳过标题、表格、代码块等噪声行，
+用 TF-IDF 中心度给句子打分，按原文顺序输出长度预算内得分最高的句子
+
+打分以单个文档为统计范围（句子当作“文档”计算 IDF，与文档质心做余弦），
+结果只取决于文档本身，增量/并行构建得到的摘要与全量构建一致。
+句子-词项矩阵由 numpy 在码点数组上直接构建（不逐句分词），单篇文档的开销主要在切句；
+summarize_batch 把一批文档的句子拼进同一个矩阵，省去逐篇调用 numpy 的固定开销，索引流程按批调用它。
+
+摘要方式由调用方显式选择（SUMMARY_MODES），不随 numpy 是否安装而变，同一语料在不同机器上得到相同的索引：
+    lead        默认，原 extract_summary 的做法：取开头几行正文（lead_summary），不需要 numpy
+    centrality  TF-IDF 中心度选句，需要 numpy，没有时报错；全量构建的耗时约为 lead 的数倍
+"""
+
+import re
+
+np = None   # numpy 只在中心度打分时导入（见 require_numpy），默认的 lead 模式不加载它
+
+SUMMARY_MODES = ('lead', 'centrality')
+DEFAULT_SUMMARY_MODE = 'lead'
+
+SUMMARY_VERSION = 4
+DEFAULT_MAX_LENGTH = 200
+MIN_SENTENCE_LENGTH = 8
+NO_SUMMARY = "No summary available"
+
+LATIN_TOKEN_RE = re.compile(r'[a-z0-9_]+')   # 与 prd_search.TOKEN_RE 的拉丁部分相同
+SENTENCE_RE = re.compile(r'[^\u3002\uff01\uff1f\uff1b!?]+(?:[\u3002\uff01\uff1f\uff1b!?]+|$)|[\u3002\uff01\uff1f\uff1b!?]+')
+LATIN_STOP_RE = re.compile(r'(?<=[a-z0-9)][.])\s+(?=[A-Z])')
+LIST_MARKER_RE = re.compile(r'^(?:>\s*)*(?:[-*+]|\d+[.)])\s+')
+LINK_RE = re.compile(r'!?\[([^\]]*)\]\([^)]*\)')
+EMPHASIS_RE = re.compile(r'\*\*|__|`')
+TEXT_CHAR_RE = re.compile(r'[A-Za-z\u3400-\u4dbf\u4e00-\u9fff]')
+FENCE_RE = re.compile(r'^(```|~~~)')
+# 代码块外零散的代码行：注释、括号行、声明、方法签名、TypeScript 字段、赋值
+CODE_LINE_RE = re.compile(
+    r'^(?://|/\*|\*|[})\]])|[{(\[,;]$'
+    r'|^(?:interface|type|class|enum|function|const|let|export|import)\b'
+    r'|^[A-Za-z_$][\w$]*\([^)]*\)\s*:'
+    r'|^[A-Za-z_$][\w$]*\??\s*:\s*[A-Za-z0-9_.,<>\[\]|\'" ]+;?(?:\s*//.*)?$'
+    r'|\s=\s',
+    re.ASCII
+)
+SENTENCE_END = '\u3002\uff01\uff1f\uff1b\uff1a!?.:;'
+
+def require_numpy():
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            raise RuntimeError("numpy is required for centrality summaries: pip install numpy") from None
+        np = numpy
+    return np
+
+def check_mode(mode):
+    """
+    校验摘要方式；centrality 在这里就导入 numpy，缺少时尽早报错
+    """
+    if mode not in SUMMARY_MODES:
+        raise ValueError(f"Unknown summary mode: {mode!r} (expected one of {', '.join(SUMMARY_MODES)})")
+    if mode == 'centrality':
+        require_numpy()
+    return mode
+
+def scoring_mode(mode=DEFAULT_SUMMARY_MODE):
+    """
+    摘要算法标识，写进索引指纹：算法或摘要方式变化时旧摘要不再复用
+    """
+    return f"summary-v{SUMMARY_VERSION}-{mode}"
+
+def split_sentences(text):
+    """
+    逐行切句，返回清理过 Markdown 标记的句子列表（一次线性扫描）
+    跳过：YAML 头部、代码块、标题、表格行、HTML、分隔线、没有文字的行
+    """
+    sentences = []
+    in_fence = False
+    lines = text.lstrip('\ufeff').split('\n')
+    if lines[0].strip() == '---':
+        # 跳过 YAML 头部
+        end = next((i for i in range(1, len(lines)) if lines[i].strip() == '---'), 0)
+        lines = lines[end + 1:]
+    for raw in lines:
+        line = raw.strip()
+        if FENCE_RE.match(line):
+            in_fence = not in_fence
+            continue
+        if in_fence or not line or line[0] in '#|<' or line.startswith('---'):
+            continue
+        line = LIST_MARKER_RE.sub('', line)
+        line = EMPHASIS_RE.sub('', LINK_RE.sub(r'\1', line)).strip()
+        if not TEXT_CHAR_RE.search(line) or CODE_LINE_RE.search(line):
+            continue
+        for part in LATIN_STOP_RE.split(line):
+            for m in SENTENCE_RE.finditer(part):
+                sentence = m.group().strip()
+                if len(sentence) >= MIN_SENTENCE_LENGTH:
+                    sentences.append(sentence)
+    return sentences
+
+def join_sentences(sentences):
+    """
+    英文句子之间补空格；中文句子直接拼接，没有句末标点的（如列表项）补一个分号
+    """
+    out = ''
+    for sentence in sentences:
+        if out:
+            if not (out[-1] > '\u2e7f' or sentence[0] > '\u2e7f'):
+                out += ' '
+            elif out[-1] not in SENTENCE_END:
+                out += '\uff1b'
+        out += sentence
+    return out
+
+def select_sentences(sentences, order, max_length):
+    """
+    按得分顺序贪心放入长度预算，再按原文顺序拼接；第一句就超长时截断
+    """
+    chosen = []
+    used = 0
+    for i in order:
+        length = len(sentences[i]) + (1 if chosen else 0)
+        if used + length <= max_length:
+            chosen.append(i)
+            used += length
+    if not chosen:
+        if not sentences:
+            return NO_SUMMARY
+        first = sentences[order[0]]
+        return first[:max_length - 3] + '...'
+    return join_sentences([sentences[i] for i in sorted(chosen)])
+
+def sentence_terms(doc_sentences):
+    """
+    一次扫描拿到所有句子的词项：返回 (句子号, 列号, 列所属文档, 句子所属文档) 四个数组，
+    列为 (文档, 词项)，按首次出现的顺序编号。
+
+    词项与 prd_search.tokenize 相同，但不逐句调用：句子用换行拼成一个串后转成码点数组，
+    汉字二元组和单字由相邻码点直接组成整数键，拉丁单词/数字由 findall 取出后整体编号。
+    """
+    counts = [len(sentences) for sentences in doc_sentences]
+    sent_doc = np.repeat(np.arange(len(doc_sentences), dtype=np.int64), counts)
+    empty = np.zeros(0, dtype=np.int64)
+    if not sent_doc.size:
+        return empty, empty, empty, sent_doc
+    text = '\n'.join(sentence for sentences in doc_sentences for sentence in sentences).lower()
+    cp = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.int64)
+    sent_of = np.cumsum(cp == 10)
+
+    cjk = (((cp >= 0x3400) & (cp <= 0x4dbf)) | ((cp >= 0x4e00) & (cp <= 0x9fff))
+           | ((cp >= 0xf900) & (cp <= 0xfaff)))
+    prev = np.concatenate(([False], cjk[:-1]))
+    nxt = np.concatenate((cjk[1:], [False]))
+    bigram = np.flatnonzero(cjk & nxt)
+    single = np.flatnonzero(cjk & ~prev & ~nxt)
+    # 拉丁单词：起点由码点数组求出，与 findall 的结果一一对应，单词本身用 np.unique 编号
+    word = ((cp >= 97) & (cp <= 122)) | ((cp >= 48) & (cp <= 57)) | (cp == 95)
+    latin = np.flatnonzero(word & ~np.concatenate(([False], word[:-1])))
+    words = LATIN_TOKEN_RE.findall(text)
+    latin_ids = np.unique(np.asarray(words), return_inverse=True)[1].ravel() if words else latin
+    # 汉字码点不超过 21 位：二元组键 >= 2**21 > 单字键；拉丁词项的键从 2**42 起
+    pos = np.concatenate((bigram, single, latin))
+    keys = np.concatenate(((cp[bigram] << 21) | cp[bigram + 1], cp[single], latin_ids + (1 << 42)))
+    order = np.argsort(pos, kind='stable')
+    rows = sent_of[pos[order]]
+    keys = keys[order] + (sent_doc[rows] << 43)
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    # 列号按首次出现排序，与逐句建词表时一致
+    rank = np.empty(first.size, dtype=np.int64)
+    by_first = np.argsort(first, kind='stable')
+    rank[by_first] = np.arange(first.size)
+    return rows, rank[inverse.ravel()], sent_doc[rows[np.sort(first)]], sent_doc
+
+def centrality_scores(doc_sentences):
+    """
+    批量计算句子中心度。doc_sentences 为每个文档的句子列表，返回每个文档的得分数组。
+
+    所有句子的词项放进一个稀疏矩阵（行 = 句子，列 = (文档, 词项)），用 bincount 做分组求和：
+        w(s,t) = (1 + log tf) * log(1 + 句子数 / 含 t 的句子数)
+        质心 c = Σ_s w(s,·)，得分 = cos(w(s,·), c)
+    """
+    rows, cols, term_doc, sent_doc = sentence_terms(doc_sentences)
+    n_sent = sent_doc.size
+
+    scores = np.zeros(n_sent)
+    if rows.size:
+        n_terms = len(term_doc)
+        keys, tf = np.unique(rows * n_terms + cols, return_counts=True)
+        s_idx, t_idx = keys // n_terms, keys % n_terms
+
+        df = np.bincount(t_idx, minlength=n_terms)
+        sentences_per_doc = np.bincount(sent_doc, minlength=len(doc_sentences))
+        idf = np.log1p(sentences_per_doc[term_doc] / np.maximum(df, 1))
+        w = (1.0 + np.log(tf)) * idf[t_idx]
+
+        centroid = np.bincount(t_idx, w, minlength=n_terms)
+        centroid_norm = np.sqrt(np.bincount(term_doc, centroid ** 2, minlength=len(doc_sentences)))
+        dot = np.bincount(s_idx, w * centroid[t_idx], minlength=n_sent)
+        sent_norm = np.sqrt(np.bincount(s_idx, w ** 2, minlength=n_sent))
+        denom = sent_norm * centroid_norm[sent_doc]
+        scores = np.divide(dot, denom, out=np.zeros(n_sent), where=denom > 0)
+
+    out, start = [], 0
+    for sentences in doc_sentences:
+        out.append(scores[start:start + len(sentences)])
+        start += len(sentences)
+    return out
+
+def lead_summary(text, max_length=DEFAULT_MAX_LENGTH):
+    """
+    lead 模式的摘要：跳过空行、标题和分隔线，拼接开头几行正文，超长时在词边界截断加省略号
+    （与原 extract_summary 的输出相同，拼接长度逐行累加，不再每行重新 join）
+    """
+    lines = []
+    length = -1
+    for line in text.split('\n'):
+        line = line.strip()
+        if line and not line.startswith('#') and not line.startswith('---'):
+            lines.append(line)
+            length += len(line) + 1
+            if length > max_length:
+                break
+    summary = ' '.join(lines)[:max_length]
+    if len(summary) == max_length:
+        summary = summary.rsplit(' ', 1)[0] + '...'
+    return summary or NO_SUMMARY
+
+def summarize_batch(texts, max_length=DEFAULT_MAX_LENGTH, mode=DEFAULT_SUMMARY_MODE):
+    """
+    为一批文档生成摘要；每篇文档的结果与单独调用 summarize 相同
+    """
+    if check_mode(mode) == 'lead':
+        return [lead_summary(text, max_length) for text in texts]
+    doc_sentences = [split_sentences(text) for text in texts]
+
+    summaries = []
+    for sentences, scores in zip(doc_sentences, centrality_scores(doc_sentences)):
+        # 得分降序，同分时靠前的句子优先
+        order = np.lexsort((np.arange(len(sentences)), -np.round(scores, 12)))
+        summaries.append(select_sentences(sentences, order.tolist(), max_length))
+    return summaries
+
+def summarize(text, max_length=DEFAULT_MAX_LENGTH, mode=DEFAULT_SUMMARY_MODE):
+    return summarize_batch([text], max_length, mode)[0]
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+离线稠密向量索引：哈希 n-gram TF-IDF 经稀疏随机投影得到定长向量，不依赖网络和模型。
+
+文件（以 prd_chunks.index 为例）：
+    prd_chunks_vectors.npy       float32 矩阵 (文档数, dim)，行顺序与 _docs.jsonl 一致
+    prd_chunks_vectors_idf.npy   float32 IDF 表 (buckets,)，查询时对问题做同样的变换
+    prd_chunks_vectors.json      参数
+    prd_chunks_vectors_docs.jsonl  文档元信息（id/file/title），每行一条，行顺序与矩阵一致，是行号到文档的唯一映射；
+                                 --dedup 时近重复文档不进矩阵，行号与 JSON 索引 documents 的位置不再对应，按 file 对照
+    prd_chunks_vectors_docs.npy    int64 行偏移表 (文档数 + 1,)，打开索引时不解析元信息，只解码命中的行
+    prd_chunks_vectors_ivf.npz   可选的 IVF 近似检索结构（k-means 质心 + 按簇排序的行号）
+    prd_chunks_vectors_ivf.npy   按簇重排的向量副本，每个簇在文件中连续，探测时顺序读取
+读取时 np.load(mmap_mode='r') 零拷贝打开，检索为一次矩阵-向量乘法 + argpartition 取 top-k。
+默认精确检索；IVF 需要显式构建（create_embeddings_index.py --ivf）并在查询时给出 nprobe，
+小 nprobe 的召回明显低于精确检索，先用 scripts/benchmarks/vector_ann_benchmark.py 按召回目标选定 nprobe。
+需要 numpy（pip install numpy）。
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import time
+import zlib
+
+try:
+    import numpy as np
+except ImportError:  # numpy 是可选依赖，只有向量索引需要
+    np = None
+
+from prd_search import tokenize
+
+DEFAULT_DIM = 256
+DEFAULT_BUCKETS = 1 << 20
+PROJECTION_K = 4          # 每个哈希桶投影到的维度数（稀疏随机投影）
+PROJECTION_SEED = 0x5EED
+IVF_MIN_DOCUMENTS = 1024  # 少于这个数量时精确检索已经足够快，不建 IVF
+IVF_SAMPLE = 65536        # k-means 训练最多使用的样本行数
+IVF_ITERATIONS = 20
+
+def require_numpy():
+    if np is None:
+        raise RuntimeError("numpy is required for the vector index: pip install numpy")
+
+def vector_files(index_file):
+    base, ext = os.path.splitext(index_file)
+    if ext not in ('.index', '.jsonl'):
+        base = index_file
+    return f"{base}_vectors.npy", f"{base}_vectors_idf.npy", f"{base}_vectors.json"
+
+def doc_files(index_file):
+    base = vector_files(index_file)[0][:-len('.npy')]
+    return base + '_docs.jsonl', base + '_docs.npy'
+
+def write_docs(docs, index_file):
+    """
+    文档元信息逐行写成 JSON Lines，同时记录每行的起始偏移
+    """
+    docs_file, offsets_file = doc_files(index_file)
+    offsets = [0]
+    with open(docs_file, 'wb') as f:
+        for doc in docs:
+            line = (json.dumps(doc, ensure_ascii=False) + '\n').encode('utf-8')
+            f.write(line)
+            offsets.append(offsets[-1] + len(line))
+    np.save(offsets_file, np.asarray(offsets, dtype=np.int64))
+    return docs_file
+
+class DocRefs:
+    """
+    按行号取文档元信息的只读序列：JSON Lines 以 mmap 打开，按偏移表切出一行再解析
+    """
+    def __init__(self, index_file):
+        docs_file, offsets_file = doc_files(index_file)
+        self.offsets = np.load(offsets_file, mmap_mode='r')
+        self.data = b''
+        if self.offsets[-1] > 0:
+            with open(docs_file, 'rb') as f:
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return self.offsets.shape[0] - 1
+
+    def __getitem__(self, row):
+        if not -len(self) <= row < len(self):
+            raise IndexError(row)
+        row %= len(self)
+        return json.loads(self.data[int(self.offsets[row]):int(self.offsets[row + 1])])
+
+def ivf_files(index_file):
+    base = vector_files(index_file)[0][:-len('.npy')]
+    return base + '_ivf.npz', base + '_ivf.npy'
+
+def hash_buckets(text, buckets):
+    """
+    分词后把每个词项哈希到 [0, buckets)，返回 (桶号数组, 词频数组)
+    """
+    ids = np.fromiter((zlib.crc32(t.encode('utf-8')) for t in tokenize(text)), dtype=np.uint32)
+    if ids.size == 0:
+        return ids.astype(np.int64), ids.astype(np.float32)
+    uniq, counts = np.unique(ids % buckets, return_counts=True)
+    return uniq.astype(np.int64), counts.astype(np.float32)
+
+def projection(bucket_ids, dim):
+    """
+    每个桶确定性地映射到 PROJECTION_K 个维度和符号（整数哈希，无需存储投影矩阵）
+    """
+    b = bucket_ids.astype(np.uint64)[:, None]
+    salts = np.arange(1, PROJECTION_K + 1, dtype=np.uint64)[None, :]
+    with np.errstate(over='ignore'):
+        h = (b * np.uint64(0x9E3779B97F4A7C15) + salts * np.uint64(PROJECTION_SEED)) * np.uint64(0xBF58476D1CE4E5B9)
+        h ^= h >> np.uint64(31)
+    dims = (h % np.uint64(dim)).astype(np.int64)
+    signs = np.where((h >> np.uint64(40)) & np.uint64(1), 1.0, -1.0).astype(np.float32)
+    return dims, signs
+
+def embed(text, idf, dim):
+    """
+    文本 -> L2 归一化的 float32 向量
+    """
+    ids, tfs = hash_buckets(text, idf.shape[0])
+    if ids.size == 0:
+        return np.zeros(dim, dtype=np.float32)
+    weights = (1.0 + np.log(tfs)) * idf[ids]
+    dims, signs = projection(ids, dim)
+    vec = np.bincount(dims.ravel(), (signs * weights[:, None]).ravel(), minlength=dim).astype(np.float32)
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm > 0 else vec
+
+def build_vector_index(texts_factory, docs, index_file, dim=DEFAULT_DIM, buckets=DEFAULT_BUCKETS):
+    """
+    两遍扫描构建向量索引：第一遍统计文档频率算 IDF，第二遍逐行写入 memmap 矩阵，
+    内存只保留 IDF 表和当前一行。texts_factory() 每次返回一个新的正文迭代器。
+    """
+    require_numpy()
+    matrix_file, idf_file, meta_file = vector_files(index_file)
+    
+    df = np.zeros(buckets, dtype=np.int32)
+    n = 0
+    for text in texts_factory():
+        ids, _ = hash_buckets(text, buckets)
+        df[ids] += 1
+        n += 1
+    idf = np.log((1.0 + n) / (1.0 + df)).astype(np.float32) + np.float32(1.0)
+    np.save(idf_file, idf)
+    
+    matrix = np.lib.format.open_memmap(matrix_file, mode='w+', dtype=np.float32, shape=(n, dim))
+    hasher = hashlib.sha256(idf.tobytes())
+    for row, text in enumerate(texts_factory()):
+        matrix[row] = embed(text, idf, dim)
+        hasher.update(matrix[row].tobytes())
+    hasher.update(json.dumps(docs, ensure_ascii=False).encode('utf-8'))
+    matrix.flush()
+    del matrix
+    write_docs(docs, index_file)
+    
+    with open(meta_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            "version": "1.0",
+            "model": "hashed-tfidf-sparse-random-projection",
+            "dim": dim,
+            "buckets": buckets,
+            "projection_k": PROJECTION_K,
+            "total_documents": n,
+            "index_hash": hasher.hexdigest()[:16]
+        }, f, ensure_ascii=False)
+    return matrix_file
+
+def iter_row_blocks(matrix, block=65536):
+    for start in range(0, matrix.shape[0], block):
+        yield start, np.asarray(matrix[start:start + block])
+
+def assign_clusters(matrix, centroids):
+    """
+    分块计算每行最相近的质心（余弦），避免把整个 mmap 矩阵读进内存
+    """
+    labels = np.empty(matrix.shape[0], dtype=np.int32)
+    for start, rows in iter_row_blocks(matrix):
+        labels[start:start + rows.shape[0]] = np.argmax(rows @ centroids.T, axis=1)
+    return labels
+
+def train_centroids(sample, nlist, iterations=IVF_ITERATIONS, seed=PROJECTION_SEED):
+    """
+    球面 k-means：质心每轮重新归一化，空簇用随机样本行补上
+    """
+    rng = np.random.default_rng(seed)
+    centroids = sample[rng.choice(sample.shape[0], nlist, replace=False)].copy()
+    for _ in range(iterations):
+        labels = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        counts = np.bincount(labels, minlength=nlist)
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = sample[rng.choice(sample.shape[0], int(empty.sum()), replace=False)]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = sums / np.where(norms > 0, norms, 1.0)
+    return centroids.astype(np.float32)
+
+def build_ivf(index_file, nlist=None, sample_size=IVF_SAMPLE, iterations=IVF_ITERATIONS):
+    """
+    在已有向量矩阵上建立 IVF：k-means 训练 nlist 个质心（默认约 sqrt(N)），
+    行号按所属簇排序存储，offsets[c]:offsets[c+1] 为簇 c 的区间；
+    向量按同样顺序复制一份，探测一个簇只需读取一段连续的行。
+    """
+    require_numpy()
+    matrix = np.load(vector_files(index_file)[0], mmap_mode='r')
+    n = matrix.shape[0]
+    nlist = max(1, min(nlist or int(round(n ** 0.5)), n))
+    rng = np.random.default_rng(PROJECTION_SEED)
+    sample_rows = np.sort(rng.choice(n, min(n, sample_size), replace=False))
+    centroids = train_centroids(np.asarray(matrix[sample_rows]), nlist, iterations)
+    
+    labels = assign_clusters(matrix, centroids)
+    # 全量分配后可能有簇一行都没分到，从质心表里去掉，探测时不会落在空簇上
+    counts = np.bincount(labels, minlength=nlist)
+    keep = np.flatnonzero(counts)
+    if keep.shape[0] < nlist:
+        remap = np.full(nlist, -1, dtype=np.int32)
+        remap[keep] = np.arange(keep.shape[0], dtype=np.int32)
+        centroids, labels, nlist = centroids[keep], remap[labels], keep.shape[0]
+    order = np.argsort(labels, kind='stable').astype(np.int32)
+    offsets = np.zeros(nlist + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.bincount(labels, minlength=nlist))
+    
+    path, matrix_path = ivf_files(index_file)
+    clustered = np.lib.format.open_memmap(matrix_path, mode='w+', dtype=np.float32, shape=matrix.shape)
+    block = 65536
+    for start in range(0, n, block):
+        rows = order[start:start + block]
+        clustered[start:start + rows.shape[0]] = matrix[np.sort(rows)][np.argsort(np.argsort(rows))]
+    clustered.flush()
+    del clustered
+    np.savez(path, centroids=centroids, order=order, offsets=offsets)
+    return path
+
+class VectorIndex:
+    """
+    只读向量索引：矩阵、IDF 表和文档元信息都以 mmap 方式打开，检索时只解码 top-k 行的元信息
+    """
+    def __init__(self, index_file):
+        require_numpy()
+        matrix_file, idf_file, meta_file = vector_files(index_file)
+        with open(meta_file, 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.matrix = np.load(matrix_file, mmap_mode='r')
+        self.idf = np.load(idf_file, mmap_mode='r')
+        self.dim = self.meta['dim']
+        # 旧格式把元信息整体放在 _vectors.json 里
+        self.docs = self.meta['docs'] if 'docs' in self.meta else DocRefs(index_file)
+        self.ivf = None
+        ivf_path, ivf_matrix_path = ivf_files(index_file)
+        try:
+            with np.load(ivf_path) as data:
+                self.ivf = {key: data[key] for key in ('centroids', 'order', 'offsets')}
+            self.ivf['matrix'] = np.load(ivf_matrix_path, mmap_mode='r')
+        except FileNotFoundError:
+            self.ivf = None
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def embed(self, text):
+        return embed(text, self.idf, self.dim)
+
+    def probe_clusters(self, query_vec, nprobe):
+        """
+        IVF：取与查询最相近的 nprobe 个非空簇，返回 (行号, 分数)，只读取这些簇的连续区间；
+        没有非空簇时返回 None
+        """
+        centroids, order, offsets = self.ivf['centroids'], self.ivf['order'], self.ivf['offsets']
+        clustered = self.ivf['matrix']
+        # 旧文件的质心表里可能留有空簇，排序时跳过
+        live = np.flatnonzero(offsets[1:] > offsets[:-1])
+        nprobe = min(nprobe, live.shape[0])
+        if nprobe == 0:
+            return None
+        sims = centroids[live] @ query_vec
+        probe = np.sort(live[np.argpartition(-sims, nprobe - 1)[:nprobe]])
+        spans = [(offsets[c], offsets[c + 1]) for c in probe]
+        rows = np.concatenate([order[a:b] for a, b in spans])
+        scores = np.concatenate([clustered[a:b] @ query_vec for a, b in spans])
+        return rows, scores
+
+    def search_vector(self, query_vec, top_k=10, nprobe=None):
+        """
+        余弦相似度（向量已归一化，即点积）一次算完所有候选行，argpartition 取 top-k
+        nprobe 为 None 或没有 IVF 时做精确检索；nprobe 越大召回越高、延迟越高
+        返回 [(分数, 行号), ...]
+        """
+        if nprobe is not None and nprobe < 1:
+            raise ValueError(f"nprobe must be >= 1, got {nprobe}")
+        probed = None
+        if nprobe is not None and self.ivf is not None:
+            probed = self.probe_clusters(query_vec, nprobe)
+        if probed is not None:
+            rows, scores = probed
+        else:
+            rows = None
+            scores = self.matrix @ query_vec
+        k = min(top_k, scores.shape[0])
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.lexsort((top, -scores[top]))]
+        if rows is not None:
+            return [(float(scores[i]), int(rows[i])) for i in top]
+        return [(float(scores[i]), int(i)) for i in top]
+
+    def search(self, query, top_k=10, nprobe=None):
+        """
+        返回 [(分数, 文档元信息), ...]，按分数降序；默认精确检索，给出 nprobe 且建有 IVF 时近似检索
+        """
+        return [(score, self.docs[row]) for score, row in self.search_vector(self.embed(query), top_k, nprobe)]
+
+def main():
+    parser = argparse.ArgumentParser(description='PRD 块向量检索')
+    parser.add_argument('query')
+    parser.add_argument('--index', default='prd_chunks.index', help='JSON 索引路径，向量文件与之同名')
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--nprobe', type=int, help='用 IVF 近似检索并探测这么多簇（越大越准越慢），默认精确检索')
+    args = parser.parse_args()
+    
+    start = time.perf_counter()
+    index = VectorIndex(args.index)
+    opened = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    results = index.search(args.query, args.top_k, args.nprobe)
+    elapsed = (time.perf_counter() - start) * 1000
+    
+    for rank, (score, doc) in enumerate(results, 1):
+        print(f"{rank:2d}. [{score:.3f}] {doc['title']} ({doc['file']})")
+    mode = 'exact' if args.nprobe is None or index.ivf is None else f'ivf nprobe={args.nprobe}'
+    print(f"\n[INFO] {len(index)} vectors ({mode}) opened in {opened:.2f} ms, {len(results)} results in {elapsed:.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+近重复去重基准：把真实块集合（PRD 块、PRD 补丁版拆分块、XML 分片块）放进同一个临时目录，
+分别不去重和去重构建索引，比较 BM25 倒排索引体积和查询延迟
+用法：python scripts/benchmarks/dedup_benchmark.py [--queries 200] [--threshold 0.8]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+from create_embeddings_index import create_embeddings_index, index_file_path  # noqa: E402
+from prd_search import load_search_index, search  # noqa: E402
+from split_prd import split_markdown_by_sections  # noqa: E402
+from split_shards import split_flattened_shard  # noqa: E402
+
+def prepare_sources(workdir):
+    """
+    准备三组块目录，返回相对 workdir 的目录列表
+    """
+    shutil.copytree(ROOT / 'docs' / 'prd_chunks', workdir / 'prd_chunks')
+    with contextlib.redirect_stdout(io.StringIO()):
+        split_markdown_by_sections(str(ROOT / 'docs' / 'PRD-Guild-Manager-patched.md'),
+                                   output_dir=str(workdir / 'patched_chunks'))
+        for shard in sorted((ROOT / 'shards').glob('flattened-prd*.xml')):
+            split_flattened_shard(str(shard), output_dir=str(workdir / 'shard_chunks'))
+    return ['prd_chunks', 'patched_chunks', 'shard_chunks']
+
+def build(dirs, index_file, dedup, threshold):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        create_embeddings_index(dirs, index_file, incremental=False, search_index=True, dedup=dedup,
+                                dedup_threshold=threshold)
+    return time.perf_counter() - start
+
+def time_queries(index_file, queries, top_k):
+    index = load_search_index(index_file_path(index_file, 'bm25'))
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        search(index, query, top_k)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+def main():
+    parser = argparse.ArgumentParser(description='近重复去重基准')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--threshold', type=float, default=0.8)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='prd_dedup_') as workdir:
+        workdir = Path(workdir)
+        dirs = prepare_sources(workdir)
+        # 文件标识是相对当前目录的路径
+        os.chdir(workdir)
+        try:
+            rng = random.Random(args.seed)
+            lines = [line.strip() for path in sorted(Path('prd_chunks').glob('*.md'))
+                     for line in path.read_text(encoding='utf-8').split('\n') if len(line.strip()) > 20]
+            queries = [rng.choice(lines)[:60] for _ in range(args.queries)]
+
+            print(f"{'mode':>8} {'docs':>6} {'indexed':>8} {'bm25 KB':>9} {'build s':>8} {'mean ms':>8} {'p95 ms':>8}")
+            for dedup in (False, True):
+                index_file = 'dedup.index' if dedup else 'plain.index'
+                build_time = build(dirs, index_file, dedup, args.threshold)
+                bm25_file = index_file_path(index_file, 'bm25')
+                index = load_search_index(bm25_file)
+                latencies = time_queries(index_file, queries, args.top_k)
+                total = sum(1 for path in dirs for f in Path(path).glob('*.md') if not f.name.endswith('_index.md'))
+                print(f"{'dedup' if dedup else 'plain':>8} {total:>6} {len(index['docs']):>8} "
+                      f"{os.path.getsize(bm25_file) / 1024:>9.1f} {build_time:>8.2f} "
+                      f"{statistics.mean(latencies):>8.3f} {statistics.quantiles(latencies, n=20)[-1]:>8.3f}")
+        finally:
+            os.chdir(cwd)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+压缩倒排表基准：在合成 PRD 语料的块上比较 JSON 整数列表（<index>_bm25.index）与
+差值 + varint + 跳表指针（<index>_postings.index）的索引体积、加载时间、AND 查询和 top-k 查询延迟
+用法：python scripts/benchmarks/postings_benchmark.py [--size-mb 20] [--queries 300] [--skip-interval 32]
+"""
+
+import argparse
+import contextlib
+import heapq
+import io
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from prd_corpus import generate_corpus  # noqa: E402
+from split_prd import split_markdown_by_sections  # noqa: E402
+from create_embeddings_index import create_embeddings_index, index_file_path  # noqa: E402
+from prd_search import search, tokenize  # noqa: E402
+from prd_postings import SKIP_INTERVAL, CompressedIndex, json_to_postings  # noqa: E402
+
+def plain_and(index, query, top_k):
+    """
+    基线：JSON 列表上的 AND 检索（最短列表转集合逐个求交，再按 prd_search.search 的公式打分）
+    """
+    n = index['total_documents']
+    avgdl = index['avg_doc_length'] or 1.0
+    k1, b = index['scoring']['k1'], index['scoring']['b']
+    terms = Counter(tokenize(query))
+    postings = [index['postings'].get(term) for term in terms]
+    if not terms or None in postings:
+        return []
+    docs = set(min(postings, key=lambda p: len(p[0]))[0])
+    for ids, _ in postings:
+        docs.intersection_update(ids)
+    scores = {}
+    for (term, qtf), (ids, tfs) in zip(terms.items(), postings):
+        idf = math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+        for doc, tf in zip(ids, tfs):
+            if doc in docs:
+                norm = tf * (k1 + 1) / (tf + k1 * (1 - b + b * index['doc_lengths'][doc] / avgdl))
+                scores[doc] = scores.get(doc, 0.0) + qtf * idf * norm
+    best = heapq.nlargest(top_k, scores.items(), key=lambda kv: (kv[1], -kv[0]))
+    return [(score, index['docs'][doc]) for doc, score in best]
+
+def timed(fn, queries, index=None):
+    """
+    index 为 CompressedIndex 时同时统计解码的倒排记录占比
+    """
+    results, latencies = [], []
+    postings = decoded = 0
+    for query in queries:
+        start = time.perf_counter()
+        results.append(fn(query))
+        latencies.append((time.perf_counter() - start) * 1000)
+        if index is not None and index.last_stats:
+            postings += index.last_stats['postings']
+            decoded += index.last_stats['decoded']
+    return results, latencies, (decoded / postings if postings else None)
+
+def report(label, latencies, decoded=None):
+    print(f"{label:>22} {statistics.mean(latencies):>9.3f} {statistics.median(latencies):>9.3f} "
+          f"{statistics.quantiles(latencies, n=20)[-1]:>9.3f} {'-' if decoded is None else f'{decoded:.1%}':>9}")
+
+def main():
+    parser = argparse.ArgumentParser(description='压缩倒排表基准')
+    parser.add_argument('--size-mb', type=float, default=20)
+    parser.add_argument('--queries', type=int, default=300)
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--skip-interval', type=int, default=SKIP_INTERVAL)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='prd_postings_') as workdir:
+        workdir = Path(workdir)
+        corpus = workdir / 'corpus.md'
+        generate_corpus(corpus, args.size_mb, args.seed)
+        index_file = str(workdir / 'bench.jsonl')
+        cwd = os.getcwd()
+        # 文件标识是相对当前目录的路径
+        os.chdir(workdir)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                split_markdown_by_sections('corpus.md', output_dir='chunks')
+                create_embeddings_index('chunks', index_file, incremental=False, search_index=True)
+        finally:
+            os.chdir(cwd)
+        json_file = index_file_path(index_file, 'bm25')
+        postings_file = json_to_postings(json_file, index_file_path(index_file, 'postings'),
+                                         args.skip_interval)
+
+        start = time.perf_counter()
+        with open(json_file, 'r', encoding='utf-8') as f:
+            plain = json.load(f)
+        plain_load = time.perf_counter() - start
+        start = time.perf_counter()
+        compressed = CompressedIndex(postings_file)
+        compressed_load = time.perf_counter() - start
+        postings_bytes = sum(entry[2] for entry in compressed.terms.values())
+        plain_postings_bytes = len(json.dumps(plain['postings'], ensure_ascii=False,
+                                              separators=(',', ':')).encode('utf-8'))
+        print(f"[INFO] {plain['total_documents']} chunks, {len(plain['postings'])} terms, "
+              f"skip interval {args.skip_interval}")
+        print(f"{'':>22} {'plain':>12} {'compressed':>12}")
+        print(f"{'file bytes':>22} {os.path.getsize(json_file):>12} {os.path.getsize(postings_file):>12}")
+        print(f"{'postings bytes':>22} {plain_postings_bytes:>12} {postings_bytes:>12}")
+        print(f"{'load ms':>22} {plain_load * 1000:>12.1f} {compressed_load * 1000:>12.1f}")
+
+        # AND 查询：一个高频词项 + 一到两个其他词项，模拟“在常见主题里找特定概念”
+        rng = random.Random(args.seed)
+        by_df = sorted(plain['postings'], key=lambda term: -len(plain['postings'][term][0]))
+        frequent = by_df[:200]
+        common = by_df[:5000]
+        and_queries = [' '.join([rng.choice(frequent)] + rng.sample(common, rng.randint(1, 2)))
+                       for _ in range(args.queries)]
+        or_queries = [' '.join(rng.sample(common, rng.randint(2, 4))) for _ in range(args.queries)]
+
+        print(f"\n{'query':>22} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'decoded':>9}")
+        expected, lat, _ = timed(lambda q: plain_and(plain, q, args.top_k), and_queries)
+        report('AND plain lists', lat)
+        got, lat, decoded = timed(lambda q: compressed.search(q, args.top_k, 'and'), and_queries, compressed)
+        report('AND varint+skips', lat, decoded)
+        assert got == expected, "AND results differ"
+        expected, lat, _ = timed(lambda q: search(plain, q, args.top_k), or_queries)
+        report('top-k plain lists', lat)
+        got, lat, decoded = timed(lambda q: compressed.search(q, args.top_k), or_queries, compressed)
+        report('top-k block-max', lat, decoded)
+        assert got == expected, "top-k results differ"
+        compressed.close()
+
+if __name__ == "__main__":
+    main()
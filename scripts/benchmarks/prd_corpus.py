@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+合成 PRD 语料生成器：生成以中文为主、带标题层级、表格和代码块的 Markdown，
+结构上贴近 PRD-Guild-Manager.md，用于拆分/索引脚本的性能基准
+用法：python scripts/benchmarks/prd_corpus.py out.md --size-mb 10 [--seed 42]
+"""
+
+import argparse
+import random
+
+NOUNS = ['公会', '玩家', '会员', '副本', '团队', '装备', '战斗', '经济', '货币', '任务', '赛季', '排行榜',
+         '招募', '训练', '士气', '官员', '联盟', '事件', '奖励', '配置', '数据库', '接口', '界面', '权限']
+VERBS = ['管理', '生成', '计算', '同步', '校验', '触发', '分配', '记录', '展示', '优化', '评估', '调度']
+ADJS = ['核心', '随机化', '动态', '可扩展', '实时', '离线', '高优先级', '基础', '高级', '自动']
+TERMS = ['guild', 'player', 'API', 'raid', 'PvP', 'backend', 'schema', 'economy', 'UI', 'event bus',
+         'SQLite', 'Electron', 'React', 'Phaser', 'SLO', 'Sentry']
+PUNCT = ['，', '，', '，', '；', '、']
+
+def sentence(rng):
+    words = []
+    for _ in range(rng.randint(3, 7)):
+        words.append(rng.choice(ADJS) + rng.choice(NOUNS) + rng.choice(VERBS))
+        if rng.random() < 0.3:
+            words.append(f" {rng.choice(TERMS)} ")
+        words.append(rng.choice(PUNCT))
+    return ''.join(words[:-1]) + '。'
+
+def paragraph(rng):
+    return ''.join(sentence(rng) for _ in range(rng.randint(2, 6)))
+
+def table(rng):
+    cols = rng.randint(3, 5)
+    header = [rng.choice(NOUNS) + rng.choice(['名称', '类型', '数值', '说明', '上限']) for _ in range(cols)]
+    lines = ['| ' + ' | '.join(header) + ' |', '|' + '------|' * cols]
+    for _ in range(rng.randint(3, 8)):
+        row = [rng.choice([rng.choice(NOUNS), str(rng.randint(1, 1000)), rng.choice(TERMS)]) for _ in range(cols)]
+        lines.append('| ' + ' | '.join(row) + ' |')
+    return '\n'.join(lines)
+
+def code_block(rng):
+    name = rng.choice(['Guild', 'Member', 'Raid', 'Event', 'Economy', 'Officer']) + rng.choice(['Info', 'Config', 'State'])
+    lines = ['```typescript', f'interface {name} {{']
+    for _ in range(rng.randint(3, 10)):
+        field = rng.choice(['id', 'name', 'level', 'morale', 'gold', 'members', 'status', 'createdAt'])
+        kind = rng.choice(['string', 'number', 'boolean', 'Date', f'{name}[]'])
+        lines.append(f'  {field}: {kind}  // {rng.choice(NOUNS)}{rng.choice(VERBS)}')
+    lines.append('}')
+    lines.append('```')
+    return '\n'.join(lines)
+
+def bullet_list(rng):
+    return '\n'.join(f'- **{rng.choice(NOUNS)}**: {sentence(rng)}' for _ in range(rng.randint(3, 7)))
+
+def iter_corpus_blocks(rng):
+    """
+    无限产出 Markdown 片段，章节编号递增
+    """
+    yield '# 《公会经理》产品需求文档 (PRD)\n\n**版本**: 2.0  \n**状态**: 合成基准语料\n'
+    chapter = 0
+    while True:
+        chapter += 1
+        title = f'{rng.choice(ADJS)}{rng.choice(NOUNS)}{rng.choice(VERBS)}'
+        yield f'## {chapter}. {title}\n'
+        # 纯文本的章节行，split_prd_by_chapters 按 "N. 标题" 识别章节
+        yield f'{chapter}. {title}概述\n{paragraph(rng)}\n'
+        for sec in range(1, rng.randint(3, 7)):
+            yield f'### {chapter}.{sec} {rng.choice(NOUNS)}{rng.choice(VERBS)}规格\n'
+            for sub in range(1, rng.randint(2, 5)):
+                yield f'#### {chapter}.{sec}.{sub} {rng.choice(ADJS)}{rng.choice(NOUNS)}\n'
+                for _ in range(rng.randint(1, 4)):
+                    kind = rng.random()
+                    if kind < 0.5:
+                        yield paragraph(rng) + '\n'
+                    elif kind < 0.65:
+                        yield table(rng) + '\n'
+                    elif kind < 0.8:
+                        yield code_block(rng) + '\n'
+                    elif kind < 0.9:
+                        yield bullet_list(rng) + '\n'
+                    else:
+                        # 数字编号的纯文本行，split_prd_by_sections / split_prd_by_chapters 以此识别章节
+                        yield f'{chapter}.{sec}.{sub} {rng.choice(NOUNS)}{rng.choice(VERBS)}说明\n{paragraph(rng)}\n'
+
+def generate_corpus(path, size_mb, seed=42):
+    """
+    生成约 size_mb MB（UTF-8 字节）的合成语料，返回实际字节数
+    """
+    rng = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+    written = 0
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        for block in iter_corpus_blocks(rng):
+            data = block + '\n'
+            f.write(data)
+            written += len(data.encode('utf-8'))
+            if written >= target:
+                break
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description='生成合成 PRD 语料')
+    parser.add_argument('output')
+    parser.add_argument('--size-mb', type=float, default=1)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    
+    written = generate_corpus(args.output, args.size_mb, args.seed)
+    print(f"[OK] Created: {args.output} ({written / (1024 * 1024):.1f} MB)")
+
+if __name__ == "__main__":
+    main()
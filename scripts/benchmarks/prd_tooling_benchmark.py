@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PRD 拆分/索引脚本基准套件：在合成语料上测量墙钟时间、MB/s 和峰值内存（RSS），
+结果写成 JSON 基线，可与已有基线比较以发现性能回退
+
+用法：
+    python scripts/benchmarks/prd_tooling_benchmark.py --sizes 1,10,100 --save
+    python scripts/benchmarks/prd_tooling_benchmark.py --sizes 1,10 --compare scripts/benchmarks/baselines/prd_tooling.json
+
+比较时疑似回退的目标最多重测 --retries 次（默认 2）取最好的结果；
+基线和本次都不到 --min-seconds（默认 50 ms）的计时不比较吞吐；
+每个语料大小先跑一遍校准负载（_calibration，与基线一起保存），本机比生成基线时慢时按比例折算基线吞吐。
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from prd_corpus import generate_corpus  # noqa: E402
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / 'baselines' / 'prd_tooling.json'
+DEFAULT_MIN_SECONDS = 0.05   # 低于此耗时的吞吐比较视为噪声
+
+def run_split_markdown(corpus, workdir):
+    from split_prd import split_markdown_by_sections
+    split_markdown_by_sections(corpus, output_dir=os.path.join(workdir, 'md_chunks'), incremental=False)
+
+def run_split_markdown_streaming(corpus, workdir):
+    from split_prd import split_markdown_by_sections
+    split_markdown_by_sections(corpus, output_dir=os.path.join(workdir, 'md_chunks_streaming'),
+                               incremental=False, streaming=True)
+
+def run_split_prd_by_sections(corpus, workdir):
+    from split_large_prd import split_prd_by_sections
+    split_prd_by_sections(corpus, os.path.join(workdir, 'sections'))
+
+def run_split_prd_by_chapters(corpus, workdir):
+    from split_prd_and_generate_tasks import split_prd_by_chapters
+    with open(corpus, 'r', encoding='utf-8') as f:
+        split_prd_by_chapters(f.read())
+
+def run_create_embeddings_index(corpus, workdir):
+    from create_embeddings_index import create_embeddings_index
+    # create_embeddings_index 要求源目录为相对路径
+    os.chdir(workdir)
+    create_embeddings_index('index_chunks', 'bench.index', incremental=False)
+
+def run_calibration(corpus, workdir):
+    """
+    校准负载：与各目标同类的操作（读语料、按行切分、正则扫描、写出再删除块文件），代码不随仓库变化，
+    用来衡量本机此刻相对于生成基线时的快慢
+    """
+    import re
+    with open(corpus, 'r', encoding='utf-8') as f:
+        lines = f.read().split('\n')
+    words = re.compile(r'\w+')
+    out_dir = os.path.join(workdir, 'calibration')
+    os.makedirs(out_dir, exist_ok=True)
+    for idx, start in enumerate(range(0, len(lines), 200)):
+        text = '\n'.join(lines[start:start + 200])
+        words.findall(text)
+        with open(os.path.join(out_dir, f'chunk_{idx:05d}.md'), 'w', encoding='utf-8') as f:
+            f.write(text)
+    shutil.rmtree(out_dir)
+
+CALIBRATION = '_calibration'
+
+TARGETS = {
+    'split_markdown_by_sections': run_split_markdown,
+    'split_markdown_by_sections[streaming]': run_split_markdown_streaming,
+    'split_prd_by_sections': run_split_prd_by_sections,
+    'split_prd_by_chapters': run_split_prd_by_chapters,
+    'create_embeddings_index': run_create_embeddings_index,
+}
+CHILD_TARGETS = dict(TARGETS, **{CALIBRATION: run_calibration})
+
+def peak_rss_mb():
+    """
+    当前进程的峰值 RSS（MB），平台不支持时返回 None
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+def run_child(target, corpus, workdir, result_file):
+    """
+    子进程入口：只运行一个目标，保证峰值内存互不影响
+    """
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        CHILD_TARGETS[target](corpus, workdir)
+        elapsed = time.perf_counter() - start
+    with open(result_file, 'w', encoding='utf-8') as f:
+        json.dump({"seconds": elapsed, "peak_rss_mb": peak_rss_mb()}, f)
+
+def measure(target, corpus, workdir, rounds):
+    """
+    在独立子进程中运行 rounds 次，取最短时间和最大峰值内存
+    """
+    best, rss = None, None
+    result_file = os.path.join(workdir, 'result.json')
+    for _ in range(rounds):
+        subprocess.run(
+            [sys.executable, __file__, '--child', target, '--corpus', corpus,
+             '--workdir', workdir, '--result-file', result_file],
+            check=True, cwd=str(ROOT)
+        )
+        with open(result_file, 'r', encoding='utf-8') as f:
+            result = json.load(f)
+        best = result['seconds'] if best is None else min(best, result['seconds'])
+        if result['peak_rss_mb'] is not None:
+            rss = max(rss or 0, result['peak_rss_mb'])
+    return best, rss
+
+def load_baseline(baseline_file):
+    with open(baseline_file, 'r', encoding='utf-8') as f:
+        return {(r['target'], r['size_mb']): r for r in json.load(f)['results']}
+
+def machine_speed(calibration, baseline):
+    """
+    本机此刻相对基线的速度（校准负载的吞吐之比），只在变慢时生效（不超过 1），没有校准数据时为 1
+    """
+    base = baseline.get((CALIBRATION, calibration['size_mb'])) if calibration else None
+    if not base:
+        return 1.0
+    return min(1.0, calibration['mb_per_s'] / base['mb_per_s'])
+
+def regression_problems(r, base, tolerance, min_seconds=DEFAULT_MIN_SECONDS, speed=1.0):
+    """
+    吞吐下降或峰值内存上升超过 tolerance 视为回退，返回问题描述列表
+    基线和本次耗时都低于 min_seconds 时不比较吞吐：几十毫秒的计时主要是进程调度和缓存的噪声；
+    speed < 1 时（本机比生成基线时慢）基线吞吐按比例折算
+    """
+    problems = []
+    timed = max(r['seconds'], base['seconds']) >= min_seconds
+    expected = base['mb_per_s'] * speed
+    if timed and r['mb_per_s'] < expected * (1 - tolerance):
+        scaled = f" (x{speed:.2f} machine speed)" if speed < 1.0 else ''
+        problems.append(f"throughput {base['mb_per_s']:.1f}{scaled} -> {r['mb_per_s']:.1f} MB/s")
+    if r['peak_rss_mb'] and base.get('peak_rss_mb') and r['peak_rss_mb'] > base['peak_rss_mb'] * (1 + tolerance):
+        problems.append(f"peak RSS {base['peak_rss_mb']:.1f} -> {r['peak_rss_mb']:.1f} MB")
+    return problems
+
+def compare(results, baseline, tolerance, min_seconds=DEFAULT_MIN_SECONDS):
+    """
+    与基线（load_baseline 的结果）比较，返回回退条目数；同一语料大小的校准结果用于折算机器快慢
+    """
+    calibrations = {r['size_mb']: r for r in results if r['target'] == CALIBRATION}
+    regressions = 0
+    for r in results:
+        base = baseline.get((r['target'], r['size_mb']))
+        if not base or r['target'] == CALIBRATION:
+            continue
+        speed = machine_speed(calibrations.get(r['size_mb']), baseline)
+        problems = regression_problems(r, base, tolerance, min_seconds, speed)
+        if problems:
+            regressions += 1
+            print(f"[REGRESSION] {r['target']} @ {r['size_mb']} MB: {'; '.join(problems)}")
+    return regressions
+
+def make_result(target, size_mb, nbytes, seconds, rss):
+    return {
+        "target": target,
+        "size_mb": size_mb,
+        "bytes": nbytes,
+        "seconds": round(seconds, 4),
+        "mb_per_s": round(nbytes / (1024 * 1024) / seconds, 2),
+        "peak_rss_mb": round(rss, 1) if rss is not None else None
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='PRD 拆分/索引脚本基准套件')
+    parser.add_argument('--sizes', default='1,10', help='语料大小（MB），逗号分隔，例如 1,10,100,1000')
+    parser.add_argument('--targets', default=','.join(TARGETS), help='要测的目标，逗号分隔')
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--save', nargs='?', const=str(DEFAULT_BASELINE), help='把结果保存为基线文件')
+    parser.add_argument('--compare', help='与指定基线比较，有回退时返回非零')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--retries', type=int, default=2, help='比较时疑似回退的目标最多重测几次')
+    parser.add_argument('--min-seconds', type=float, default=DEFAULT_MIN_SECONDS,
+                        help='基线和本次耗时都低于该值（秒）时不比较吞吐')
+    # 子进程参数
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--corpus', help=argparse.SUPPRESS)
+    parser.add_argument('--workdir', help=argparse.SUPPRESS)
+    parser.add_argument('--result-file', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.child:
+        run_child(args.child, args.corpus, args.workdir, args.result_file)
+        return
+    
+    targets = [t.strip() for t in args.targets.split(',') if t.strip()]
+    for t in targets:
+        if t not in TARGETS:
+            parser.error(f"unknown target: {t}")
+    sizes = [float(s) for s in args.sizes.split(',')]
+    
+    baseline = load_baseline(args.compare) if args.compare else {}
+    results = []
+    for size_mb in sizes:
+        workdir = tempfile.mkdtemp(prefix='prd_bench_')
+        try:
+            corpus = os.path.join(workdir, 'PRD-Synthetic.md')
+            nbytes = generate_corpus(corpus, size_mb, args.seed)
+            print(f"[INFO] Corpus {size_mb:g} MB: {corpus}")
+            
+            if 'create_embeddings_index' in targets:
+                # 索引基准的输入块不计入计时
+                from split_prd import split_markdown_by_sections
+                with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+                    split_markdown_by_sections(corpus, output_dir=os.path.join(workdir, 'index_chunks'),
+                                               incremental=False, streaming=True)
+            
+            # 校准负载与结果一起保存，比较时据此折算本机快慢
+            calibration = make_result(CALIBRATION, size_mb, nbytes, *measure(CALIBRATION, corpus, workdir, args.rounds))
+            results.append(calibration)
+            speed = machine_speed(calibration, baseline)
+            if baseline:
+                print(f"[INFO] Machine speed vs baseline: x{speed:.2f}")
+            
+            for target in targets:
+                seconds, rss = measure(target, corpus, workdir, args.rounds)
+                result = make_result(target, size_mb, nbytes, seconds, rss)
+                base = baseline.get((target, size_mb))
+                retries = args.retries
+                while base and retries > 0 and regression_problems(result, base, args.tolerance, args.min_seconds,
+                                                                   speed):
+                    # 疑似回退时重测，取最好的结果：虚拟机上的 I/O 和调度抖动可达 20-30%，单次测量不足为凭
+                    retries -= 1
+                    retry_seconds, retry_rss = measure(target, corpus, workdir, args.rounds)
+                    seconds = min(seconds, retry_seconds)
+                    if rss is not None and retry_rss is not None:
+                        rss = min(rss, retry_rss)
+                    result = make_result(target, size_mb, nbytes, seconds, rss)
+                results.append(result)
+                rss_text = f"{result['peak_rss_mb']} MB" if rss is not None else 'n/a'
+                print(f"[RESULT] {target:40s} {size_mb:>7g} MB  {seconds:8.3f}s  "
+                      f"{result['mb_per_s']:8.2f} MB/s  peak RSS {rss_text}")
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    
+    if args.save:
+        Path(args.save).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({
+                "generated_at": datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+                "environment": {
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "cpu_count": os.cpu_count()
+                },
+                "rounds": args.rounds,
+                "seed": args.seed,
+                "results": results
+            }, f, indent=2)
+        print(f"[INFO] Baseline saved: {args.save}")
+    
+    if args.compare:
+        regressions = compare(results, baseline, args.tolerance, args.min_seconds)
+        print(f"[INFO] Regressions: {regressions}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+split_prd 块边界引擎吞吐基准：把 PRD 复制 N 份后测量 MB/s，
+同时测量引擎引入前的贪心切块循环作为基线，并核对两者切出的块一致
+用法：python scripts/benchmarks/split_prd_throughput.py [--repeat 100] [--chunk-size 8000]
+"""
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+from split_prd import iter_sections  # noqa: E402
+
+def baseline_iter_sections(lines, chunk_size=8000):
+    """
+    引擎引入前 split_prd.iter_sections 的贪心循环，原样保留作对照
+    """
+    current_section = []
+    current_size = 0
+    
+    for line in lines:
+        is_header = line.strip().startswith('#')
+        if is_header and re.match(r'^#{1,3}\s', line) and current_size > chunk_size * 0.7:
+            if current_section:
+                yield '\n'.join(current_section)
+                current_section = []
+                current_size = 0
+        
+        current_section.append(line)
+        current_size += len(line) + 1
+        
+        if current_size > chunk_size:
+            split_point = len(current_section)
+            for j in range(len(current_section) - 1, max(len(current_section) - 20, 0), -1):
+                if current_section[j].strip() == '' and j > 0:
+                    split_point = j
+                    break
+            yield '\n'.join(current_section[:split_point])
+            current_section = current_section[split_point:]
+            current_size = sum(len(line) + 1 for line in current_section)
+    
+    if current_section:
+        yield '\n'.join(current_section)
+
+def best_of(label, split, lines, chunk_size, rounds, size_mb):
+    best = None
+    for r in range(1, rounds + 1):
+        start = time.perf_counter()
+        chunks = sum(1 for _ in split(lines, chunk_size))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        print(f"[RUN {r}] {label}: {chunks} chunks in {elapsed:.3f}s ({size_mb / elapsed:.1f} MB/s)")
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description='split_prd 块边界引擎吞吐基准')
+    parser.add_argument('--source', default=str(ROOT / 'docs' / 'PRD-Guild-Manager-patched.md'))
+    parser.add_argument('--repeat', type=int, default=100)
+    parser.add_argument('--chunk-size', type=int, default=8000)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    with open(args.source, 'r', encoding='utf-8') as f:
+        content = f.read()
+    corpus = '\n'.join([content] * args.repeat)
+    size_mb = len(corpus.encode('utf-8')) / (1024 * 1024)
+    lines = corpus.split('\n')
+    print(f"[INFO] Corpus: {args.source} x{args.repeat} = {size_mb:.1f} MB, {len(lines)} lines")
+
+    if list(baseline_iter_sections(lines, args.chunk_size)) != list(iter_sections(lines, args.chunk_size)):
+        print("[WARN] engine chunks differ from the baseline loop")
+
+    baseline = best_of('baseline', baseline_iter_sections, lines, args.chunk_size, args.rounds, size_mb)
+    engine = best_of('engine', iter_sections, lines, args.chunk_size, args.rounds, size_mb)
+
+    print(f"[RESULT] baseline best {baseline:.3f}s ({size_mb / baseline:.1f} MB/s), "
+          f"engine best {engine:.3f}s ({size_mb / engine:.1f} MB/s), speedup {baseline / engine:.2f}x")
+
+if __name__ == "__main__":
+    main()
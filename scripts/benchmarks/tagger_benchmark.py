@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+标签匹配基准：在合成 PRD 语料的块和仓库里的真实块上比较三种打标签方式的耗时
+  presence  原 extract_tags：每个关键词一次 in 扫描，命中即停，只知道有没有，不能按次数排序
+  count     每个关键词一次 str.count 全文扫描，得到与 TagMatcher 同样用途的命中次数
+  matcher   TagMatcher.count：去掉同标签前缀词后逐词 str.count，可能自身重叠的标签用本标签正则
+presence 命中即停，耗时取决于关键词出现得多早，是计数方式的下限参考，不输出次数。
+用法：python scripts/benchmarks/tagger_benchmark.py [--size-mb 5] [--rounds 5]
+"""
+
+import argparse
+import contextlib
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from prd_corpus import generate_corpus  # noqa: E402
+from prd_tagger import TagMatcher, load_tag_taxonomy  # noqa: E402
+from split_prd import split_markdown_by_sections  # noqa: E402
+
+def presence_tags(taxonomy, max_tags):
+    """
+    基线：原 extract_tags 的逐词 in 扫描
+    """
+    def run(content):
+        content_lower = content.lower()
+        return [tag for tag, terms in taxonomy.items()
+                if any(term.lower() in content_lower for term in terms)][:max_tags]
+    return run
+
+def count_tags(taxonomy):
+    """
+    逐词 str.count：每个关键词各扫一遍全文
+    """
+    term_tags = [(term.lower(), tag) for tag, terms in taxonomy.items() for term in terms]
+    def run(content):
+        content_lower = content.lower()
+        counts = {}
+        for term, tag in term_tags:
+            n = content_lower.count(term)
+            if n:
+                counts[tag] = counts.get(tag, 0) + n
+        return counts
+    return run
+
+def best_time(func, texts, rounds):
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for text in texts:
+            func(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def load_corpora(workdir, size_mb, seed):
+    """
+    返回 [(名称, 文本列表)]：合成语料拆出的块、docs/prd_chunks、XML 分片
+    """
+    corpus = workdir / 'PRD-Synthetic.md'
+    generate_corpus(str(corpus), size_mb, seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        split_markdown_by_sections(str(corpus), output_dir=str(workdir / 'chunks'), incremental=False,
+                                   streaming=True)
+    read = lambda paths: [path.read_text(encoding='utf-8') for path in paths]
+    return [
+        (f'synthetic {size_mb:g} MB', read(sorted((workdir / 'chunks').glob('*_chunk_*.md')))),
+        ('docs/prd_chunks', read(sorted((ROOT / 'docs' / 'prd_chunks').glob('*.md')))),
+        ('shards', read(sorted((ROOT / 'shards').glob('*.xml')))),
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description='标签匹配基准')
+    parser.add_argument('--size-mb', type=float, default=5)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    taxonomy, max_tags = load_tag_taxonomy()
+    matcher = TagMatcher(taxonomy, max_tags)
+    modes = [('presence', presence_tags(taxonomy, max_tags)), ('count', count_tags(taxonomy)),
+             ('matcher', matcher.count)]
+
+    with tempfile.TemporaryDirectory(prefix='prd_tagger_') as workdir:
+        corpora = load_corpora(Path(workdir), args.size_mb, args.seed)
+    print(f"{'corpus':>20} {'docs':>6} {'MB':>7} " + ' '.join(f'{name + " s":>11}' for name, _ in modes)
+          + f" {'vs presence':>12} {'vs count':>9}")
+    for label, texts in corpora:
+        if not texts:
+            continue
+        times = {name: best_time(func, texts, args.rounds) for name, func in modes}
+        size = sum(len(text.encode('utf-8')) for text in texts) / (1024 * 1024)
+        print(f"{label:>20} {len(texts):>6} {size:>7.2f} " + ' '.join(f'{times[name]:>11.4f}' for name, _ in modes)
+              + f" {times['matcher'] / times['presence']:>11.2f}x {times['matcher'] / times['count']:>8.2f}x")
+
+if __name__ == "__main__":
+    main()
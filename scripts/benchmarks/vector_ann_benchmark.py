@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+向量索引 IVF 近似检索基准：在合成 PRD 语料的块上比较精确检索与不同 nprobe 的 recall@10 和查询延迟
+用法：python scripts/benchmarks/vector_ann_benchmark.py [--size-mb 20] [--chunk-size 1000] [--nprobe 1,2,4,8,16,32]
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from prd_corpus import generate_corpus  # noqa: E402
+from split_prd import iter_file_lines, iter_sections  # noqa: E402
+from prd_vector_index import VectorIndex, build_vector_index, build_ivf  # noqa: E402
+
+def time_queries(index, queries, top_k, nprobe):
+    latencies, results = [], []
+    for vec in queries:
+        start = time.perf_counter()
+        results.append([row for _, row in index.search_vector(vec, top_k, nprobe)])
+        latencies.append((time.perf_counter() - start) * 1000)
+    return results, latencies
+
+def main():
+    parser = argparse.ArgumentParser(description='向量索引 IVF 近似检索基准')
+    parser.add_argument('--size-mb', type=float, default=20)
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--nlist', type=int, help='簇数，默认约 sqrt(N)')
+    parser.add_argument('--nprobe', default='1,2,4,8,16,32')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='prd_ann_') as workdir:
+        corpus = Path(workdir) / 'corpus.md'
+        generate_corpus(corpus, args.size_mb, args.seed)
+        chunks = list(iter_sections(iter_file_lines(corpus), args.chunk_size))
+        index_file = str(Path(workdir) / 'bench.index')
+        docs = [{"id": f"chunk_{i}", "file": "corpus.md", "title": f"chunk {i}"} for i in range(len(chunks))]
+
+        start = time.perf_counter()
+        build_vector_index(lambda: iter(chunks), docs, index_file)
+        vector_time = time.perf_counter() - start
+        start = time.perf_counter()
+        build_ivf(index_file, args.nlist)
+        ivf_time = time.perf_counter() - start
+
+        index = VectorIndex(index_file)
+        nlist = index.ivf['centroids'].shape[0]
+        print(f"[INFO] {len(chunks)} chunks, vectors {vector_time:.2f}s, IVF nlist={nlist} {ivf_time:.2f}s")
+
+        # 查询取自随机块中的一段原文，模拟“按片段找出处”的检索
+        rng = random.Random(args.seed)
+        queries = []
+        for text in rng.sample(chunks, min(args.queries, len(chunks))):
+            lines = [line for line in text.split('\n') if line.strip()]
+            queries.append(index.embed(rng.choice(lines)))
+
+        exact, exact_lat = time_queries(index, queries, args.top_k, None)
+        print(f"{'mode':>12} {'recall@' + str(args.top_k):>10} {'mean ms':>9} {'p95 ms':>9}")
+        print(f"{'exact':>12} {1.0:>10.3f} {statistics.mean(exact_lat):>9.3f} "
+              f"{statistics.quantiles(exact_lat, n=20)[-1]:>9.3f}")
+        for nprobe in (int(x) for x in args.nprobe.split(',')):
+            approx, lat = time_queries(index, queries, args.top_k, nprobe)
+            recall = statistics.mean(
+                len(set(a) & set(e)) / max(1, len(e)) for a, e in zip(approx, exact)
+            )
+            print(f"{'nprobe=' + str(nprobe):>12} {recall:>10.3f} {statistics.mean(lat):>9.3f} "
+                  f"{statistics.quantiles(lat, n=20)[-1]:>9.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -1,103 +1,633 @@
 #!/usr/bin/env python3
 import os
 import re
+import io
+import glob
+import json
+import hashlib
+import statistics
+import argparse
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-def split_markdown_by_sections(file_path, chunk_size=8000, output_dir='docs/prd_chunks'):
+from token_estimator import estimate_tokens, line_token_cost
+from chunk_store import ChunkStoreWriter
+
+def iter_file_lines(file_path):
+    """
+    逐行读取文件，行尾不带换行符，结果与 content.split('\\n') 一致
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        line = ''
+        for line in f:
+            yield line[:-1] if line.endswith('\n') else line
+        # 以换行结尾（或空文件）时 split 会多出一个空串
+        if line == '' or line.endswith('\n'):
+            yield ''
+
+HEADING_RE = re.compile(r'^(#{1,6})\s')
+
+def char_cost(line):
+    """
+    默认行代价：字符数加换行符
+    """
+    return len(line) + 1
+
+MAJOR_HEADING_RE = re.compile(r'#{1,3}\s')
+
+class ChunkBoundaryEngine:
+    """
+    块边界引擎：按标题和段落边界贪心切块，超限时只回看最后 lookback 行找空行
+
+    measure 为行代价函数，默认按字符计；传入 line_token_cost 即按 token 预算切块
+
+    回看窗口里没有空行时，默认连同超限的那一行一起成块（字符模式的 chunk_size 是软上限）；
+    strict=True 时在该行之前切，块大小不超过 chunk_size，只有单独一行就超限时例外
+    """
+    def __init__(self, chunk_size=8000, lookback=20, measure=char_cost, strict=False):
+        self.chunk_size = chunk_size
+        self.lookback = lookback
+        self.measure = measure
+        self.strict = strict
+
+    def split(self, lines):
+        """
+        逐行消费 lines，每完成一个块就立即产出；热循环只用局部变量，
+        切块后剩余的行不超过 lookback 行，重算代价的开销有上界
+        """
+        chunk_size = self.chunk_size
+        soft_limit = chunk_size * 0.7
+        lookback = self.lookback
+        measure = self.measure
+        strict = self.strict
+        by_chars = measure is char_cost
+        current = []
+        size = 0
+        for line in lines:
+            # 如果是主要标题（1-3级）且当前块已经很大，则开始新块
+            if line[:1] == '#' and size > soft_limit and current and MAJOR_HEADING_RE.match(line):
+                yield '\n'.join(current)
+                current = []
+                size = 0
+            
+            # 添加当前行
+            current.append(line)
+            size += len(line) + 1 if by_chars else measure(line)
+            
+            # 如果超过chunk_size，在最近的空行处分割（只看最后 lookback 行）
+            # strict 时切完剩下的行仍可能超限（空行之后紧跟超长行），继续切直到不超限
+            while size > chunk_size:
+                n = len(current)
+                split_point = n
+                for j in range(n - 1, max(n - lookback, 0), -1):
+                    if not current[j].strip():
+                        split_point = j
+                        break
+                if split_point == n and strict and n > 1:
+                    split_point = n - 1
+                if split_point == n:
+                    yield '\n'.join(current)
+                    current = []
+                    size = 0
+                else:
+                    yield '\n'.join(current[:split_point])
+                    current = current[split_point:]
+                    size = sum(len(rest) + 1 for rest in current) if by_chars else sum(map(measure, current))
+                if not strict:
+                    break
+        
+        # 保存最后一个块
+        if current:
+            yield '\n'.join(current)
+
+def iter_sections(lines, chunk_size=8000, measure=char_cost, strict=False):
+    """
+    按标题和段落边界把行序列切成块，每完成一个块就立即产出；strict 见 ChunkBoundaryEngine
+    """
+    return ChunkBoundaryEngine(chunk_size, measure=measure, strict=strict).split(lines)
+
+# 候选切点的惩罚，按 limit² 的比例计；1-3 级标题前切分不罚
+CUT_PENALTIES = {
+    'heading': 0.0,
+    'subheading': 0.002,
+    'fence_end': 0.005,
+    'blank': 0.01,
+    'code_blank': 0.03,
+    'forced': 1.0,
+}
+
+def optimal_cut_points(lines, limit=8000, measure=char_cost):
+    """
+    动态规划求最优切分：候选切点为标题前、空行前（代码块内的空行罚得更重）和代码块结束后，
+    目标为 Σ(limit - 块大小)² + 切点惩罚（最后一块不计空余），块大小不超过 limit。
+    空余的平方项同时压低块数和块大小方差。
+
+    每个切点只回看窗口内（累计大小不超过 limit）的候选，复杂度 O(n·w)，
+    w 为一个块内的候选数，与文档长度无关。只保存每行的代价，lines 可以是流式迭代器。
+    返回切点行号列表，首尾为 0 和总行数。
+    """
+    scale = limit * limit
+    prefix = [0]
+    cands = [0]
+    pens = [0]
+    in_fence = False
+    fence_closed = False
+    n = 0
+    for n, line in enumerate(lines):
+        stripped = line.strip()
+        pen = None
+        if stripped == '':
+            pen = CUT_PENALTIES['code_blank' if in_fence else 'blank']
+        elif not in_fence:
+            m = HEADING_RE.match(line)
+            if m:
+                pen = CUT_PENALTIES['heading' if len(m.group(1)) <= 3 else 'subheading']
+        if fence_closed:
+            pen = CUT_PENALTIES['fence_end'] if pen is None else min(pen, CUT_PENALTIES['fence_end'])
+        if n > 0 and pen is not None:
+            cands.append(n)
+            pens.append(int(pen * scale))
+        
+        is_fence = stripped.startswith('```') or stripped.startswith('~~~')
+        fence_closed = is_fence and in_fence
+        if is_fence:
+            in_fence = not in_fence
+        prefix.append(prefix[-1] + measure(line))
+    n += 1
+    cands.append(n)
+    pens.append(0)
+    
+    # 相邻候选之间超过 limit 时，允许在其间任意行强制切分
+    forced_pen = int(CUT_PENALTIES['forced'] * scale)
+    full_cands, full_pens = [], []
+    for t, (c, pen) in enumerate(zip(cands, pens)):
+        if t > 0 and prefix[c] - prefix[cands[t - 1]] > limit:
+            for k in range(cands[t - 1] + 1, c):
+                full_cands.append(k)
+                full_pens.append(forced_pen)
+        full_cands.append(c)
+        full_pens.append(pen)
+    cands, pens = full_cands, full_pens
+    
+    best = [0] * len(cands)
+    back = [0] * len(cands)
+    lo = 0
+    for t in range(1, len(cands)):
+        end = prefix[cands[t]]
+        while prefix[cands[t]] - prefix[cands[lo]] > limit and lo < t - 1:
+            lo += 1
+        last = cands[t] == n
+        best_cost, best_s = None, t - 1
+        for s in range(lo, t):
+            size = end - prefix[cands[s]]
+            if size > limit and s != t - 1:
+                continue
+            slack = 0 if last else max(limit - size, 0)
+            cost = best[s] + slack * slack
+            if best_cost is None or cost < best_cost:
+                best_cost, best_s = cost, s
+        best[t] = best_cost + pens[t]
+        back[t] = best_s
+    
+    cuts = []
+    t = len(cands) - 1
+    while t > 0:
+        cuts.append(cands[t])
+        t = back[t]
+    cuts.append(0)
+    return cuts[::-1]
+
+def iter_sections_at_cuts(lines, cuts):
+    """
+    按给定切点行号把行序列拼成块
+    """
+    current = []
+    boundaries = iter(cuts[1:])
+    next_cut = next(boundaries, None)
+    for k, line in enumerate(lines):
+        if k == next_cut:
+            yield '\n'.join(current)
+            current = []
+            next_cut = next(boundaries, None)
+        current.append(line)
+    yield '\n'.join(current)
+
+def chunk_stats(sections, limit, measure=char_cost):
+    """
+    统计块大小分布：块数、均值、标准差、最小/最大值、过小（<25%）和超限块数
+    """
+    sizes = [sum(measure(line) for line in section.split('\n')) for section in sections]
+    if not sizes:
+        return {"count": 0}
+    return {
+        "count": len(sizes),
+        "mean": round(statistics.mean(sizes), 1),
+        "stdev": round(statistics.pstdev(sizes), 1),
+        "min": min(sizes),
+        "max": max(sizes),
+        "tiny": sum(1 for size in sizes if size < limit * 0.25),
+        "oversized": sum(1 for size in sizes if size > limit)
+    }
+
+def compare_boundary_modes(file_path, chunk_size=8000, token_budget=None):
+    """
+    对同一文档分别用贪心和最优切分，打印并返回两者的块大小统计；
+    返回值中 cuts 为最优切点，调用方可直接用来切分，不必再跑一遍动态规划
+    """
+    if token_budget:
+        limit, measure = token_budget, line_token_cost
+    else:
+        limit, measure = chunk_size, char_cost
+    
+    greedy = chunk_stats(iter_sections(iter_file_lines(file_path), limit, measure, bool(token_budget)), limit, measure)
+    cuts = optimal_cut_points(iter_file_lines(file_path), limit, measure)
+    optimal = chunk_stats(iter_sections_at_cuts(iter_file_lines(file_path), cuts), limit, measure)
+    
+    print(f"[INFO] Boundary stats for {file_path} (limit {limit}):")
+    print(f"  {'mode':8s} {'count':>6s} {'mean':>9s} {'stdev':>9s} {'min':>7s} {'max':>7s} {'tiny':>5s} {'over':>5s}")
+    for mode, st in (('greedy', greedy), ('optimal', optimal)):
+        print(f"  {mode:8s} {st['count']:>6d} {st['mean']:>9.1f} {st['stdev']:>9.1f} {st['min']:>7d} "
+              f"{st['max']:>7d} {st['tiny']:>5d} {st['oversized']:>5d}")
+    return {"greedy": greedy, "optimal": optimal, "cuts": cuts}
+
+class HeadingTracker:
+    """
+    跟踪当前所在的标题路径（忽略代码块中的 # 行）
+    """
+    def __init__(self):
+        self.stack = []        # [(级别, 标题文本)]
+        self.in_fence = False
+
+    def feed(self, line):
+        stripped = line.strip()
+        if stripped.startswith('```') or stripped.startswith('~~~'):
+            self.in_fence = not self.in_fence
+            return
+        if self.in_fence:
+            return
+        m = HEADING_RE.match(line)
+        if m:
+            level = len(m.group(1))
+            while self.stack and self.stack[-1][0] >= level:
+                self.stack.pop()
+            self.stack.append((level, line[m.end():].strip()))
+
+    def path(self):
+        return [title for _, title in self.stack]
+
+def iter_chunk_records(sections, count_tokens=False):
+    """
+    为每个块补充清单信息：内容哈希、源文件字节范围、标题路径（token 模式下含估算 token 数）
+    """
+    tracker = HeadingTracker()
+    byte_start = 0
+    for section in sections:
+        lines = section.split('\n')
+        tracker.feed(lines[0])
+        heading_path = tracker.path()
+        for line in lines[1:]:
+            tracker.feed(line)
+        
+        data = section.encode('utf-8')
+        record = {
+            'text': section,
+            'sha256': hashlib.sha256(data).hexdigest(),
+            'byte_start': byte_start,
+            'byte_end': byte_start + len(data),
+            'heading_path': heading_path,
+        }
+        if count_tokens:
+            record['tokens'] = estimate_tokens(section)
+        yield record
+        # 块之间由一个换行符分隔
+        byte_start += len(data) + 1
+
+def chunk_header(source, idx, total, section, tokens=None, extra=None):
+    """
+    块文件头部字段（字符串值），token 模式下额外记录估算 token 数，
+    extra 中的字段排在 source 之后；同样写进清单，供索引脚本免读文件获取元信息
+    """
+    header = {"source": str(source)}
+    header.update((key, str(value)) for key, value in (extra or {}).items())
+    header["chunk"] = f"{idx}/{total}"
+    header["size"] = f"{len(section)} chars"
+    if tokens is not None:
+        header["tokens"] = str(tokens)
+    return header
+
+def render_chunk(source, idx, total, section, tokens=None, extra=None, header=None):
+    """
+    生成单个块文件内容（带元信息头部）
+    """
+    if header is None:
+        header = chunk_header(source, idx, total, section, tokens, extra)
+    header_lines = ''.join(f"{key}: {value}\n" for key, value in header.items())
+    return f"---\n{header_lines}---\n\n{section}"
+
+def render_chunks_index(base_name, file_path, total, chunk_size, unit='chars'):
+    """
+    生成块索引文件内容
+    """
+    parts = [
+        f"# {base_name} Document Chunks Index\n\n",
+        f"Total chunks: {total}\n",
+        f"Original file: {file_path}\n",
+        f"Chunk size: ~{chunk_size} {unit}\n\n",
+        "## Chunks List\n\n",
+    ]
+    for idx in range(1, total + 1):
+        chunk_file = f"{base_name}_chunk_{idx:03d}.md"
+        parts.append(f"- [{chunk_file}](./{chunk_file})\n")
+    return ''.join(parts)
+
+def write_if_changed(path, text):
+    """
+    内容不同才写盘，返回是否写入
+    """
+    path = Path(path)
+    if path.exists():
+        with open(path, 'r', encoding='utf-8') as f:
+            if f.read() == text:
+                return False
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    return True
+
+def load_manifest(manifest_file):
+    """
+    读取上一次运行的块清单，不存在或损坏时返回 None
+    """
+    try:
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def split_markdown_by_sections(file_path, chunk_size=8000, output_dir='docs/prd_chunks', streaming=False,
+                               incremental=True, token_budget=None, packed=False, boundary='greedy',
+                               boundary_stats=False):
     """
     智能拆分Markdown文档，尽量保持章节完整性
+
+    streaming=True 时逐行读取源文件，每个块一结束就写盘，
+    峰值内存约为一个块；总块数通过一次预计数扫描得到。
+
+    每次运行都会写出 {base_name}_manifest.json，记录每个块的哈希、
+    字节范围、标题路径、头部字段（header）和块文件字节数（file_bytes）；
+    create_embeddings_index.py 直接从清单取元信息，正文没变的块不必再读文件。
+    incremental=True 时只重写内容变化的块，
+    变化的块号记录在清单的 changed / removed 字段中供下游增量处理。
+
+    token_budget 设置后按估算 token 数（见 token_estimator）而不是字符数切块，
+    此时忽略 chunk_size；token 预算是硬上限，只有单独一行就超出预算时该行自成一块。
+
+    packed=True 时不写单独的块文件，而是把所有块写进一个 {base_name}.chunks
+    打包存储（见 chunk_store），读取端可 mmap 后按序号取块。
+
+    boundary='optimal' 时用 optimal_cut_points 的动态规划切分代替贪心切分；
+    boundary_stats=True 时另外打印两种模式的块大小统计以便对比（多读两遍源文件）。
     """
     # 创建输出目录
     Path(output_dir).mkdir(parents=True, exist_ok=True)
     
-    # 读取文档
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
+    # token 预算是硬上限，字符数沿用原来的软上限
+    strict = bool(token_budget)
+    if token_budget:
+        limit, measure, unit = token_budget, line_token_cost, 'tokens'
+    else:
+        limit, measure, unit = chunk_size, char_cost, 'chars'
     
-    # 按标题分割文档
-    sections = []
-    current_section = []
-    current_size = 0
+    if boundary == 'optimal':
+        # 第一遍只记录每行代价求切点，第二遍按切点产出块
+        if boundary_stats:
+            cuts = compare_boundary_modes(file_path, chunk_size, token_budget)['cuts']
+        else:
+            cuts = optimal_cut_points(iter_file_lines(file_path), limit, measure)
+        total = len(cuts) - 1
+        sections = iter_sections_at_cuts(iter_file_lines(file_path), cuts)
+    elif streaming:
+        # 预计数：只统计块数，不保留任何块内容（打包存储把总数写在文件尾，不需要预计数）
+        total = None if packed else sum(1 for _ in iter_sections(iter_file_lines(file_path), limit, measure, strict))
+        sections = iter_sections(iter_file_lines(file_path), limit, measure, strict)
+    else:
+        # 读取文档
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        sections = list(iter_sections(content.split('\n'), limit, measure, strict))
+        total = len(sections)
     
-    lines = content.split('\n')
-    i = 0
-    
-    while i < len(lines):
-        line = lines[i]
-        
-        # 检测标题行（# 开头）
-        is_header = line.strip().startswith('#')
-        
-        # 如果是主要标题（1-3级）且当前块已经很大，则开始新块
-        if is_header and re.match(r'^#{1,3}\s', line) and current_size > chunk_size * 0.7:
-            if current_section:
-                sections.append('\n'.join(current_section))
-                current_section = []
-                current_size = 0
-        
-        # 添加当前行
-        current_section.append(line)
-        current_size += len(line) + 1
-        
-        # 如果超过chunk_size，在合适的位置分割
-        if current_size > chunk_size:
-            # 尝试在段落结束处分割
-            split_point = len(current_section)
-            for j in range(len(current_section) - 1, max(len(current_section) - 20, 0), -1):
-                if current_section[j].strip() == '' and j > 0:
-                    split_point = j
-                    break
-            
-            # 保存当前块
-            sections.append('\n'.join(current_section[:split_point]))
-            
-            # 剩余部分作为新块的开始
-            current_section = current_section[split_point:]
-            current_size = sum(len(line) + 1 for line in current_section)
-        
-        i += 1
+    base_name = Path(file_path).stem
+    manifest_file = Path(output_dir) / f"{base_name}_manifest.json"
+    # 上一次的清单总要读：即使不做增量，也要靠它清理上次留下的文件
+    previous = load_manifest(manifest_file)
+    previous_chunks = {}
+    if (incremental and previous and previous.get('source') == str(file_path)
+            and previous.get('token_budget') == token_budget and previous.get('boundary', 'greedy') == boundary
+            and (packed or previous.get('total_chunks') == total)):
+        # 单文件块的头部含块总数，总数或来源变化时头部都会变，只能全部重写；
+        # 打包存储的块没有头部，只按正文哈希判断（流式打包时事先不知道总数）
+        previous_chunks = {c['chunk']: c['sha256'] for c in previous.get('chunks', [])}
     
-    # 保存最后一个块
-    if current_section:
-        sections.append('\n'.join(current_section))
+    store = None
+    if packed:
+        store_file = Path(output_dir) / f"{base_name}.chunks"
+        store = ChunkStoreWriter(store_file, {
+            "source": str(file_path),
+            "chunk_size": chunk_size,
+            "token_budget": token_budget
+        })
     
     # 写入文件
-    base_name = Path(file_path).stem
-    for idx, section in enumerate(sections, 1):
-        output_file = Path(output_dir) / f"{base_name}_chunk_{idx:03d}.md"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            # 添加元信息头部
-            f.write(f"---\n")
-            f.write(f"source: {file_path}\n")
-            f.write(f"chunk: {idx}/{len(sections)}\n")
-            f.write(f"size: {len(section)} chars\n")
-            f.write(f"---\n\n")
-            f.write(section)
+    chunks = []
+    changed = []
+    for idx, record in enumerate(iter_chunk_records(sections, bool(token_budget)), 1):
+        section = record.pop('text')
+        chunk_file = store_file.name if packed else f"{base_name}_chunk_{idx:03d}.md"
+        output_file = Path(output_dir) / chunk_file
+        record = {'chunk': idx, 'file': chunk_file, 'size': len(section), **record}
+        chunks.append(record)
         
-        print(f"[OK] Created: {output_file} ({len(section)} chars)")
-    
-    # 创建索引文件
-    index_file = Path(output_dir) / f"{base_name}_index.md"
-    with open(index_file, 'w', encoding='utf-8') as f:
-        f.write(f"# {base_name} Document Chunks Index\n\n")
-        f.write(f"Total chunks: {len(sections)}\n")
-        f.write(f"Original file: {file_path}\n")
-        f.write(f"Chunk size: ~{chunk_size} chars\n\n")
-        f.write("## Chunks List\n\n")
-        
-        for idx in range(1, len(sections) + 1):
-            chunk_file = f"{base_name}_chunk_{idx:03d}.md"
-            f.write(f"- [{chunk_file}](./{chunk_file})\n")
+        unchanged = previous_chunks.get(idx) == record['sha256']
+        if packed:
+            # 打包存储整体重写，changed 仍按内容哈希统计
+            store.append(section, record)
+        else:
+            record['header'] = chunk_header(file_path, idx, total, section, record.get('tokens'))
+            text = render_chunk(file_path, idx, total, section, header=record['header'])
+            record['file_bytes'] = len(text.encode('utf-8'))
+            # 文件大小不符说明拆分后被手工改过，照常重写
+            if unchanged and output_file.exists() and output_file.stat().st_size == record['file_bytes']:
+                continue
+            with open(output_file, 'w', encoding='utf-8') as f:
+                f.write(text)
+            print(f"[OK] Created: {output_file} ({len(section)} chars)")
+        if not unchanged:
+            changed.append(idx)
+    
+    total = len(chunks)
+    
+    # 清理上次运行留下、本次不再写出的文件：块数减少时多出的块文件，
+    # 以及在单文件块和打包存储之间切换时另一种格式的全部文件（不论文件名），避免同一内容被索引两次
+    current_files = {c['file'] for c in chunks}
+    previous_files = [old['file'] for old in (previous or {}).get('chunks', [])]
+    for name in dict.fromkeys(previous_files):
+        old_file = Path(output_dir) / Path(name).name
+        if name not in current_files and old_file.exists():
+            old_file.unlink()
+            print(f"[OK] Removed: {old_file}")
+    removed = [old['chunk'] for old in (previous or {}).get('chunks', [])
+               if incremental and old['chunk'] > total]
+    old_index_file = Path(output_dir) / f"{base_name}_index.md"
+    if packed and any(name.endswith('.md') for name in previous_files) and old_index_file.exists():
+        # 单文件块的索引页列出的块文件已删除
+        old_index_file.unlink()
+        print(f"[OK] Removed: {old_index_file}")
+    
+    if packed:
+        store.close()
+        index_file = store_file
+        print(f"[OK] Created: {store_file} ({total} chunks)")
+    else:
+        # 创建索引文件
+        index_file = Path(output_dir) / f"{base_name}_index.md"
+        write_if_changed(index_file, render_chunks_index(base_name, file_path, total, limit, unit))
+    
+    manifest = {
+        "version": "1.0",
+        "source": str(file_path),
+        "chunk_size": chunk_size,
+        "token_budget": token_budget,
+        "boundary": boundary,
+        "total_chunks": total,
+        "changed": changed,
+        "removed": removed,
+        "chunks": chunks
+    }
+    with open(manifest_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
     
-    print(f"\n[INFO] Total chunks created: {len(sections)}")
+    print(f"\n[INFO] Total chunks created: {total}")
+    print(f"[INFO] Changed chunks: {len(changed)}, removed: {len(removed)}")
     print(f"[INFO] Index file: {index_file}")
+    print(f"[INFO] Manifest file: {manifest_file}")
+    
+    return total
+
+def expand_sources(source, pattern='*.md'):
+    """
+    把目录或通配符展开为排好序的源文件列表
+    """
+    path = Path(source)
+    if path.is_dir():
+        files = path.glob(pattern)
+    elif any(ch in str(source) for ch in '*?['):
+        files = (Path(p) for p in glob.glob(str(source), recursive=True))
+    else:
+        files = [path]
+    # 跳过已生成的块文件和索引文件
+    return sorted(
+        f for f in files
+        if f.is_file() and not f.stem.endswith('_index') and '_chunk_' not in f.stem
+    )
+
+def _split_one(job):
+    """
+    进程池工作函数：拆分单个文件，屏蔽逐块输出，返回 (文件, 块数)
+    """
+    file_path, kwargs = job
+    with contextlib.redirect_stdout(io.StringIO()):
+        total = split_markdown_by_sections(file_path, **kwargs)
+    return file_path, total
+
+def split_markdown_batch(source, chunk_size=8000, output_dir='docs/prd_chunks', workers=None,
+                         pattern='*.md', **kwargs):
+    """
+    批量拆分目录或通配符匹配的所有文档，文件分发到进程池并行处理
+
+    每个文件写出各自的块文件和清单，另外生成一个合并索引 all_chunks_index.md。
+    文件按路径排序，结果按同一顺序收集，输出与 workers 数量无关。
+    """
+    files = expand_sources(source, pattern)
+    if not files:
+        print(f"[WARN] No source files matched: {source}")
+        return {}
+    
+    # 不同目录下同名文件会写到同一组块文件，提前报错
+    stems = {}
+    for f in files:
+        if f.stem in stems:
+            raise ValueError(f"Duplicate document name '{f.stem}': {stems[f.stem]} and {f}")
+        stems[f.stem] = f
+    
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    kwargs = dict(kwargs, chunk_size=chunk_size, output_dir=output_dir)
+    jobs = [(str(f), kwargs) for f in files]
+    
+    if workers == 1 or len(jobs) == 1:
+        results = [_split_one(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # map 按提交顺序返回结果
+            results = list(executor.map(_split_one, jobs))
+    
+    for file_path, total in results:
+        print(f"[OK] {file_path}: {total} chunks")
+    
+    # 合并索引
+    index_file = Path(output_dir) / "all_chunks_index.md"
+    parts = [
+        "# Document Chunks Index\n\n",
+        f"Total documents: {len(results)}\n",
+        f"Total chunks: {sum(total for _, total in results)}\n\n",
+    ]
+    for file_path, total in results:
+        base_name = Path(file_path).stem
+        parts.append(f"## {base_name}\n\n")
+        parts.append(f"Original file: {file_path}\n\n")
+        if kwargs.get('packed'):
+            parts.append(f"- [{base_name}.chunks](./{base_name}.chunks) ({total} chunks)\n")
+        else:
+            for idx in range(1, total + 1):
+                chunk_file = f"{base_name}_chunk_{idx:03d}.md"
+                parts.append(f"- [{chunk_file}](./{chunk_file})\n")
+        parts.append("\n")
+    write_if_changed(index_file, ''.join(parts))
+    
+    print(f"\n[INFO] Total documents: {len(results)}")
+    print(f"[INFO] Merged index file: {index_file}")
+    
+    return dict(results)
+
+def main():
+    parser = argparse.ArgumentParser(description='按章节拆分 Markdown 文档')
+    parser.add_argument('source', nargs='?', default='PRD-Guild-Manager.md',
+                        help='源文件；传入目录或通配符时进入批量模式')
+    parser.add_argument('--chunk-size', type=int, default=8000)
+    parser.add_argument('--token-budget', type=int, default=None)
+    parser.add_argument('--output-dir', default='docs/prd_chunks')
+    parser.add_argument('--streaming', action='store_true')
+    parser.add_argument('--packed', action='store_true', help='写入单个 .chunks 打包存储')
+    parser.add_argument('--boundary', choices=['greedy', 'optimal'], default='greedy',
+                        help='切分方式：贪心或动态规划最优切分')
+    parser.add_argument('--boundary-stats', action='store_true', help='optimal 模式下打印两种切分的块大小统计')
+    parser.add_argument('--workers', type=int, default=None, help='批量模式的进程数，默认 CPU 核数')
+    args = parser.parse_args()
     
-    return len(sections)
+    options = dict(
+        chunk_size=args.chunk_size,
+        output_dir=args.output_dir,
+        streaming=args.streaming,
+        token_budget=args.token_budget,
+        packed=args.packed,
+        boundary=args.boundary,
+        boundary_stats=args.boundary_stats
+    )
+    if Path(args.source).is_dir() or any(ch in args.source for ch in '*?['):
+        split_markdown_batch(args.source, workers=args.workers, **options)
+    else:
+        split_markdown_by_sections(args.source, **options)
 
 if __name__ == "__main__":
     # 执行拆分
-    num_chunks = split_markdown_by_sections(
-        'PRD-Guild-Manager.md',
-        chunk_size=8000,
-        output_dir='docs/prd_chunks'
-    )
\ No newline at end of file
+    main()
@@ -12,12 +12,17 @@ import subprocess
 import tempfile
 import shutil
 
+from token_estimator import estimate_tokens, line_token_cost
+from split_prd import iter_sections
+from prd_section_index import load_section_index, query_regions, read_range
+
 # --- 配置 ---
 PRD_FILE_PATH = r"C:\buildgame\vitegame\.taskmaster\docs\PRD-Guild-Manager-patched.txt"
 OUTPUT_DIR = r".taskmaster\tasks"
 FINAL_TASKS_FILE = os.path.join(OUTPUT_DIR, "tasks.json")
 NUM_FINAL_TASKS = 50
 NUM_TASKS_PER_CHUNK = 8  # 每个章节期望生成的任务数量，6-8个章节 * 8 = 48-64个初步任务
+CHUNK_TOKEN_BUDGET = 12000  # 每块（含全局上下文）的估算 token 上限，超出的章节按段落继续拆分；None 表示只按章节切割
 
 # --- 辅助函数 ---
 
@@ -33,20 +38,17 @@ def read_prd_file(file_path):
         print(f"读取 PRD 文件出错：{e}")
         exit(1)
 
-def split_prd_by_chapters(prd_content):
+def global_context(prd_head):
     """
-    根据章节标题切割 PRD 内容
-    为每个章节添加全局上下文（标题、目录）
+    全局上下文前缀：整体标题和目录，只看 prd_head（文档开头到第一个章节之前即可）
     """
-    chapters = []
-    
     # 提取整体标题
-    overall_title_match = re.match(r'《.+》产品需求文档 \(PRD\)', prd_content)
+    overall_title_match = re.match(r'《.+》产品需求文档 \(PRD\)', prd_head)
     overall_title = overall_title_match.group(0) if overall_title_match else ""
     
     # 提取目录部分
     toc_start_marker = '📋 目录'
-    toc_start_idx = prd_content.find(toc_start_marker)
+    toc_start_idx = prd_head.find(toc_start_marker)
     
     global_context_prefix = ""
     if overall_title:
@@ -55,7 +57,7 @@ def split_prd_by_chapters(prd_content):
     if toc_start_idx != -1:
         # 查找目录结束位置（通常在第一个实际章节之前）
         # 查找分隔线或第一个数字开头的章节
-        lines = prd_content[toc_start_idx:].split('\n')
+        lines = prd_head[toc_start_idx:].split('\n')
         toc_lines = [toc_start_marker]
         
         for i, line in enumerate(lines[1:], 1):
@@ -65,30 +67,81 @@ def split_prd_by_chapters(prd_content):
         
         full_toc_section = '\n'.join(toc_lines).strip()
         global_context_prefix += full_toc_section + "\n\n"
-    
+    return global_context_prefix
+
+def split_prd_by_chapters(prd_content, token_budget=None):
+    """
+    根据章节标题切割 PRD 内容
+    为每个章节添加全局上下文（标题、目录）
+    token_budget 设置后，超出预算的章节会按段落边界继续拆分，每块（含上下文）不超过预算；
+    只有单独一行正文就超出剩余预算时，该行自成一块。全局上下文本身占满预算时抛出 ValueError
+    """
     # 查找章节标题模式（数字开头的章节，如 "1. 执行摘要"）
     chapter_pattern = re.compile(r'^(\d+\.\s+.+)$', re.MULTILINE)
     matches = list(chapter_pattern.finditer(prd_content))
     
-    if not matches:
+    if matches:
+        print(f"找到 {len(matches)} 个章节")
+        sections = []
+        for i, match in enumerate(matches):
+            start = match.start()
+            end = matches[i+1].start() if i + 1 < len(matches) else len(prd_content)
+            sections.append((match.group(1).strip(), prd_content[start:end].strip()))
+    else:
         print("警告：未找到数字章节标题。将整个 PRD 作为单个块处理。")
-        return [{"title": "完整 PRD", "content": global_context_prefix + prd_content.strip()}]
+        sections = [("完整 PRD", prd_content.strip())]
+    
+    return chapter_chunks(global_context(prd_content), sections, token_budget)
+
+def split_prd_file_by_chapters(file_path, token_budget=None, index_file=None):
+    """
+    与 split_prd_by_chapters(read_prd_file(file_path), token_budget) 相同，但借助持久化的章节索引
+    （prd_section_index，默认 <file_path>.sections.json）：章节边界取自索引的 'chapters' 查询模式，
+    全局上下文只读第一个章节之前的部分，各章节按字节范围直接读取。
+    源文件没变时不再扫描全文找章节；目录不在第一个章节之前时不计入全局上下文。
+    """
+    index = load_section_index(file_path, index_file)
+    regions = query_regions(index, 'chapters')
+    if not regions:
+        return split_prd_by_chapters(read_prd_file(file_path), token_budget)
     
-    print(f"找到 {len(matches)} 个章节")
+    print(f"找到 {len(regions)} 个章节")
+    # 按文本模式读取时 \r\n 会转成 \n，按字节读取的区间同样处理
+    read = lambda start, end: read_range(file_path, start, end).replace('\r\n', '\n')
+    prd_head = read(0, regions[0]['byte_start'])
+    sections = [(region['title'], read(region['byte_start'], region['byte_end']).strip()) for region in regions]
+    return chapter_chunks(global_context(prd_head), sections, token_budget)
+
+def chapter_chunks(global_context_prefix, sections, token_budget=None):
+    """
+    为 (章节标题, 章节正文) 列表加上全局上下文前缀，按 token 预算继续拆分超长章节
+    """
+    chapters = []
+    prefix_tokens = estimate_tokens(global_context_prefix)
+    if token_budget and prefix_tokens >= token_budget:
+        raise ValueError(f"全局上下文（标题和目录）约 {prefix_tokens} tokens，"
+                         f"不小于 token 预算 {token_budget}，没有空间放章节正文")
     
-    for i, match in enumerate(matches):
-        start = match.start()
-        end = matches[i+1].start() if i + 1 < len(matches) else len(prd_content)
-        chapter_title = match.group(1).strip()
-        chapter_content = prd_content[start:end].strip()
+    for chapter_title, chapter_content in sections:
+        chapter_tokens = estimate_tokens(chapter_content)
+        if token_budget and prefix_tokens + chapter_tokens > token_budget:
+            # 章节超出预算：扣除全局上下文后按段落边界拆分，拆出的块不超过剩余预算
+            body_budget = token_budget - prefix_tokens
+            parts = list(iter_sections(chapter_content.split('\n'), body_budget, line_token_cost, strict=True))
+        else:
+            parts = [chapter_content]
         
-        # 为每个章节添加全局上下文前缀
-        full_chapter_chunk = f"{global_context_prefix}{chapter_content}"
-        chapters.append({
-            "title": chapter_title, 
-            "content": full_chapter_chunk,
-            "token_estimate": len(full_chapter_chunk) // 4  # 粗略估算 token 数
-        })
+        for part_idx, part in enumerate(parts, 1):
+            # 为每个章节添加全局上下文前缀
+            full_chapter_chunk = f"{global_context_prefix}{part}"
+            title = chapter_title if len(parts) == 1 else f"{chapter_title} ({part_idx}/{len(parts)})"
+            # 前缀为空或以换行结尾，估算值可以直接相加，不必对拼接后的整块再估算一遍
+            part_tokens = chapter_tokens if len(parts) == 1 else estimate_tokens(part)
+            chapters.append({
+                "title": title, 
+                "content": full_chapter_chunk,
+                "token_estimate": prefix_tokens + part_tokens  # 按文字类别估算 token 数
+            })
     
     return chapters
 
@@ -229,14 +282,16 @@ def main():
     print(f"创建临时目录：{temp_dir}")
     
     try:
-        # 读取 PRD 文件
+        # 读取 PRD 文件：章节边界取自持久化的章节索引，源文件没变时不再扫描全文
         print(f"读取 PRD 文件：{PRD_FILE_PATH}")
-        prd_content = read_prd_file(PRD_FILE_PATH)
-        print(f"PRD 文件大小：{len(prd_content)} 字符")
+        if not os.path.exists(PRD_FILE_PATH):
+            print(f"错误：PRD 文件未找到：{PRD_FILE_PATH}")
+            exit(1)
+        print(f"PRD 文件大小：{os.path.getsize(PRD_FILE_PATH)} 字节")
         
         # 切割成章节
         print("\n切割 PRD 文件...")
-        chapters = split_prd_by_chapters(prd_content)
+        chapters = split_prd_file_by_chapters(PRD_FILE_PATH, CHUNK_TOKEN_BUDGET)
         print(f"切割完成，共 {len(chapters)} 个章节")
         
         # 显示章节信息
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式拆分 shards/ 下的扁平化 XML（<files><file path='...'><![CDATA[...]]></file>...）
+用 expat 增量解析，不构建整棵树；每个内嵌文件单独切块（超出预算时按 split_prd 的规则继续拆分），
+输出块文件、索引和清单的格式与 split_prd.py 相同，可直接交给 create_embeddings_index.py
+"""
+
+import argparse
+import itertools
+import json
+from collections import deque
+from pathlib import Path
+from xml.parsers import expat
+
+from split_prd import (char_cost, chunk_header, iter_chunk_records, iter_sections, load_manifest, render_chunk,
+                       render_chunks_index, write_if_changed)
+from token_estimator import line_token_cost
+
+# 块头部自身的字段，内嵌文件头部里的同名字段不覆盖
+RESERVED_FIELDS = {'source', 'file', 'chunk', 'size', 'tokens'}
+
+def iter_shard_events(xml_path, block_size=64 * 1024):
+    """
+    增量解析扁平化 XML，产出 ('start', 路径) / ('line', 行) / ('end', 路径) 事件
+    内存中只保留一个读取块产生的事件和一行未完成的文本
+    """
+    events = deque()
+    state = {'path': None, 'partial': ''}
+
+    def start(name, attrs):
+        if name == 'file':
+            state['path'] = attrs.get('path', '')
+            state['partial'] = ''
+            events.append(('start', state['path']))
+
+    def data(text):
+        if state['path'] is None:
+            return
+        parts = (state['partial'] + text).split('\n')
+        state['partial'] = parts.pop()
+        for line in parts:
+            events.append(('line', line))
+
+    def end(name):
+        if name == 'file' and state['path'] is not None:
+            events.append(('line', state['partial']))
+            events.append(('end', state['path']))
+            state['path'] = None
+            state['partial'] = ''
+
+    parser = expat.ParserCreate('utf-8')
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    parser.CharacterDataHandler = data
+    # 保证 CDATA 内容按原样连续回调
+    parser.buffer_text = True
+
+    with open(xml_path, 'rb') as f:
+        while True:
+            block = f.read(block_size)
+            parser.Parse(block, not block)
+            while events:
+                yield events.popleft()
+            if not block:
+                break
+
+def iter_file_body(events):
+    """
+    读取一个内嵌文件的正文行直到 'end'：去掉扁平化时加的统一缩进，并去掉首尾空行
+    """
+    indent = None
+    pending_blanks = 0
+    for kind, value in events:
+        if kind == 'end':
+            return
+        line = value
+        if not line.strip():
+            # 开头的空行直接丢弃，中间的空行等遇到下一行非空内容时再补回
+            if indent is not None:
+                pending_blanks += 1
+            continue
+        if indent is None:
+            indent = line[:len(line) - len(line.lstrip('\t'))]
+        if indent and line.startswith(indent):
+            line = line[len(indent):]
+        for _ in range(pending_blanks):
+            yield ''
+        pending_blanks = 0
+        yield line
+
+def split_frontmatter(lines):
+    """
+    拆出内嵌文件自带的 YAML 头部：返回 (顶层标量字段, 其余正文行迭代器)
+    嵌套结构（列表、映射）只在原文件里保留，块头部是一行一个字段的扁平格式
+    """
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None:
+        return {}, iter(())
+    if first.strip() != '---':
+        return {}, itertools.chain([first], lines)
+    fields = {}
+    indent = None   # 顶层字段的缩进（有的内嵌文件整个头部带缩进）
+    for line in lines:
+        if line.strip() == '---':
+            break
+        if not line.strip():
+            continue
+        depth = len(line) - len(line.lstrip())
+        if indent is None:
+            indent = depth
+        if depth != indent or ':' not in line:
+            continue
+        key, value = line.split(':', 1)
+        value = value.strip().strip('"\'')
+        if value:
+            fields[key.strip()] = value
+    # 头部之后的空行
+    rest = itertools.dropwhile(lambda line: not line.strip(), lines)
+    return fields, rest
+
+def iter_shard_documents(xml_path):
+    """
+    逐个产出 (内嵌文件路径, 正文行迭代器)；必须读完一个文件的行再取下一个
+    """
+    events = iter_shard_events(xml_path)
+    for kind, value in events:
+        if kind == 'start':
+            yield value, iter_file_body(events)
+
+def iter_shard_chunks(xml_path, limit, measure):
+    """
+    产出 (内嵌文件路径, 内嵌文件头部字段, 块记录)，块不会跨越两个内嵌文件
+    """
+    for file_path, lines in iter_shard_documents(xml_path):
+        fields, body = split_frontmatter(lines)
+        by_tokens = measure is line_token_cost
+        for record in iter_chunk_records(iter_sections(body, limit, measure, by_tokens), by_tokens):
+            if 'Title' not in fields:
+                # 头部没有标题时取内嵌文件的第一个 Markdown 标题，后续块沿用
+                heading = next((line for line in record['text'].split('\n') if line.startswith('#')), None)
+                if heading:
+                    fields['Title'] = heading.strip('#').strip()
+            yield file_path, fields, record
+
+def split_flattened_shard(xml_path, chunk_size=8000, output_dir='docs/shard_chunks', token_budget=None):
+    """
+    把一个扁平化 XML 分片拆成块文件
+
+    解析两遍：第一遍只数块数（用于 chunk: N/M 头部），第二遍边解析边写盘，
+    峰值内存约为一个块。每个块的头部额外记录内嵌文件路径（file 字段）和内嵌文件
+    自带 YAML 头部的顶层字段（PRD-ID、Title 等；与块自身字段同名的 chunk/size/source 不覆盖），
+    内嵌头部不进入正文。块数比上次少时删除多出来的旧块文件。
+    清单与 split_prd.py 同构：changed 为正文或头部与上次清单不同的块号，removed 为上次有、本次没有的块号。
+    """
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    
+    if token_budget:
+        limit, measure, unit = token_budget, line_token_cost, 'tokens'
+    else:
+        limit, measure, unit = chunk_size, char_cost, 'chars'
+    
+    total = sum(1 for _ in iter_shard_chunks(xml_path, limit, measure))
+    
+    base_name = Path(xml_path).stem
+    manifest_file = Path(output_dir) / f"{base_name}_manifest.json"
+    previous = load_manifest(manifest_file)
+    previous_chunks = {}
+    if (previous and previous.get('source') == str(xml_path) and previous.get('token_budget') == token_budget
+            and previous.get('total_chunks') == total):
+        # 头部含块总数，总数变化时所有块都算改动
+        previous_chunks = {c['chunk']: (c['sha256'], c.get('header')) for c in previous.get('chunks', [])}
+    
+    chunks = []
+    changed = []
+    for idx, (file_path, fields, record) in enumerate(iter_shard_chunks(xml_path, limit, measure), 1):
+        section = record.pop('text')
+        chunk_file = f"{base_name}_chunk_{idx:03d}.md"
+        output_file = Path(output_dir) / chunk_file
+        extra = {'file': file_path}
+        extra.update((key, value) for key, value in fields.items() if key not in RESERVED_FIELDS)
+        header = chunk_header(xml_path, idx, total, section, record.get('tokens'), extra=extra)
+        text = render_chunk(xml_path, idx, total, section, header=header)
+        chunks.append({'chunk': idx, 'file': chunk_file, 'embedded_file': file_path,
+                       'size': len(section), **record, 'header': header,
+                       'file_bytes': len(text.encode('utf-8'))})
+        if previous_chunks.get(idx) != (record['sha256'], header):
+            changed.append(idx)
+        if write_if_changed(output_file, text):
+            print(f"[OK] Created: {output_file} ({len(section)} chars)")
+    
+    # 清理上次运行多出来的块
+    for old_file in sorted(Path(output_dir).glob(f"{base_name}_chunk_*.md")):
+        number = old_file.stem.rsplit('_', 1)[-1]
+        if number.isdigit() and int(number) > total:
+            old_file.unlink()
+            print(f"[OK] Removed: {old_file}")
+    removed = [old['chunk'] for old in (previous or {}).get('chunks', []) if old['chunk'] > total]
+    
+    index_file = Path(output_dir) / f"{base_name}_index.md"
+    write_if_changed(index_file, render_chunks_index(base_name, xml_path, total, limit, unit))
+    
+    with open(manifest_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            "version": "1.0",
+            "source": str(xml_path),
+            "chunk_size": chunk_size,
+            "token_budget": token_budget,
+            "boundary": "greedy",
+            "total_chunks": total,
+            "changed": changed,
+            "removed": removed,
+            "chunks": chunks
+        }, f, indent=2, ensure_ascii=False)
+    
+    print(f"\n[INFO] Total chunks created: {total}")
+    print(f"[INFO] Changed chunks: {len(changed)}, removed: {len(removed)}")
+    print(f"[INFO] Index file: {index_file}")
+    print(f"[INFO] Manifest file: {manifest_file}")
+    
+    return total
+
+def main():
+    parser = argparse.ArgumentParser(description='流式拆分扁平化 XML 分片')
+    parser.add_argument('sources', nargs='*', help='XML 分片，默认 shards/*.xml')
+    parser.add_argument('--chunk-size', type=int, default=8000)
+    parser.add_argument('--token-budget', type=int, default=None)
+    parser.add_argument('--output-dir', default='docs/shard_chunks')
+    args = parser.parse_args()
+    
+    sources = args.sources or [str(p) for p in sorted(Path('shards').glob('*.xml'))]
+    for xml_path in sources:
+        split_flattened_shard(xml_path, chunk_size=args.chunk_size, output_dir=args.output_dir,
+                              token_budget=args.token_budget)
+
+if __name__ == "__main__":
+    main()
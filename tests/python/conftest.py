@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+"""
+Python 工具（仓库根目录下的 prd_*.py 等脚本）的测试，运行：python -m pytest -q tests/python
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+import contextlib
+import io
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+from create_embeddings_index import (create_embeddings_index, index_file_path, iter_index_documents,
+                                     load_previous_index)
+
+CHUNKS = Path(__file__).resolve().parents[2] / 'docs' / 'prd_chunks'
+SOURCES = ['prd_chunks', 'split_chunks']
+
+def build(index_file, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        create_embeddings_index(SOURCES, index_file, search_index=True, **kwargs)
+
+def outputs(index_file):
+    files = [index_file] + [index_file_path(index_file, suffix) for suffix in ('text', 'bm25')]
+    return [Path(path).read_bytes() for path in files]
+
+def split_source(text):
+    from split_prd import split_markdown_by_sections
+    Path('prd.md').write_text(text, encoding='utf-8')
+    with contextlib.redirect_stdout(io.StringIO()):
+        split_markdown_by_sections('prd.md', chunk_size=1500, output_dir='split_chunks')
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """
+    两个源目录：仓库里的 PRD 块，以及 split_prd 拆出的带清单的块（覆盖清单交接）
+    """
+    shutil.copytree(CHUNKS, tmp_path / 'prd_chunks')
+    monkeypatch.chdir(tmp_path)
+    split_source((CHUNKS / 'PRD-Guild-Manager_chunk_001.md').read_text(encoding='utf-8') * 3)
+    return tmp_path
+
+def edit_tree(workdir):
+    chunks = sorted((workdir / 'prd_chunks').glob('*_chunk_*.md'))
+    chunks[0].write_text(chunks[0].read_text(encoding='utf-8') + '\n新增的公会规则。\n', encoding='utf-8')
+    chunks[1].unlink()
+    shutil.copy(chunks[2], workdir / 'prd_chunks' / 'PRD-Guild-Manager_chunk_999.md')
+    # 改过的正文大小不变但修改时间变了：只能靠内容哈希判断
+    text = chunks[3].read_text(encoding='utf-8')
+    chunks[3].write_text(text.replace('公会', '工会', 1), encoding='utf-8')
+    stat = os.stat(chunks[3])
+    os.utime(chunks[3], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    split_source((CHUNKS / 'PRD-Guild-Manager_chunk_002.md').read_text(encoding='utf-8') * 2)
+
+@pytest.mark.parametrize('index_file', ['a.index', 'a.jsonl'])
+def test_incremental_build_equals_full_build(workdir, index_file):
+    build(index_file)
+    edit_tree(workdir)
+    build(index_file, incremental=True)
+    full = index_file.replace('a.', 'full.')
+    build(full, incremental=False)
+    assert outputs(index_file) == outputs(full)
+    # 再次增量构建什么都不变
+    build(index_file, incremental=True)
+    assert outputs(index_file) == outputs(full)
+
+@pytest.mark.parametrize('index_file', ['a.index', 'a.jsonl'])
+def test_parallel_build_equals_sequential_build(workdir, index_file):
+    build(index_file, incremental=False)
+    parallel = index_file.replace('a.', 'parallel.')
+    build(parallel, incremental=False, workers=3)
+    assert outputs(parallel) == outputs(index_file)
+    # 增量 + 并行同样一致
+    edit_tree(workdir)
+    build(index_file, incremental=False)
+    build(parallel, incremental=True, workers=3)
+    assert outputs(parallel) == outputs(index_file)
+
+def truncate_after(path, records, extra=b''):
+    """
+    模拟中断：只留下头部行和前 records 条完整记录，再接上半行 extra
+    """
+    lines = Path(path).read_bytes().splitlines(keepends=True)
+    Path(path).write_bytes(b''.join(lines[:1 + records]) + extra)
+
+@pytest.mark.parametrize('partial', [b'', b'{"id": "abc", "file": "prd_ch'])
+def test_truncated_jsonl_index_is_resumed(workdir, partial):
+    build('full.jsonl', incremental=False)
+    build('a.jsonl', incremental=False)
+    truncate_after('a.jsonl', 10, partial)
+    assert len(list(iter_index_documents('a.jsonl'))) == 10
+    assert len(load_previous_index('a.jsonl')) == 10
+
+    stdout = io.StringIO()
+    with contextlib.redirect_stdout(stdout):
+        create_embeddings_index(SOURCES, 'a.jsonl', search_index=True)
+    assert 'Reused: 10,' in stdout.getvalue()
+    assert outputs('a.jsonl') == outputs('full.jsonl')
+
+def test_jsonl_cut_inside_the_header_starts_over(workdir):
+    build('full.jsonl', incremental=False)
+    build('a.jsonl', incremental=False)
+    data = Path('a.jsonl').read_bytes()
+    Path('a.jsonl').write_bytes(data[:data.index(b'\n') // 2])
+    assert load_previous_index('a.jsonl') == {}
+    build('a.jsonl')
+    assert outputs('a.jsonl') == outputs('full.jsonl')
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+import contextlib
+import io
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from create_embeddings_index import create_embeddings_index, index_file_path
+from prd_dedup import (MINHASH_PERMS, NearDuplicateIndex, decode_signature, encode_signature,
+                       minhash_signature)
+
+CHUNKS = Path(__file__).resolve().parents[2] / 'docs' / 'prd_chunks'
+
+BASE = ' '.join(f'guild member {i} joins raid group {i % 7} and earns reward {i * 3}' for i in range(60))
+# 改动前 5 句，估计相似度约 0.9
+EDITED = ' '.join(f'guild member {i} joins raid group {i % 7} and earns reward {i * 3 + (1000 if i < 5 else 0)}'
+                  for i in range(60))
+OTHER = ' '.join(f'battle unit {i} deals damage {i % 5} with skill {i * 2} on turn {i}' for i in range(60))
+
+def test_signature_is_stable_and_round_trips():
+    signature = minhash_signature(BASE)
+    assert signature.shape == (MINHASH_PERMS,) and signature.dtype == np.uint32
+    assert (minhash_signature(BASE) == signature).all()
+    assert (decode_signature(encode_signature(signature)) == signature).all()
+    assert minhash_signature('') is None
+
+def test_near_duplicates_join_the_first_document():
+    index = NearDuplicateIndex(threshold=0.8)
+    assert index.add('base.md', minhash_signature(BASE)) is None
+    assert index.add('other.md', minhash_signature(OTHER)) is None
+    canonical, similarity = index.add('edited.md', minhash_signature(EDITED))
+    assert canonical == 'base.md' and 0.8 <= similarity < 1.0
+    assert index.add('copy.md', minhash_signature(BASE)) == ('base.md', 1.0)
+    # 别名不成为代表条目
+    assert set(index.signatures) == {'base.md', 'other.md'}
+
+def test_threshold_above_similarity_keeps_both():
+    index = NearDuplicateIndex(threshold=0.95)
+    index.add('base.md', minhash_signature(BASE))
+    assert index.add('edited.md', minhash_signature(EDITED)) is None
+
+def test_dedup_build_marks_copied_chunks(tmp_path, monkeypatch):
+    shutil.copytree(CHUNKS, tmp_path / 'prd_chunks')
+    shutil.copytree(CHUNKS, tmp_path / 'copy_chunks')
+    monkeypatch.chdir(tmp_path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        create_embeddings_index(['prd_chunks', 'copy_chunks'], 'prd.index', incremental=False,
+                                search_index=True, dedup=True)
+    with open('prd.index', 'r', encoding='utf-8') as f:
+        documents = json.load(f)['documents']
+    originals = [doc for doc in documents if doc['file'].startswith('prd_chunks')]
+    copies = [doc for doc in documents if doc['file'].startswith('copy_chunks')]
+    assert all('duplicate_of' not in doc for doc in originals)
+    assert all(doc['duplicate_of'].startswith('prd_chunks') and doc['similarity'] == 1.0 for doc in copies)
+
+    with open(index_file_path('prd.index', 'bm25'), 'r', encoding='utf-8') as f:
+        bm25 = json.load(f)
+    assert [doc['file'] for doc in bm25['docs']] == [doc['file'] for doc in originals]
+    assert all(doc.get('aliases') for doc in bm25['docs'])
+    with open(index_file_path('prd.index', 'dedup'), 'r', encoding='utf-8') as f:
+        report = json.load(f)
+    assert report['duplicate_documents'] == len(copies)
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+
+import contextlib
+import io
+import shutil
+from pathlib import Path
+
+import pytest
+
+from prd_federated import DEFAULT_SHARDS, ShardedIndex, build_shards, check_index_file
+
+ROOT = Path(__file__).resolve().parents[2]
+
+def test_default_shards_do_not_reuse_path_lists():
+    # rebuild_indexes.mjs 写的是路径清单，分片索引不能与之同名
+    script = (ROOT / 'scripts' / 'rebuild_indexes.mjs').read_text(encoding='utf-8')
+    for shard in DEFAULT_SHARDS:
+        assert f"'{shard['index_file']}'" not in script
+        if (ROOT / shard['index_file']).exists():
+            check_index_file(str(ROOT / shard['index_file']))
+
+def test_path_list_is_rejected_before_building(tmp_path, monkeypatch):
+    shutil.copytree(ROOT / 'docs' / 'prd_chunks', tmp_path / 'prd_chunks')
+    monkeypatch.chdir(tmp_path)
+    path_list = 'prd_chunks/PRD-Guild-Manager_chunk_001.md\n'
+    Path('prd.index').write_text(path_list, encoding='utf-8')
+    shards = [{"name": "prd", "index_file": "prd.index", "source_dir": "prd_chunks"}]
+    with pytest.raises(ValueError, match='not an embeddings index'):
+        build_shards(shards)
+    assert Path('prd.index').read_text(encoding='utf-8') == path_list
+
+    shards[0]['index_file'] = 'prd_embeddings.index'
+    with contextlib.redirect_stdout(io.StringIO()):
+        build_shards(shards)
+        # 已是索引的文件可以增量重建
+        build_shards(shards)
+    results = ShardedIndex(shards).search('公会', 3)
+    assert len(results) == 3 and all(doc['shard'] == 'prd' for _, doc in results)
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+import contextlib
+import io
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+
+from create_embeddings_index import create_embeddings_index, index_file_path
+from prd_index_store import IndexStore, write_index_store
+
+CHUNKS = Path(__file__).resolve().parents[2] / 'docs' / 'prd_chunks'
+
+def round_trip(tmp_path, index_data):
+    path = write_index_store(index_data, str(tmp_path / 'store.index'))
+    with IndexStore(path) as store:
+        return store.to_dict()
+
+def assert_same_json(restored, index_data):
+    # 比较序列化结果，字段顺序不同也会失败
+    assert json.dumps(restored, ensure_ascii=False) == json.dumps(index_data, ensure_ascii=False)
+
+def dedup_entry(i, **extra):
+    """
+    与 build_doc_entry + 去重流程的字段顺序一致：minhash 在 content_hash 之前，duplicate_of 在最后
+    """
+    doc = {'id': f'prd_{i:03d}', 'file': f'prd_chunks/chunk_{i:03d}.md', 'chunk_number': i, 'title': f'第 {i} 章',
+           'size': 120, 'char_count': 100, 'line_count': 8, 'metadata': {'source': 'PRD'},
+           'tags': ['公会'], 'tag_hits': {'公会': 3}, 'summary': '摘要', 'minhash': 'AAAA',
+           'content_hash': f'{i:032x}', 'file_size': 120, 'file_mtime': 1700000000.5}
+    doc.update(extra)
+    return doc
+
+def test_round_trip_keeps_dedup_field_order(tmp_path):
+    index_data = {'version': '1.0', 'total_documents': 3, 'documents': [
+        dedup_entry(0),
+        dedup_entry(1, duplicate_of='prd_chunks/chunk_000.md', similarity=0.92),
+        dedup_entry(2, minhash=''),
+    ]}
+    assert_same_json(round_trip(tmp_path, index_data), index_data)
+
+def test_round_trip_keeps_unusual_values(tmp_path):
+    doc = dedup_entry(0, size=-1, title=None, tags=['公会', '战斗'], tag_hits={'战斗': 1, '公会': 2})
+    index_data = {'version': '1.0', 'documents': [doc, {'extra_first': True, 'id': 'x'}]}
+    assert_same_json(round_trip(tmp_path, index_data), index_data)
+
+def test_round_trip_of_built_dedup_index(tmp_path, monkeypatch):
+    pytest.importorskip('numpy')
+    shutil.copytree(CHUNKS, tmp_path / 'prd_chunks')
+    shutil.copytree(CHUNKS, tmp_path / 'copy_chunks')
+    monkeypatch.chdir(tmp_path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        create_embeddings_index(['prd_chunks', 'copy_chunks'], 'prd.index', incremental=False, binary=True,
+                                dedup=True)
+    with open('prd.index', 'r', encoding='utf-8') as f:
+        index_data = json.load(f)
+    assert any('duplicate_of' in doc for doc in index_data['documents'])
+    with IndexStore(index_file_path('prd.index', 'columns')) as store:
+        assert_same_json(store.to_dict(), index_data)
+
+def test_streamed_documents_and_row_access(tmp_path):
+    docs = [dedup_entry(i) for i in range(5000)]
+    path = write_index_store({'version': '1.0', 'documents': iter(docs)}, str(tmp_path / 'store.index'))
+    with IndexStore(path) as store:
+        assert len(store) == 5000
+        assert store.index_meta == {'version': '1.0'}
+        assert store[4321] == docs[4321]
+        assert store.find('prd_4999') == 4999 and store.find('missing') is None
+        assert store.value(7, 'file') == 'prd_chunks/chunk_007.md'
+        assert store.value(7, 'file_mtime') == 1700000000.5
+        assert list(store.column('chunk_number')) == list(range(5000))
+        assert store.tag_hits(3) == {'公会': 3} and store.summary(3) == '摘要'
+        assert store.metadata(3) == {'source': 'PRD'}
+        with pytest.raises(IndexError):
+            store[5000]
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / 'not_a_store.index'
+    path.write_bytes(b'\0' * 128)
+    with pytest.raises(ValueError):
+        IndexStore(str(path))
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+import contextlib
+import io
+import os
+import random
+import shutil
+from pathlib import Path
+
+import pytest
+
+from create_embeddings_index import create_embeddings_index, index_file_path
+from prd_postings import CompressedIndex, decode_varint, encode_varint, json_to_postings
+from prd_search import load_search_index, search, tokenize
+
+CHUNKS = Path(__file__).resolve().parents[2] / 'docs' / 'prd_chunks'
+
+@pytest.fixture(scope='module')
+def built_index(tmp_path_factory):
+    workdir = tmp_path_factory.mktemp('postings')
+    shutil.copytree(CHUNKS, workdir / 'prd_chunks')
+    index_file = str(workdir / 'prd.index')
+    # 文件标识是相对当前目录的路径
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            create_embeddings_index('prd_chunks', index_file, incremental=False, search_index=True,
+                                    compressed_postings=True)
+    finally:
+        os.chdir(cwd)
+    plain = load_search_index(index_file_path(index_file, 'bm25'))
+    # 小跳表间隔让短倒排表也有多个块，覆盖跳表前进和按块剪枝
+    small = json_to_postings(index_file_path(index_file, 'bm25'), str(workdir / 'small_postings.index'), 2)
+    return plain, index_file_path(index_file, 'postings'), small
+
+def make_queries(plain, n=150, seed=7):
+    rng = random.Random(seed)
+    by_df = sorted(plain['postings'], key=lambda term: (-len(plain['postings'][term][0]), term))
+    frequent, common = by_df[:50], by_df[:2000]
+    queries = [' '.join(rng.sample(common, rng.randint(1, 4))) for _ in range(n)]
+    queries += [' '.join([rng.choice(frequent)] + rng.sample(common, rng.randint(1, 2))) for _ in range(n)]
+    return queries + ['公会成员管理', 'guild manager', '不存在的词项xyz', '']
+
+def brute_force_and(plain, query, top_k):
+    terms = set(tokenize(query))
+    if not terms or any(term not in plain['postings'] for term in terms):
+        return []
+    docs = set.intersection(*(set(plain['postings'][term][0]) for term in terms))
+    return [(score, doc) for score, doc in search(plain, query, len(plain['docs']))
+            if plain['docs'].index(doc) in docs][:top_k]
+
+def test_varint_round_trip():
+    for value in (0, 1, 127, 128, 300, 1 << 21, (1 << 35) + 5):
+        out = bytearray(b'\xff')
+        encode_varint(value, out)
+        assert decode_varint(out, 1) == (value, len(out))
+
+def test_postings_decode_to_json_lists(built_index):
+    plain, path, small = built_index
+    for postings_file in (path, small):
+        index = CompressedIndex(postings_file)
+        try:
+            assert len(index.terms) == len(plain['postings'])
+            for term in list(plain['postings'])[:500]:
+                ids, tfs = plain['postings'][term]
+                assert index.postings(term) == (ids, tfs)
+            assert index.postings('不存在的词项xyz') == ([], [])
+        finally:
+            index.close()
+
+def test_cursor_reads_the_mapping_in_place(built_index):
+    plain, path, _ = built_index
+    index = CompressedIndex(path)
+    term = max(plain['postings'], key=lambda t: len(plain['postings'][t][0]))
+    cursor = index.cursor(term)
+    # 游标直接读 mmap，不切片复制；存活的游标不妨碍关闭索引
+    assert cursor.buf is index.mm
+    assert cursor.block(0) == tuple(column[:index.skip_interval] for column in plain['postings'][term])
+    index.close()
+
+@pytest.mark.parametrize('top_k', [1, 5, 10])
+def test_top_k_matches_plain_search(built_index, top_k):
+    plain, path, small = built_index
+    for postings_file in (path, small):
+        index = CompressedIndex(postings_file)
+        try:
+            for query in make_queries(plain):
+                assert index.search(query, top_k) == search(plain, query, top_k), query
+        finally:
+            index.close()
+
+def test_top_k_prunes_blocks(built_index):
+    plain, _, small = built_index
+    index = CompressedIndex(small)
+    try:
+        decoded = postings = 0
+        for query in make_queries(plain):
+            index.search(query, 1)
+            postings += index.last_stats.get('postings', 0)
+            decoded += index.last_stats.get('decoded', 0)
+        assert 0 < decoded < postings
+    finally:
+        index.close()
+
+def test_conjunctive_matches_brute_force(built_index):
+    plain, path, small = built_index
+    for postings_file in (path, small):
+        index = CompressedIndex(postings_file)
+        try:
+            for query in make_queries(plain):
+                assert index.search(query, 10, 'and') == brute_force_and(plain, query, 10), query
+        finally:
+            index.close()
+
+def test_non_positive_top_k(built_index):
+    plain, path, _ = built_index
+    index = CompressedIndex(path)
+    try:
+        assert index.search('公会', 0) == []
+        assert search(plain, '公会', 0) == []
+    finally:
+        index.close()
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / 'not_postings.index'
+    path.write_bytes(b'{"version": "1.0"}' + b'\0' * 32)
+    with pytest.raises(ValueError):
+        CompressedIndex(str(path))
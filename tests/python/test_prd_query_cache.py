@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from prd_query_cache import (QueryCache, cached_search, cached_vector_search, normalize_query, normalize_text,
+                             result_size)
+
+def test_normalized_queries_share_an_entry():
+    assert normalize_query('Guild  Manager') == normalize_query('manager guild')
+    assert normalize_query('guild guild') != normalize_query('guild')
+    cache = QueryCache()
+    calls = []
+    compute = lambda: calls.append(1) or [(1.0, {'id': 'a'})]
+    assert cache.lookup('bm25', normalize_query('Guild Manager'), 't1', compute) == [(1.0, {'id': 'a'})]
+    assert cache.lookup('bm25', normalize_query('manager  GUILD'), 't1', compute) == [(1.0, {'id': 'a'})]
+    assert len(calls) == 1
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+def test_lookup_returns_a_copy():
+    cache = QueryCache()
+    results = cache.lookup('bm25', 'q', 't', lambda: [1, 2])
+    results.append(3)
+    assert cache.lookup('bm25', 'q', 't', lambda: []) == [1, 2]
+
+def test_evicts_least_recently_used_entry():
+    cache = QueryCache(max_entries=2)
+    cache.put('bm25', 'a', 't', ['a'])
+    cache.put('bm25', 'b', 't', ['b'])
+    assert cache.get('bm25', 'a', 't') == ['a']
+    cache.put('bm25', 'c', 't', ['c'])
+    assert cache.get('bm25', 'b', 't') is None
+    assert cache.get('bm25', 'a', 't') == ['a']
+    assert cache.get('bm25', 'c', 't') == ['c']
+    assert cache.stats()['evictions'] == 1
+
+def test_evicts_by_bytes():
+    size = result_size(('bm25', 'a'), ['x' * 100])
+    cache = QueryCache(max_bytes=2 * size + 10)
+    for key in 'abc':
+        cache.put('bm25', key, 't', ['x' * 100])
+    assert [cache.get('bm25', key, 't') is not None for key in 'abc'] == [False, True, True]
+    assert cache.stats()['bytes'] <= cache.max_bytes
+    # 单条超过上限的结果不缓存
+    cache.put('bm25', 'huge', 't', ['x' * 1000])
+    assert cache.get('bm25', 'huge', 't') is None
+
+def test_zero_entries_disables_cache():
+    cache = QueryCache(max_entries=0)
+    cache.put('bm25', 'a', 't', ['a'])
+    assert cache.get('bm25', 'a', 't') is None
+    assert cache.stats()['entries'] == 0
+
+def test_token_change_invalidates_only_its_namespace():
+    cache = QueryCache()
+    cache.put('bm25', 'a', 'v1', ['old'])
+    cache.put('vector', 'a', 'v1', ['vec'])
+    assert cache.get('bm25', 'a', 'v2') is None
+    assert cache.get('vector', 'a', 'v1') == ['vec']
+    stats = cache.stats()
+    assert stats['invalidations'] == 1 and stats['entries'] == 1
+    assert stats['bytes'] == result_size(('vector', 'a'), ['vec'])
+    cache.put('bm25', 'a', 'v2', ['new'])
+    assert cache.get('bm25', 'a', 'v2') == ['new']
+
+def test_cached_search_follows_index_hash():
+    def make_index(index_hash, doc_id):
+        return {'index_hash': index_hash, 'total_documents': 1, 'avg_doc_length': 2.0,
+                'scoring': {'k1': 1.2, 'b': 0.75}, 'doc_lengths': [2], 'docs': [{'id': doc_id}],
+                'postings': {'公会': [[0], [2]]}}
+    cache = QueryCache()
+    first = cached_search(make_index('h1', 'old'), '公会', cache=cache)
+    assert cached_search(make_index('h1', 'other'), '公会', cache=cache) == first
+    assert cached_search(make_index('h2', 'new'), '公会', cache=cache)[0][1] == {'id': 'new'}
+    assert cache.stats()['invalidations'] == 1
+
+def test_index_without_hash_is_rejected():
+    index = {'total_documents': 1, 'avg_doc_length': 2.0, 'scoring': {'k1': 1.2, 'b': 0.75},
+             'doc_lengths': [2], 'docs': [{'id': 'a'}], 'postings': {'公会': [[0], [2]]}}
+    with pytest.raises(ValueError, match='index_hash'):
+        cached_search(index, '公会', cache=QueryCache())
+
+class FakeVectorIndex:
+    def __init__(self, index_hash='v1'):
+        self.meta = {'index_hash': index_hash} if index_hash else {}
+        self.queries = []
+
+    def search(self, query, top_k=10, nprobe=None):
+        self.queries.append(query)
+        return [(1.0, {'id': query})]
+
+def test_vector_cache_keys_on_query_text():
+    assert normalize_text('  guild \t manager\n') == 'guild manager'
+    index, cache = FakeVectorIndex(), QueryCache()
+    cached_vector_search(index, 'guild manager', cache=cache)
+    cached_vector_search(index, ' guild   manager ', cache=cache)
+    # 词序、大小写不同的查询各自计算，不借用 BM25 分词的等价关系
+    cached_vector_search(index, 'manager guild', cache=cache)
+    cached_vector_search(index, 'Guild manager', cache=cache)
+    assert index.queries == ['guild manager', 'manager guild', 'Guild manager']
+    with pytest.raises(ValueError, match='index_hash'):
+        cached_vector_search(FakeVectorIndex(None), 'guild', cache=cache)
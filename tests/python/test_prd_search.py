@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+import contextlib
+import io
+import os
+import random
+import shutil
+from pathlib import Path
+
+import pytest
+
+from create_embeddings_index import create_embeddings_index, index_file_path
+from prd_postings import CompressedPostingsWriter
+from prd_search import BM25IndexBuilder, POSTING_BYTES, load_search_index, search
+
+CHUNKS = Path(__file__).resolve().parents[2] / 'docs' / 'prd_chunks'
+
+def make_texts(n=300, seed=5):
+    rng = random.Random(seed)
+    words = ['公会', '成员', '赛季', '战斗', '奖励', '官员', '招募', 'guild', 'raid', 'API', 'SQLite', '2025']
+    return [' '.join(rng.choice(words) + rng.choice(words) for _ in range(rng.randint(1, 40))) for _ in range(n)]
+
+def build(path, texts, max_memory=None, spill_dir=None):
+    builder = BM25IndexBuilder(max_memory, spill_dir)
+    for i, text in enumerate(texts):
+        builder.add({'id': str(i), 'file': f'chunk_{i:03d}.md', 'title': text[:8]}, text)
+    postings_path = f'{path}.postings'
+    builder.write(path, CompressedPostingsWriter(postings_path, builder.header_dict()))
+    return builder, Path(path).read_bytes(), Path(postings_path).read_bytes()
+
+@pytest.mark.parametrize('max_memory', [1, POSTING_BYTES * 50, POSTING_BYTES * 2000])
+def test_spilled_build_equals_in_memory_build(tmp_path, max_memory):
+    texts = make_texts()
+    _, expected, expected_postings = build(str(tmp_path / 'memory.index'), texts)
+    spill_dir = tmp_path / 'spill'
+    spill_dir.mkdir()
+    builder, actual, actual_postings = build(str(tmp_path / 'spilled.index'), texts, max_memory, str(spill_dir))
+    assert builder.spilled > 1
+    assert actual == expected and actual_postings == expected_postings
+    # run 文件和临时目录在写出后删除
+    assert list(spill_dir.iterdir()) == [] and builder.runs == []
+
+def test_spill_on_the_last_document(tmp_path):
+    texts = make_texts(20)
+    _, expected, _ = build(str(tmp_path / 'memory.index'), texts)
+    builder = BM25IndexBuilder()
+    for i, text in enumerate(texts):
+        builder.add({'id': str(i), 'file': f'chunk_{i:03d}.md', 'title': text[:8]}, text)
+        if i in (4, len(texts) - 1):
+            builder.spill()
+    assert builder.postings == {} and len(builder.runs) == 2
+    builder.write(str(tmp_path / 'spilled.index'))
+    assert (tmp_path / 'spilled.index').read_bytes() == expected
+
+def test_build_with_memory_budget_matches(tmp_path, monkeypatch):
+    shutil.copytree(CHUNKS, tmp_path / 'prd_chunks')
+    monkeypatch.chdir(tmp_path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        create_embeddings_index('prd_chunks', 'memory.index', incremental=False, search_index=True,
+                                compressed_postings=True)
+        create_embeddings_index('prd_chunks', 'spilled.index', incremental=False, search_index=True,
+                                compressed_postings=True, max_memory=64 * 1024)
+    for suffix in ('bm25', 'postings'):
+        assert Path(index_file_path('spilled.index', suffix)).read_bytes() == \
+            Path(index_file_path('memory.index', suffix)).read_bytes()
+    index = load_search_index(os.path.abspath(index_file_path('spilled.index', 'bm25')))
+    assert search(index, '公会成员', 3)
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import os
+
+from prd_section_index import (build_section_index, find_sections, load_section_index, query_regions,
+                               read_range, read_section)
+
+SOURCE = """前言段落
+# 1. 公会系统
+公会概述
+## 1.1 成员管理
+成员正文
+```
+# 代码块里的井号不是标题
+```
+## 1.2 权限
+权限正文
+# 2. 战斗系统
+战斗正文
+"""
+
+def write_source(tmp_path, text=SOURCE):
+    path = tmp_path / 'prd.md'
+    path.write_bytes(text.encode('utf-8'))
+    return str(path)
+
+def test_tree_and_byte_ranges(tmp_path):
+    source = write_source(tmp_path)
+    index = build_section_index(source)
+    root, guild, members, perms, battle = index['sections']
+    assert [n['title'] for n in index['sections'][1:]] == ['1. 公会系统', '1.1 成员管理', '1.2 权限', '2. 战斗系统']
+    assert root['children'] == [guild['id'], battle['id']]
+    assert guild['children'] == [members['id'], perms['id']]
+    assert perms['path'] == ['1. 公会系统', '1.2 权限']
+    assert root['byte_end'] == len(SOURCE.encode('utf-8'))
+
+    assert read_section(index, members) == "## 1.1 成员管理\n成员正文\n```\n# 代码块里的井号不是标题\n```\n"
+    assert read_section(index, guild, subtree=False) == "# 1. 公会系统\n公会概述\n"
+    assert read_section(index, guild) + read_section(index, battle) == SOURCE[SOURCE.index('# 1.'):]
+    data = SOURCE.encode('utf-8')
+    for node in index['sections']:
+        assert node['sha256'] == hashlib.sha256(data[node['byte_start']:node['byte_end']]).hexdigest()
+
+def test_find_sections(tmp_path):
+    index = build_section_index(write_source(tmp_path))
+    assert [n['title'] for n in find_sections(index, '1.2')] == ['1.2 权限']
+    assert [n['title'] for n in find_sections(index, '1. 公会系统/1.1 成员管理')] == ['1.1 成员管理']
+    # 编号前缀同时匹配子章节
+    assert [n['title'] for n in find_sections(index, '1')] == ['1. 公会系统', '1.1 成员管理', '1.2 权限']
+    assert find_sections(index, '3') == []
+
+def test_numbered_headings(tmp_path):
+    source = write_source(tmp_path, "引言\n1. 概述\n正文\n1.1 目标\n目标正文\n2. 范围\n范围正文\n")
+    index = build_section_index(source, heading_style='numbered')
+    titles = [(n['level'], n['title']) for n in index['sections'][1:]]
+    assert titles == [(1, '1. 概述'), (2, '1.1 目标'), (1, '2. 范围')]
+    assert read_section(index, index['sections'][1]) == "1. 概述\n正文\n1.1 目标\n目标正文\n"
+
+def test_query_regions(tmp_path):
+    source = write_source(tmp_path, "引言\n1. 概述\n正文\n  2. 缩进的编号\n3.没有空格\n")
+    index = build_section_index(source)
+    sections = query_regions(index, 'sections')
+    assert [r['title'] for r in sections] == ['前言', '1. 概述', '2. 缩进的编号', '3.没有空格']
+    chapters = query_regions(index, 'chapters')
+    assert [r['title'] for r in chapters] == ['1. 概述']
+    assert read_range(source, chapters[0]['byte_start'], chapters[0]['byte_end']) == \
+        "1. 概述\n正文\n  2. 缩进的编号\n3.没有空格\n"
+
+def test_load_rebuilds_when_source_changes(tmp_path):
+    source = write_source(tmp_path)
+    index_file = str(tmp_path / 'prd.sections.json')
+    first = load_section_index(source, index_file)
+    assert os.path.exists(index_file)
+    assert load_section_index(source, index_file) == first
+
+    write_source(tmp_path, SOURCE + "# 3. 经济系统\n经济正文\n")
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    rebuilt = load_section_index(source, index_file)
+    assert rebuilt['sections'][-1]['title'] == '3. 经济系统'
+    # 换一种标题风格也会重建
+    assert load_section_index(source, index_file, 'numbered')['heading_style'] == 'numbered'
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+import sys
+from pathlib import Path
+
+import pytest
+
+import prd_summarizer
+from prd_summarizer import (NO_SUMMARY, check_mode, lead_summary, scoring_mode, select_sentences,
+                            split_sentences, summarize, summarize_batch)
+
+CHUNKS = Path(__file__).resolve().parents[2] / 'docs' / 'prd_chunks'
+
+DOC = """---
+title: 公会系统
+---
+# 公会系统
+
+公会是玩家协作的核心玩法。会长可以任命官员！成员每天可以领取公会奖励？
+- **成员管理**：支持[邀请](http://example.com)和踢出成员
+| 字段 | 说明 |
+```
+const guild = createGuild();
+```
+interface Guild {
+Guild members share a common bank. The bank is managed by officers.
+短句。
+"""
+
+def test_split_sentences_skips_noise_and_splits_on_stops():
+    assert split_sentences(DOC) == [
+        '公会是玩家协作的核心玩法。',
+        '会长可以任命官员！',
+        '成员每天可以领取公会奖励？',
+        '成员管理：支持邀请和踢出成员',
+        'Guild members share a common bank.',
+        'The bank is managed by officers.',
+    ]
+    assert split_sentences('') == []
+
+def test_select_sentences_keeps_document_order_within_budget():
+    sentences = ['第一句话比较长一些。', '第二句。', '第三句话。']
+    assert select_sentences(sentences, [2, 0, 1], 16) == '第一句话比较长一些。第三句话。'
+    assert select_sentences(sentences, [1, 2, 0], 100) == '第一句话比较长一些。第二句。第三句话。'
+    # 第一句就超出预算时截断
+    assert select_sentences(['a' * 50], [0], 10) == 'a' * 7 + '...'
+    assert select_sentences([], [], 10) == NO_SUMMARY
+    # 英文句子之间补空格，没有句末标点的中文句子补分号
+    assert select_sentences(['Alpha beta.', 'Gamma delta.'], [0, 1], 100) == 'Alpha beta. Gamma delta.'
+    assert select_sentences(['列表项一', '列表项二'], [0, 1], 100) == '列表项一；列表项二'
+
+def test_lead_is_the_default_mode():
+    assert summarize(DOC) == lead_summary(DOC)
+    assert scoring_mode() == f'summary-v{prd_summarizer.SUMMARY_VERSION}-lead'
+    assert lead_summary('# 标题\n\n---\n') == NO_SUMMARY
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        summarize(DOC, mode='tfidf')
+
+def test_centrality_without_numpy_fails(monkeypatch):
+    monkeypatch.setattr(prd_summarizer, 'np', None)
+    monkeypatch.setitem(sys.modules, 'numpy', None)
+    with pytest.raises(RuntimeError, match='numpy'):
+        check_mode('centrality')
+    # lead 不需要 numpy
+    assert summarize_batch([DOC]) == [lead_summary(DOC)]
+
+@pytest.mark.parametrize('mode', ['lead', 'centrality'])
+def test_batch_equals_per_document(mode):
+    if mode == 'centrality':
+        pytest.importorskip('numpy')
+    texts = [path.read_text(encoding='utf-8') for path in sorted(CHUNKS.glob('*.md'))]
+    texts += [DOC, '', '# 只有标题\n']
+    for max_length in (80, 200):
+        assert summarize_batch(texts, max_length, mode) == [summarize(text, max_length, mode) for text in texts]
+
+def test_centrality_picks_central_sentence():
+    pytest.importorskip('numpy')
+    text = '公会成员可以参加公会战斗。天气很好。公会战斗奖励发给公会成员。'
+    assert summarize(text, 30, 'centrality') == '公会成员可以参加公会战斗。公会战斗奖励发给公会成员。'
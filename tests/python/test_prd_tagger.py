@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+import random
+from pathlib import Path
+
+import pytest
+
+from prd_tagger import TagMatcher, load_tag_taxonomy
+
+ROOT = Path(__file__).resolve().parents[2]
+
+@pytest.fixture(scope='module')
+def taxonomy():
+    return load_tag_taxonomy()[0]
+
+def presence(taxonomy, content):
+    """
+    原 extract_tags 的语义：任一关键词是小写正文的子串即命中
+    """
+    content_lower = content.lower()
+    return {tag for tag, terms in taxonomy.items() if any(term.lower() in content_lower for term in terms)}
+
+def reference_counts(taxonomy, content):
+    """
+    逐位置判断：每个标签在其关键词开始的位置各记一次，同一标签已覆盖的区间内不再计数
+    """
+    content_lower = content.lower()
+    counts, free = {}, {}
+    for pos in range(len(content_lower)):
+        for tag, terms in taxonomy.items():
+            lengths = [len(t) for t in terms if t and content_lower.startswith(t.lower(), pos)]
+            if lengths and pos >= free.get(tag, 0):
+                counts[tag] = counts.get(tag, 0) + 1
+                free[tag] = pos + max(lengths)
+    return counts
+
+def corpus_texts():
+    paths = sorted((ROOT / 'docs' / 'prd_chunks').glob('*.md')) + sorted((ROOT / 'shards').glob('*.xml'))
+    return [path.read_text(encoding='utf-8') for path in paths]
+
+def fuzz_texts(taxonomy, n=300, seed=11):
+    """
+    由关键词片段拼成的文本，覆盖跨标签重叠、前缀嵌套和自身重叠（combattle、pvpvp）
+    """
+    rng = random.Random(seed)
+    pieces = [term for terms in taxonomy.values() for term in terms]
+    pieces += [term[:k] for term in pieces for k in range(1, len(term))] + [' ', '，', 'x', 'Le', 'tle', 'vp']
+    return [''.join(rng.choice(pieces) for _ in range(rng.randint(1, 12))) for _ in range(n)]
+
+def test_review_examples(taxonomy):
+    matcher = TagMatcher(taxonomy)
+    assert matcher.count('本章说明用户体验设计') == {'UI': 1, 'Player': 1}
+    assert matcher.count('guild list') == {'Guild': 1, 'UI': 1}
+    assert matcher.count('Gameplay GAME 玩法') == {'Game': 3}
+    assert matcher.count('combattle pvpvp') == {'Battle': 2}
+
+def test_tags_match_substring_semantics(taxonomy):
+    matcher = TagMatcher(taxonomy)
+    for text in corpus_texts() + fuzz_texts(taxonomy):
+        assert set(matcher.count(text)) == presence(taxonomy, text), text[:80]
+
+def test_counts_match_reference(taxonomy):
+    matcher = TagMatcher(taxonomy)
+    for text in fuzz_texts(taxonomy) + [text[:3000] for text in corpus_texts()[:5]]:
+        assert matcher.count(text) == reference_counts(taxonomy, text), text[:80]
+
+def test_match_positions_agree_with_count(taxonomy):
+    matcher = TagMatcher(taxonomy)
+    for text in fuzz_texts(taxonomy, 100):
+        hits = matcher.match(text)
+        assert {tag: hit['count'] for tag, hit in hits.items()} == matcher.count(text)
+        lower = text.lower()
+        for tag, hit in hits.items():
+            assert all(any(lower.startswith(t.lower(), pos) for t in taxonomy[tag]) for pos in hit['positions'])
+
+def test_self_overlapping_custom_taxonomy():
+    taxonomy = {'A': ['aa', 'aab'], 'B': ['ab', 'b']}
+    matcher = TagMatcher(taxonomy)
+    for text in ['aaab', 'aaaab', 'abab', 'b', '']:
+        assert matcher.count(text) == reference_counts(taxonomy, text)
+
+def test_rank_orders_by_count_then_taxonomy(taxonomy):
+    matcher = TagMatcher(taxonomy, max_tags=2)
+    counts = matcher.count('公会 公会 玩家 API')
+    assert matcher.rank(counts) == ['Guild', 'API']
+    assert TagMatcher({}).count('anything') == {}
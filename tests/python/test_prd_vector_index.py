@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from prd_vector_index import VectorIndex, build_ivf, build_vector_index, ivf_files
+
+TOPICS = ['公会成员管理与权限', '战斗系统伤害公式', '经济系统金币产出']
+
+def make_index(tmp_path, n=100):
+    texts = [f"{TOPICS[i % len(TOPICS)]}" for i in range(n)]
+    docs = [{'file': f'chunk_{i:03d}.md', 'title': texts[i]} for i in range(n)]
+    index_file = str(tmp_path / 'prd_chunks.index')
+    build_vector_index(lambda: iter(texts), docs, index_file)
+    return index_file
+
+def test_ivf_drops_empty_clusters(tmp_path):
+    index_file = make_index(tmp_path)
+    # 只有 3 种不同的向量，10 个簇里至少 7 个分不到行
+    build_ivf(index_file, nlist=10)
+    index = VectorIndex(index_file)
+    offsets = index.ivf['offsets']
+    assert (offsets[1:] > offsets[:-1]).all()
+    assert index.ivf['centroids'].shape[0] == offsets.shape[0] - 1
+    results = index.search('公会', 5, nprobe=1)
+    assert len(results) == 5
+    assert all(doc['title'] == TOPICS[0] for _, doc in results)
+
+def test_probe_skips_empty_clusters_in_old_files(tmp_path):
+    index_file = make_index(tmp_path)
+    build_ivf(index_file)
+    path, _ = ivf_files(index_file)
+    with np.load(path) as data:
+        centroids, order, offsets = data['centroids'], data['order'], data['offsets']
+    # 模拟旧文件：在质心表前面插入离查询最近的空簇
+    query = VectorIndex(index_file).embed('公会')
+    centroids = np.vstack([query[None, :], centroids]).astype(np.float32)
+    offsets = np.concatenate([[0], offsets])
+    np.savez(path, centroids=centroids, order=order, offsets=offsets)
+
+    index = VectorIndex(index_file)
+    results = index.search('公会', 5, nprobe=1)
+    assert len(results) == 5
+    assert all(doc['title'] == TOPICS[0] for _, doc in results)
+
+def test_probe_without_rows_falls_back_to_exact(tmp_path):
+    index_file = make_index(tmp_path)
+    build_ivf(index_file)
+    index = VectorIndex(index_file)
+    index.ivf['offsets'] = np.zeros_like(index.ivf['offsets'])
+    assert index.search('公会', 5, nprobe=2) == index.search('公会', 5)
+
+def test_nprobe_must_be_positive(tmp_path):
+    index = VectorIndex(make_index(tmp_path))
+    with pytest.raises(ValueError):
+        index.search('公会', 5, nprobe=0)
+
+def test_dedup_build_maps_rows_by_file(tmp_path, monkeypatch):
+    import contextlib
+    import io
+    import json
+    import shutil
+    from pathlib import Path
+
+    from create_embeddings_index import create_embeddings_index
+
+    chunks = Path(__file__).resolve().parents[2] / 'docs' / 'prd_chunks'
+    shutil.copytree(chunks, tmp_path / 'prd_chunks')
+    shutil.copytree(chunks, tmp_path / 'copy_chunks')
+    monkeypatch.chdir(tmp_path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        create_embeddings_index(['prd_chunks', 'copy_chunks'], 'prd.index', incremental=False,
+                                dedup=True, vectors=True)
+    with open('prd.index', 'r', encoding='utf-8') as f:
+        documents = json.load(f)['documents']
+    kept = [doc for doc in documents if 'duplicate_of' not in doc]
+    assert len(kept) < len(documents)
+    index = VectorIndex('prd.index')
+    assert len(index) == len(index.matrix) == len(kept)
+    # 行号不对应 JSON 位置，_docs.jsonl 给出每行的文档；复制的块 id 相同，以 file 为准
+    rows = [index.docs[row] for row in range(len(index))]
+    assert [(ref['id'], ref['file']) for ref in rows] == [(doc['id'], doc['file']) for doc in kept]
+    by_file = {doc['file']: doc for doc in documents}
+    for _, ref in index.search('公会', 5):
+        assert 'duplicate_of' not in by_file[ref['file']]
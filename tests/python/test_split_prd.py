@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+import contextlib
+import importlib.util
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+from split_prd import iter_sections, split_markdown_by_sections
+from token_estimator import estimate_tokens, line_token_cost
+
+ROOT = Path(__file__).resolve().parents[2]
+
+@pytest.fixture(scope='module')
+def corpus(tmp_path_factory):
+    spec = importlib.util.spec_from_file_location('prd_corpus', ROOT / 'scripts' / 'benchmarks' / 'prd_corpus.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    path = tmp_path_factory.mktemp('corpus') / 'corpus.md'
+    module.generate_corpus(str(path), 0.5)
+    return path
+
+def assert_within_budget(section, budget):
+    # 硬上限：只有单独一行就超出预算时才允许超出
+    assert estimate_tokens(section) <= budget or '\n' not in section.strip('\n')
+
+@pytest.mark.parametrize('budget', [50, 400, 3000])
+def test_token_budgeted_sections_never_exceed_budget(corpus, budget):
+    lines = corpus.read_text(encoding='utf-8').split('\n')
+    sections = list(iter_sections(lines, budget, line_token_cost, strict=True))
+    assert '\n'.join(sections) == '\n'.join(lines)
+    for section in sections:
+        assert_within_budget(section, budget)
+
+def test_long_line_becomes_its_own_chunk():
+    lines = ['短行', '公会' * 500, '另一行']
+    sections = list(iter_sections(lines, 100, line_token_cost, strict=True))
+    assert sections == ['短行', '公会' * 500, '另一行']
+
+def test_split_markdown_records_tokens_within_budget(corpus, tmp_path):
+    with contextlib.redirect_stdout(io.StringIO()):
+        total = split_markdown_by_sections(str(corpus), output_dir=str(tmp_path), token_budget=1500)
+    with open(tmp_path / 'corpus_manifest.json', 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    assert manifest['token_budget'] == 1500 and manifest['total_chunks'] == total > 1
+    source = corpus.read_bytes()
+    for chunk in manifest['chunks']:
+        section = source[chunk['byte_start']:chunk['byte_end']].decode('utf-8')
+        assert chunk['tokens'] == estimate_tokens(section)
+        assert_within_budget(section, 1500)
+        assert chunk['header']['tokens'] == str(chunk['tokens'])
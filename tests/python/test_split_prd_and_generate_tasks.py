@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+
+import contextlib
+import importlib.util
+import io
+import os
+from pathlib import Path
+
+import pytest
+
+from split_prd_and_generate_tasks import split_prd_by_chapters, split_prd_file_by_chapters
+from token_estimator import estimate_tokens
+
+ROOT = Path(__file__).resolve().parents[2]
+
+PRD = """《公会经理》产品需求文档 (PRD)
+
+📋 目录
+- 执行摘要
+- 公会系统
+--------
+
+1. 执行摘要
+公会经理是一款模拟经营游戏。
+
+2. 公会系统
+公会成员可以参加公会战斗。
+  3. 缩进的编号不是章节
+```
+4. 代码块里的编号行也算章节
+```
+5. 战斗系统
+战斗正文。
+"""
+
+def load_corpus_module():
+    spec = importlib.util.spec_from_file_location('prd_corpus', ROOT / 'scripts' / 'benchmarks' / 'prd_corpus.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def split_both(path, token_budget=None):
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected = split_prd_by_chapters(path.read_text(encoding='utf-8'), token_budget)
+        actual = split_prd_file_by_chapters(str(path), token_budget)
+    return expected, actual
+
+@pytest.mark.parametrize('newline', ['\n', '\r\n'])
+def test_file_split_matches_content_split(tmp_path, newline):
+    path = tmp_path / 'prd.txt'
+    path.write_bytes(PRD.replace('\n', newline).encode('utf-8'))
+    expected, actual = split_both(path)
+    assert actual == expected
+    assert [chapter['title'] for chapter in actual] == ['1. 执行摘要', '2. 公会系统', '4. 代码块里的编号行也算章节',
+                                                        '5. 战斗系统']
+    assert actual[0]['content'].startswith('《公会经理》产品需求文档 (PRD)\n\n📋 目录\n- 执行摘要')
+    assert os.path.exists(f'{path}.sections.json')
+
+def test_file_split_matches_on_generated_corpus(tmp_path):
+    path = tmp_path / 'corpus.md'
+    load_corpus_module().generate_corpus(str(path), 0.3)
+    for token_budget in (None, 2000):
+        expected, actual = split_both(path, token_budget)
+        assert len(actual) > 10 and actual == expected
+
+def test_file_split_uses_the_saved_index(tmp_path, monkeypatch):
+    path = tmp_path / 'prd.txt'
+    path.write_text(PRD, encoding='utf-8')
+    expected, _ = split_both(path)
+    # 源文件没变时直接用保存的索引，不再重建
+    import prd_section_index
+    monkeypatch.setattr(prd_section_index, 'build_section_index', lambda *args: pytest.fail('index rebuilt'))
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert split_prd_file_by_chapters(str(path)) == expected
+
+def test_without_chapters_the_whole_file_is_one_chunk(tmp_path):
+    path = tmp_path / 'prd.txt'
+    path.write_text('没有编号章节的文档\n第二行\n', encoding='utf-8')
+    expected, actual = split_both(path)
+    assert actual == expected and [chapter['title'] for chapter in actual] == ['完整 PRD']
+
+def long_prd():
+    body = '\n'.join(f'公会成员第 {i} 条规则：会长可以任命官员，官员负责招募和训练。' for i in range(60))
+    return PRD.replace('战斗正文。', body + '\n\n' + '战斗' * 400)
+
+def test_token_budget_splits_long_chapters():
+    prd = long_prd()
+    with contextlib.redirect_stdout(io.StringIO()):
+        whole = split_prd_by_chapters(prd)
+        chapters = split_prd_by_chapters(prd, 600)
+    prefix = whole[0]['content'][:whole[0]['content'].index('1. 执行摘要')]
+    battle = [chapter for chapter in chapters if chapter['title'].startswith('5. 战斗系统')]
+    assert len(battle) > 2
+    assert [chapter['title'] for chapter in battle] == [f'5. 战斗系统 ({i}/{len(battle)})'
+                                                        for i in range(1, len(battle) + 1)]
+    # 每块都带全局上下文，拆出的正文按原顺序拼回整个章节
+    assert all(chapter['content'].startswith(prefix) for chapter in chapters)
+    assert '\n'.join(chapter['content'][len(prefix):] for chapter in battle) == whole[-1]['content'][len(prefix):]
+    for chapter in chapters:
+        assert chapter['token_estimate'] == estimate_tokens(chapter['content'])
+        # 只有单独一行正文就超出剩余预算时才允许超出
+        assert chapter['token_estimate'] <= 600 or '\n' not in chapter['content'][len(prefix):]
+    # 没有超出预算的章节保持原样
+    assert chapters[:3] == whole[:3]
+
+def test_token_budget_smaller_than_context_is_rejected():
+    with contextlib.redirect_stdout(io.StringIO()), pytest.raises(ValueError):
+        split_prd_by_chapters(PRD, 10)
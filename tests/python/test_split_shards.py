@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+import contextlib
+import io
+import json
+import tracemalloc
+from pathlib import Path
+
+from split_prd import char_cost, split_markdown_by_sections
+from split_shards import iter_shard_chunks, iter_shard_events, split_flattened_shard
+
+def embedded(path, title, body):
+    return f"\t<file path='{path}'><![CDATA[\n\t\t---\n\t\tTitle: {title}\n\t\t---\n\n\t\t{body}\n\t]]></file>\n"
+
+def write_shard(path, files):
+    text = '<?xml version="1.0" encoding="UTF-8"?>\n<files>\n' + ''.join(files) + '</files>\n'
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+def section(name, n):
+    return '\n\t\t'.join([f'# {name}'] + [f'{name} 第 {i} 行正文，说明公会成员的权限和奖励。' for i in range(n)])
+
+FILES = [embedded('a.md', 'A', section('A', 40)), embedded('b.md', 'B', section('B', 40)),
+         embedded('c.md', 'C', section('C', 40))]
+
+def split(xml_path, output_dir):
+    with contextlib.redirect_stdout(io.StringIO()):
+        total = split_flattened_shard(xml_path, chunk_size=1000, output_dir=str(output_dir))
+    with open(Path(output_dir) / f'{Path(xml_path).stem}_manifest.json', 'r', encoding='utf-8') as f:
+        return total, json.load(f)
+
+def test_manifest_schema_matches_split_prd(tmp_path):
+    xml_path = write_shard(tmp_path / 'shard.xml', FILES)
+    _, manifest = split(xml_path, tmp_path / 'out')
+    source = tmp_path / 'prd.md'
+    source.write_text('# 1. 概述\n正文\n# 2. 范围\n正文\n', encoding='utf-8')
+    with contextlib.redirect_stdout(io.StringIO()):
+        split_markdown_by_sections(str(source), output_dir=str(tmp_path / 'prd_out'))
+    with open(tmp_path / 'prd_out' / 'prd_manifest.json', 'r', encoding='utf-8') as f:
+        prd_manifest = json.load(f)
+    assert list(manifest)[:-1] == list(prd_manifest)[:-1] and list(manifest)[-1] == 'chunks'
+    assert manifest['changed'] == [chunk['chunk'] for chunk in manifest['chunks']]
+    assert manifest['removed'] == []
+
+def test_resplit_reports_changed_and_removed_chunks(tmp_path):
+    out = tmp_path / 'out'
+    xml_path = write_shard(tmp_path / 'shard.xml', FILES)
+    total, _ = split(xml_path, out)
+    total_again, manifest = split(xml_path, out)
+    assert total_again == total and manifest['changed'] == [] and manifest['removed'] == []
+
+    # 去掉最后一个内嵌文件：它的块被删除，其余块的头部块总数变化，全部算改动
+    write_shard(tmp_path / 'shard.xml', FILES[:2])
+    fewer, manifest = split(xml_path, out)
+    assert fewer < total
+    assert manifest['removed'] == list(range(fewer + 1, total + 1))
+    assert manifest['changed'] == list(range(1, fewer + 1))
+    names = sorted(p.name for p in out.glob('shard_chunk_*.md'))
+    assert names == [chunk['file'] for chunk in manifest['chunks']]
+    assert all(chunk['embedded_file'] in ('a.md', 'b.md') for chunk in manifest['chunks'])
+
+    # 只改一个内嵌文件的正文：块数不变时只有对应的块算改动
+    edited = [FILES[0], embedded('b.md', 'B', section('B', 40).replace('第 3 行', '第三行'))]
+    write_shard(tmp_path / 'shard.xml', edited)
+    same, manifest = split(xml_path, out)
+    assert same == fewer and manifest['removed'] == []
+    assert manifest['changed'] and all(manifest['chunks'][i - 1]['embedded_file'] == 'b.md'
+                                       for i in manifest['changed'])
+
+def test_events_do_not_depend_on_read_block_size(tmp_path):
+    xml_path = write_shard(tmp_path / 'shard.xml', FILES)
+    expected = list(iter_shard_events(xml_path))
+    assert [kind for kind, _ in expected].count('start') == 3
+    for block_size in (1, 7, 100):
+        assert list(iter_shard_events(xml_path, block_size)) == expected
+
+def test_chunks_are_streamed(tmp_path):
+    # 约 6 MB 的分片：逐块取出时峰值内存只与块大小有关，与文件大小无关
+    files = [embedded(f'f{i}.md', f'F{i}', section(f'F{i}', 400)) for i in range(200)]
+    xml_path = write_shard(tmp_path / 'big.xml', files)
+    assert Path(xml_path).stat().st_size > 5 * 1024 * 1024
+    tracemalloc.start()
+    try:
+        count = sum(1 for _ in iter_shard_chunks(xml_path, 8000, char_cost))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert count > 200
+    assert peak < 1024 * 1024
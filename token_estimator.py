@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地快速 token 估算器：按文字类别（CJK / 拉丁字母 / 数字 / 符号）分别折算，
+按行缓存结果，供 PRD 拆分脚本按 token 预算切块
+"""
+
+import re
+from functools import lru_cache
+
+# 每类字符折算成 token 的系数，按常见 BPE 词表（cl100k / o200k）对中文 PRD 的实测取中间值
+TOKEN_RATES = {
+    'cjk': 1.0,      # 每个汉字/假名/全角标点约 1 token
+    'latin': 0.25,   # 英文单词约 4 字符 1 token
+    'digit': 0.34,   # 数字约 3 位 1 token
+    'symbol': 1.0,   # 半角标点和 Markdown 符号基本各占 1 token
+}
+
+TOKEN_RUN_RE = re.compile(
+    r'(?P<cjk>[\u3000-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]+)'
+    r'|(?P<latin>[A-Za-z\u00c0-\u024f]+)'
+    r'|(?P<digit>[0-9]+)'
+    r'|(?P<space>\s+)'
+    r'|(?P<symbol>.)'
+)
+
+@lru_cache(maxsize=65536)
+def estimate_line_tokens(line):
+    """
+    估算单行（不含换行符）的 token 数，结果按行缓存
+    """
+    total = 0.0
+    for m in TOKEN_RUN_RE.finditer(line):
+        kind = m.lastgroup
+        if kind == 'space':
+            continue
+        n = m.end() - m.start()
+        if kind == 'latin' or kind == 'digit':
+            # 每个单词/数字至少 1 token
+            total += max(1.0, n * TOKEN_RATES[kind])
+        else:
+            total += n * TOKEN_RATES[kind]
+    return int(total + 0.5)
+
+def estimate_tokens(text):
+    """
+    估算一段文本的 token 数（每个换行计 1 token）
+    """
+    lines = text.split('\n')
+    return sum(estimate_line_tokens(line) for line in lines) + len(lines) - 1
+
+def line_token_cost(line):
+    """
+    行代价函数：行内 token 加上换行符，供 ChunkBoundaryEngine 使用
+    """
+    return estimate_line_tokens(line) + 1